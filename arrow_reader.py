@@ -0,0 +1,185 @@
+import csv
+import io
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:  # el lector Arrow es opcional: sin pyarrow se lee con pandas
+    pa = None
+
+from csv_input import csv_compression, open_csv
+
+logger = logging.getLogger(__name__)
+
+# Lectores de CSV que se pueden elegir por tabla (clave "reader" de TABLES_CONFIG)
+READERS = ("pandas", "arrow")
+
+# Metadato de cada lote con el número de fila del CSV de su primer registro
+FIRST_ROW_KEY = b"first_row"
+
+# Celdas que pandas lee como nulas en cualquier columna (su na_values por
+# omisión); Arrow usa las mismas para que los dos lectores coincidan. Las
+# marcas del INEGI solo son nulas en las columnas numéricas (ver apply_na_values)
+NULL_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+               "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+
+
+def arrow_available() -> bool:
+    """Si pyarrow está instalado"""
+    return pa is not None
+
+
+def _arrow_type(dtype: Any) -> "pa.DataType":
+    """Tipo Arrow equivalente a un tipo de la especificación de lectura (ver csv_schema)"""
+    if dtype is str:
+        return pa.string()
+    if dtype == "category":
+        return pa.dictionary(pa.int32(), pa.string())
+    if dtype == "boolean":
+        return pa.bool_()
+    return pa.float64()
+
+
+def _header(csv_path: str, encoding: str) -> List[str]:
+    """Nombres de columna de la primera línea del CSV"""
+    with io.TextIOWrapper(open_csv(csv_path), encoding=encoding, newline='') as f:
+        return next(csv.reader(f), [])
+
+
+def convert_options(spec: Optional[Dict[str, Any]], header: Sequence[str]) -> "pacsv.ConvertOptions":
+    """Columnas, tipos y nulos de la especificación como opciones de conversión de Arrow
+
+    Sin especificación se leen todas las columnas con nombre y Arrow infiere los
+    tipos. Los enteros se leen como float64 y se convierten después, igual que
+    con pandas. Arrow no admite nulos por columna: las columnas con na_values
+    propios se leen como texto y apply_na_values las anula y convierte.
+    """
+    if spec:
+        columns = list(spec["usecols"])
+        column_types = {col: pa.string() if col in spec["na_values"] else _arrow_type(dtype)
+                        for col, dtype in spec["dtype"].items()}
+    else:
+        columns = [col for col in header if col.strip()]
+        column_types = {}
+    return pacsv.ConvertOptions(
+        include_columns=columns,
+        column_types=column_types,
+        null_values=NULL_VALUES,
+        strings_can_be_null=True
+    )
+
+
+def _drop_empty_rows(table: "pa.Table") -> "pa.Table":
+    """Quita las filas con todas sus celdas vacías (las comas sueltas al final del CSV)"""
+    if table.num_columns == 0:
+        return table
+    valid = pc.is_valid(table.column(0))
+    for column in table.columns[1:]:
+        valid = pc.or_(valid, pc.is_valid(column))
+    return table if pc.all(valid).as_py() else table.filter(valid)
+
+
+def apply_na_values(table: "pa.Table", spec: Optional[Dict[str, Any]]) -> "pa.Table":
+    """Anula las marcas de na_values de cada columna y la convierte a su tipo, como read_csv con na_values"""
+    if not spec:
+        return table
+    for col, values in spec["na_values"].items():
+        if col not in table.column_names:
+            continue
+        column = table.column(col)
+        column = pc.if_else(pc.is_in(column, value_set=pa.array(values, pa.string())),
+                            pa.scalar(None, pa.string()), column)
+        column = pc.cast(column, _arrow_type(spec["dtype"].get(col)))
+        table = table.set_column(table.column_names.index(col), col, column)
+    return table
+
+
+def apply_arrow_spec(table: "pa.Table", spec: Optional[Dict[str, Any]]) -> "pa.Table":
+    """Convierte los enteros a su tipo y completa las claves con ceros a la izquierda, como apply_read_spec"""
+    if not spec:
+        return table
+    for col, dtype in spec["casts"].items():
+        if col not in table.column_names:
+            continue
+        try:
+            column = pc.cast(table.column(col), getattr(pa, dtype.lower())())
+        except pa.ArrowInvalid:
+            logger.warning(f"La columna {col} tiene valores no enteros, se conserva {table.schema.field(col).type}")
+            continue
+        table = table.set_column(table.column_names.index(col), col, column)
+    for col, width in spec["pad_widths"].items():
+        if col in table.column_names and pc.min(pc.utf8_length(table.column(col))).as_py() < width:
+            padded = pc.utf8_lpad(table.column(col), width=width, padding='0')
+            table = table.set_column(table.column_names.index(col), col, padded)
+    return table
+
+
+def parse_csv_arrow(
+    csv_path: str,
+    spec: Optional[Dict[str, Any]] = None,
+    encoding: str = 'latin-1',
+    block_size: int = 1 << 20
+) -> "pa.Table":
+    """Parsea un CSV completo con el lector multihilo de Arrow, sin limpiarlo
+
+    Arrow parte el archivo en bloques de block_size bytes que se decodifican
+    (incluida la conversión desde encoding) y parsean en paralelo. Un .gz o
+    .zst se descomprime como flujo (en serie) mientras se parsean los bloques.
+    """
+    compression = csv_compression(csv_path)
+    return pacsv.read_csv(
+        pa.input_stream(csv_path, compression=compression) if compression else csv_path,
+        read_options=pacsv.ReadOptions(encoding=encoding, block_size=block_size, use_threads=True),
+        convert_options=convert_options(spec, _header(csv_path, encoding))
+    )
+
+
+def clean_arrow_table(table: "pa.Table", spec: Optional[Dict[str, Any]] = None) -> "pa.Table":
+    """Anula las marcas de nulo, quita las filas vacías y aplica la especificación a una tabla recién parseada
+
+    Los pasos siguen el orden de la lectura con pandas: una fila que solo
+    trae marcas del INEGI también cuenta como vacía.
+    """
+    return apply_arrow_spec(_drop_empty_rows(apply_na_values(table, spec)), spec)
+
+
+def read_csv_arrow(
+    csv_path: str,
+    spec: Optional[Dict[str, Any]] = None,
+    encoding: str = 'latin-1',
+    block_size: int = 1 << 20
+) -> "pa.Table":
+    """Lee un CSV con Arrow, ya limpio y con los tipos del mapping (ver parse_csv_arrow)"""
+    return clean_arrow_table(parse_csv_arrow(csv_path, spec, encoding, block_size), spec)
+
+
+def iter_arrow_batches(table: "pa.Table", batch_size: int = 1000, skip_rows: int = 0) -> Iterator["pa.RecordBatch"]:
+    """Lotes de hasta batch_size filas de la tabla desde skip_rows, cada uno con su primera fila del CSV"""
+    first_row = skip_rows
+    for batch in table.slice(skip_rows).to_batches(max_chunksize=batch_size):
+        yield batch.replace_schema_metadata({FIRST_ROW_KEY: str(first_row).encode()})
+        first_row += batch.num_rows
+
+
+def batch_rows(batch: "pa.RecordBatch") -> List[int]:
+    """Números de fila del CSV de los registros de un lote de iter_arrow_batches"""
+    first_row = int((batch.schema.metadata or {}).get(FIRST_ROW_KEY, 0))
+    return list(range(first_row, first_row + batch.num_rows))
+
+
+def batch_documents(batch: "pa.RecordBatch") -> List[Dict[str, Any]]:
+    """Documentos de un lote Arrow, convertidos a valores de Python por Arrow"""
+    return batch.to_pylist()
+
+
+def batch_ids(batch: "pa.RecordBatch", columns: List[str], separator: str) -> Optional[List[Optional[str]]]:
+    """_id de cada registro uniendo las columnas clave con separator (None si falta alguna)"""
+    if not columns or any(col not in batch.schema.names for col in columns):
+        return None
+    keys = [pc.cast(batch.column(col), pa.string()) for col in columns]
+    if len(keys) == 1:
+        return keys[0].to_pylist()
+    return pc.binary_join_element_wise(*keys, separator).to_pylist()
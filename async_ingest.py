@@ -0,0 +1,362 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+from elasticsearch.helpers import async_streaming_bulk
+
+from bigdata_final import (
+    CSV_DIR,
+    TABLES_CONFIG,
+    get_mappings,
+    log_summary,
+    parse_megabytes,
+    read_table_data,
+    validate_table_ids,
+)
+from csv_cache import DEFAULT_CACHE_DIR
+from csv_input import resolve_csv_path
+from csv_schema import read_spec_for_csv
+from dead_letter import DEFAULT_DEAD_LETTER_PATH, action_failure, write_dead_letters
+from es_client import connect_elasticsearch_async
+from index_lifecycle import LOAD_SETTINGS, id_scheme, load_time_mapping, production_settings
+from ingest_utils import DEFAULT_BULK_BYTES, MAX_BULK_DOCS, RETRYABLE_STATUSES, build_actions, frame_rows, iter_batches
+from mapping_registry import MAPPING_PROFILES, mapping_profile
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp es opcional: solo lo necesita esta carga (pip install "elasticsearch[async]")
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+
+async def create_index_async(es, index_name: str, mapping: Dict[str, Any], load_profile: bool = False) -> bool:
+    """Crea el índice (o le aplica los settings de carga si ya existe), como create_indices
+
+    Como outdated_indices, un índice (no alias) cuyo _id se armaba con otras
+    columnas se elimina y se recrea.
+    """
+    try:
+        if await es.indices.exists(index=index_name) and id_scheme(mapping) is not None \
+                and not await es.indices.exists_alias(name=index_name):
+            stored = (await es.indices.get_mapping(index=index_name)).get(index_name, {})
+            if id_scheme(stored) != id_scheme(mapping):
+                await es.indices.delete(index=index_name)
+                logger.warning(f"{index_name} tenía _id de {id_scheme(stored) or 'otro esquema'} y ahora se arma "
+                               f"con {id_scheme(mapping)}: se elimina y se recrea para no duplicar documentos")
+        if not await es.indices.exists(index=index_name):
+            body = load_time_mapping(mapping) if load_profile else mapping
+            await es.indices.create(index=index_name, body=body)
+            logger.info(f"Índice {index_name} creado con éxito")
+        else:
+            logger.info(f"Índice {index_name} ya existe")
+            stored = (await es.indices.get_mapping(index=index_name)).get(index_name, {})
+            if mapping_profile(stored) != mapping_profile(mapping):
+                logger.warning(f"{index_name} ya existe con el perfil de mapping {mapping_profile(stored)} y lo "
+                               f"conserva: el perfil {mapping_profile(mapping)} solo se aplica a índices nuevos")
+            if load_profile:
+                await es.indices.put_settings(index=index_name, settings=LOAD_SETTINGS)
+        return True
+    except Exception as e:
+        logger.error(f"Error al crear índice {index_name}: {str(e)}")
+        return False
+
+
+async def finalize_index_async(
+    es,
+    index_name: str,
+    mapping: Dict[str, Any],
+    force_merge: bool = False
+) -> Dict[str, float]:
+    """Restaura los settings de producción, refresca y opcionalmente fusiona (ver finalize_index)"""
+    timings = {}
+    settings = production_settings(mapping)
+    try:
+        start = time.time()
+        await es.indices.put_settings(index=index_name, settings=settings)
+        timings["restaurar"] = time.time() - start
+
+        start = time.time()
+        await es.indices.refresh(index=index_name)
+        timings["refresh"] = time.time() - start
+
+        if force_merge:
+            start = time.time()
+            await es.indices.forcemerge(index=index_name, max_num_segments=1)
+            timings["forcemerge"] = time.time() - start
+        logger.info(f"Índice {index_name} restaurado a producción: {settings}")
+    except Exception as e:
+        logger.error(f"Error al restaurar settings de {index_name}: {str(e)}")
+    return timings
+
+
+async def prepare_table_async(table_name: str, mapping: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Especificación de lectura y validación de claves de una tabla, fuera del event loop"""
+    config = TABLES_CONFIG[table_name]
+    csv_path = resolve_csv_path(CSV_DIR, config["csv_file"])
+    if not os.path.exists(csv_path):
+        logger.error(f"No se encontró el archivo {csv_path}")
+        return None
+    read_spec = await asyncio.to_thread(read_spec_for_csv, csv_path, mapping)
+    expected_docs = await asyncio.to_thread(validate_table_ids, csv_path, config.get("id_field"), read_spec)
+    if expected_docs is None:
+        logger.error(f"Omitiendo tabla {table_name}: claves {config.get('id_field')} incompletas o repetidas")
+        return None
+    return {
+        "table": table_name,
+        "csv_path": csv_path,
+        "id_field": config.get("id_field"),
+        "read_spec": read_spec,
+        "reader": config.get("reader", "pandas"),
+        "expected_docs": expected_docs
+    }
+
+
+async def _iter_actions(
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    index_name: str,
+    id_field: Union[str, Sequence[str], None],
+    batch_size: int,
+    in_flight: Optional[Deque[Tuple[Dict[str, Any], Any]]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Acciones bulk de los datos, leyendo y armando cada bloque en un hilo aparte
+
+    Con in_flight cada acción queda en la cola, en el orden en que se envía,
+    con su fila del CSV hasta que llegue su resultado.
+    """
+    batches = iter_batches(data, batch_size)
+    while True:
+        batch_df = await asyncio.to_thread(next, batches, None)
+        if batch_df is None:
+            return
+        actions = await asyncio.to_thread(build_actions, batch_df, index_name, id_field)
+        for action, row in zip(actions, frame_rows(batch_df)):
+            if in_flight is not None:
+                in_flight.append((action, row))
+            yield action
+
+
+def _bulk_results(es, actions: Any, bulk_bytes: Optional[int], batch_size: int) -> AsyncIterator[Tuple[bool, Any]]:
+    """Resultados de async_streaming_bulk en el mismo orden que las acciones
+
+    Sin reintentos del helper: los 429 que reintenta los entrega al final de su
+    petición, fuera de orden, y sin _id no habría cómo emparejarlos con su fila.
+    Los reintentos los hace import_table_async.
+    """
+    return async_streaming_bulk(
+        es,
+        actions,
+        chunk_size=MAX_BULK_DOCS if bulk_bytes else batch_size,
+        max_chunk_bytes=bulk_bytes or 100 * 1024 * 1024,
+        max_retries=0,
+        raise_on_error=False,
+        raise_on_exception=False
+    )
+
+
+async def import_table_async(
+    es,
+    index_name: str,
+    table: Dict[str, Any],
+    batch_size: int = 1000,
+    stream: bool = False,
+    cache_dir: Optional[str] = None,
+    bulk_bytes: Optional[int] = DEFAULT_BULK_BYTES,
+    dead_letter_path: Optional[str] = DEFAULT_DEAD_LETTER_PATH,
+    max_retries: int = 3,
+    initial_backoff: float = 2.0
+) -> Optional[Tuple[int, int]]:
+    """Importa una tabla con async_streaming_bulk y retorna (éxitos, errores)
+
+    La lectura del CSV y la construcción de acciones corren en hilos, así el
+    event loop sigue enviando lotes de las otras tablas. Con bulk_bytes cada
+    petición se corta por tamaño; sin él, cada batch_size documentos.
+    Cada resultado se empareja por posición con su acción (tenga o no _id) y
+    los rechazados se escriben con su documento y su fila del CSV en
+    dead_letter_path. Los rechazos transitorios (RETRYABLE_STATUSES, también de
+    la petición completa) se juntan y se reenvían cada batch_size con espera
+    exponencial, hasta max_retries veces; la espera detiene el envío de la tabla.
+    Retorna None si el CSV no se pudo leer.
+    """
+    data = await asyncio.to_thread(read_table_data, table["csv_path"], batch_size, stream, 0, cache_dir,
+                                   table.get("read_spec"), table.get("reader", "pandas"))
+    if data is None:
+        return None
+
+    success_count = 0
+    error_count = 0
+    in_flight = deque()
+    failures = []
+    retry = []
+
+    async def resend(pending: List[Tuple[Dict[str, Any], Any, Dict[str, Any]]]) -> None:
+        """Reenvía los rechazos transitorios; los que se agotan quedan fallidos"""
+        nonlocal success_count, error_count
+        for attempt in range(max_retries):
+            if not pending:
+                return
+            await asyncio.sleep(initial_backoff * 2 ** attempt)
+            sent = deque((action, row) for action, row, _ in pending)
+            pending = []
+            async for ok, item in _bulk_results(es, [action for action, _ in sent], bulk_bytes, batch_size):
+                action, row = sent.popleft()
+                if ok:
+                    success_count += 1
+                elif next(iter(item.values())).get("status") in RETRYABLE_STATUSES:
+                    pending.append((action, row, item))
+                else:
+                    error_count += 1
+                    failures.append(action_failure(action, item, row))
+        error_count += len(pending)
+        failures.extend(action_failure(action, item, row) for action, row, item in pending)
+
+    try:
+        results = _bulk_results(es, _iter_actions(data, index_name, table["id_field"], batch_size, in_flight),
+                                bulk_bytes, batch_size)
+        async for ok, item in results:
+            action, row = in_flight.popleft()
+            if ok:
+                success_count += 1
+            elif next(iter(item.values())).get("status") in RETRYABLE_STATUSES:
+                retry.append((action, row, item))
+                if len(retry) >= batch_size:
+                    await resend(retry)
+                    retry = []
+            else:
+                error_count += 1
+                failures.append(action_failure(action, item, row))
+            processed = success_count + error_count + len(retry)
+            if processed % batch_size == 0:
+                await asyncio.to_thread(write_dead_letters, dead_letter_path, failures)
+                failures = []
+                logger.info(f"{index_name}: {processed} documentos procesados, fallidos: {error_count}")
+        await resend(retry)
+        retry = []
+    except Exception as e:
+        logger.error(f"Error en importación a {index_name}: {str(e)}")
+        await asyncio.to_thread(write_dead_letters, dead_letter_path, failures)
+        if isinstance(data, pd.DataFrame):
+            return success_count, max(error_count, len(data) - success_count)
+        return success_count, max(error_count, 1)
+
+    await asyncio.to_thread(write_dead_letters, dead_letter_path, failures)
+    logger.info(f"Importación a {index_name} completada: {success_count} éxitos, {error_count} errores")
+    return success_count, error_count
+
+
+async def count_documents_async(es, index_names: List[str]) -> Dict[str, Union[int, Exception]]:
+    """Conteo final de todos los índices en paralelo (o el error al contar cada uno)"""
+    responses = await asyncio.gather(*(es.count(index=index_name) for index_name in index_names),
+                                     return_exceptions=True)
+    return {index_name: response if isinstance(response, Exception) else response["count"]
+            for index_name, response in zip(index_names, responses)}
+
+
+def _sum_timings(phase_timings: Dict[str, float], timings: Iterable[Dict[str, float]]) -> None:
+    """Suma los tiempos por fase de cada índice a los totales"""
+    for index_timings in timings:
+        for phase, seconds in index_timings.items():
+            phase_timings[phase] = phase_timings.get(phase, 0.0) + seconds
+
+
+async def main_async(
+    stream: bool = False,
+    load_profile: bool = True,
+    force_merge: bool = False,
+    cache_dir: Optional[str] = None,
+    mapping_profile: str = "default",
+    bulk_bytes: Optional[int] = DEFAULT_BULK_BYTES,
+    dead_letter_path: str = DEFAULT_DEAD_LETTER_PATH
+):
+    """Versión asíncrona de main(): todas las tablas se cargan a la vez en un solo event loop
+
+    Crea los índices, valida las claves, importa, restaura los settings y cuenta
+    los documentos de todas las tablas en paralelo con AsyncElasticsearch, y
+    termina con el mismo resumen que main(). No incluye los modos de main() que
+    dependen del cliente síncrono (alias, incremental, reanudación y procesos).
+    """
+    start_time = time.time()
+    logger.info("Iniciando proceso de importación asíncrona de datos censales")
+
+    if aiohttp is None:
+        logger.error('La carga asíncrona necesita aiohttp: pip install "elasticsearch[async]" '
+                     '(o use bigdata_final.py, que no lo requiere)')
+        return
+
+    es = await connect_elasticsearch_async()
+    if not es:
+        logger.error("No se puede continuar sin conexión a Elasticsearch")
+        return
+
+    try:
+        mappings = await asyncio.to_thread(get_mappings, mapping_profile)
+
+        phase_timings = {}
+        phase_start = time.time()
+        created = await asyncio.gather(*(create_index_async(es, index_name, mapping, load_profile=load_profile)
+                                         for index_name, mapping in mappings.items()))
+        created_indices = [index_name for index_name, ok in zip(mappings, created) if ok]
+        phase_timings["creación de índices"] = time.time() - phase_start
+        failed_indices = [index_name for index_name in mappings if index_name not in created_indices]
+        if failed_indices:
+            logger.warning(f"Algunos índices no pudieron crearse: {failed_indices}")
+
+        # Claves completas y únicas antes de enviar cualquier lote
+        failed_tables = []
+        names = [table_name for table_name in TABLES_CONFIG if table_name in created_indices]
+        prepared = await asyncio.gather(*(prepare_table_async(table_name, mappings[table_name])
+                                          for table_name in names))
+        tables = {}
+        for table_name, table in zip(names, prepared):
+            if table is None:
+                failed_tables.append(table_name)
+            else:
+                tables[table_name] = table
+
+        phase_start = time.time()
+        try:
+            loaded = await asyncio.gather(*(
+                import_table_async(es, index_name, table, stream=stream, cache_dir=cache_dir,
+                                   bulk_bytes=bulk_bytes, dead_letter_path=dead_letter_path)
+                for index_name, table in tables.items()
+            ))
+            results = {index_name: result for index_name, result in zip(tables, loaded) if result is not None}
+        finally:
+            phase_timings["carga"] = time.time() - phase_start
+            if load_profile:
+                _sum_timings(phase_timings, await asyncio.gather(*(
+                    finalize_index_async(es, index_name, mappings[index_name], force_merge=force_merge)
+                    for index_name in created_indices
+                )))
+
+        counts = await count_documents_async(es, created_indices)
+        log_summary(time.time() - start_time, phase_timings, results, tables, failed_tables, [], counts)
+    finally:
+        await es.close()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Opciones de línea de comandos equivalentes a los parámetros de main_async()"""
+    parser = argparse.ArgumentParser(description="Importa los CSV censales del INEGI a Elasticsearch con asyncio")
+    parser.add_argument("--stream", action="store_true", help="leer cada CSV por bloques")
+    parser.add_argument("--no-load-profile", dest="load_profile", action="store_false",
+                        help="crear los índices directamente con los settings de producción")
+    parser.add_argument("--force-merge", action="store_true", help="fusionar segmentos al terminar")
+    parser.add_argument("--cache", dest="cache_dir", nargs="?", const=DEFAULT_CACHE_DIR, default=None,
+                        help="leer los CSV desde una caché Arrow (directorio opcional)")
+    parser.add_argument("--mapping-profile", choices=MAPPING_PROFILES, default="default",
+                        help="mappings por defecto o compactos (tipos mínimos, métricas sin índice)")
+    parser.add_argument("--bulk-mb", dest="bulk_bytes", type=parse_megabytes, default=DEFAULT_BULK_BYTES,
+                        help="tamaño máximo de cada petición bulk en MB (0 = cortar cada 1000 filas)")
+    parser.add_argument("--dead-letter-path", default=DEFAULT_DEAD_LETTER_PATH,
+                        help="archivo NDJSON con los documentos rechazados y su motivo")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(**vars(parse_args())))
@@ -0,0 +1,430 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from arrow_reader import READERS, arrow_available, clean_arrow_table, iter_arrow_batches, parse_csv_arrow
+from bigdata_final import (
+    CSV_DIR,
+    TABLES_CONFIG,
+    get_mappings,
+    import_csv_to_elastic,
+    parse_megabytes,
+    read_table_data,
+)
+from csv_input import csv_source, resolve_csv_path
+from csv_schema import apply_read_spec, read_options, read_spec_for_csv
+from es_client import connect_elasticsearch, load_client_config
+from index_lifecycle import load_time_mapping
+from ingest_utils import (
+    DEFAULT_BULK_BYTES,
+    MAX_BULK_DOCS,
+    bulk_operations,
+    drop_empty_columns,
+    drop_empty_rows,
+    iter_bulk_bodies,
+    send_bulk_body,
+)
+
+try:
+    import resource
+except ImportError:  # resource solo existe en Unix: sin él no se mide la memoria
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Directorio de los CSV sintéticos escalados
+DEFAULT_BENCH_DIR = "./.bench/"
+
+# Tabla que se escala y columna clave que se reescribe para que cada copia tenga su propio _id
+SCALED_TABLE = "cat_seccion_2020"
+SCALED_KEY = "CVE_SECCION"
+
+# Etapas medidas por separado, en el orden en que corren
+STAGES = ["parse", "clean", "serialize", "send"]
+
+
+class _MockBulkHandler(BaseHTTPRequestHandler):
+    """Responde como Elasticsearch: el ping, la API bulk (todo creado) y acknowledged para lo demás
+
+    statuses asocia un _id con el estado que recibe su ítem bulk (para probar rechazos).
+    """
+
+    protocol_version = "HTTP/1.1"
+    statuses: Dict[str, int] = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _read_body(self) -> bytes:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return body
+
+    def do_HEAD(self):
+        self._reply({})
+
+    def do_GET(self):
+        self._reply({"version": {"number": "8.0.0"}, "tagline": "You Know, for Search"})
+
+    def do_POST(self):
+        body = self._read_body()
+        if not self.path.split("?")[0].endswith("/_bulk"):
+            self._reply({"acknowledged": True})
+            return
+        if b'"delete"' in body or self.statuses:
+            actions = [next(iter(json.loads(operation.split(b'\n', 1)[0]).items()))
+                       for operation in bulk_operations(body)]
+        else:
+            # Sin borrados cada operación son dos líneas; no hace falta parsear el cuerpo
+            actions = [("index", {})] * (body.count(b'\n') // 2)
+        items = [{op_type: self._result(meta.get("_id"))} for op_type, meta in actions]
+        errors = any("error" in next(iter(item.values())) for item in items)
+        self._reply({"took": 1, "errors": errors, "items": items})
+
+    def _result(self, doc_id: Optional[str]) -> Dict[str, Any]:
+        """Resultado del ítem bulk de un documento según statuses (creado por omisión)"""
+        status = self.statuses.get(doc_id, 201)
+        if status < 300:
+            return {"_id": doc_id, "status": status, "result": "created"}
+        return {"_id": doc_id, "status": status, "error": {"type": "mapper_parsing_exception", "reason": "rechazado"}}
+
+    do_PUT = do_POST
+    do_DELETE = do_POST
+
+
+def start_mock_cluster(port: int = 0, statuses: Optional[Dict[str, int]] = None) -> ThreadingHTTPServer:
+    """Levanta en un hilo el endpoint bulk de prueba; su URL es http://127.0.0.1:<server_address[1]>
+
+    statuses, si se da, es el estado con que se responde a cada _id (ver _MockBulkHandler).
+    """
+    handler = type("_MockBulkHandler", (_MockBulkHandler,), {"statuses": dict(statuses or {})})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def scaled_csv(csv_path: str, factor: int, key: str = SCALED_KEY, bench_dir: str = DEFAULT_BENCH_DIR) -> str:
+    """CSV con factor copias de las filas de datos, creado una sola vez en bench_dir
+
+    La copia k antepone k a la columna key (la primera copia queda igual), así
+    cada fila conserva un _id único y el formato de las claves no cambia.
+    """
+    name, ext = os.path.splitext(os.path.basename(csv_path))
+    out_path = os.path.join(bench_dir, f"{name}_x{factor}{ext}")
+    if os.path.exists(out_path):
+        return out_path
+    os.makedirs(bench_dir, exist_ok=True)
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        lines = [line.rstrip(b'\r\n').split(b',') for line in f if line.strip(b',\r\n')]
+    key_pos = header.rstrip(b'\r\n').split(b',').index(key.encode('latin-1'))
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, 'wb') as out:
+        out.write(header)
+        for copy in range(factor):
+            prefix = str(copy).encode() if copy else b''
+            for fields in lines:
+                out.write(b','.join(fields[:key_pos] + [prefix + fields[key_pos]] + fields[key_pos + 1:]) + b'\n')
+    os.replace(tmp_path, out_path)
+    logger.info(f"CSV sintético {out_path}: {factor} × {len(lines)} filas")
+    return out_path
+
+
+def peak_rss() -> Optional[int]:
+    """Memoria residente máxima del proceso en bytes (None si no se puede medir)"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _connect(hosts: Optional[List[str]]):
+    """Cliente para los hosts dados (el endpoint de prueba) o para la configuración de es_client"""
+    config = load_client_config()
+    if hosts:
+        config["hosts"] = hosts
+    return connect_elasticsearch(config=config)
+
+
+def run_stages(
+    dataset: Dict[str, Any],
+    hosts: Optional[List[str]],
+    batch_size: int,
+    bulk_bytes: Optional[int],
+    reader: str = "pandas"
+) -> Dict[str, Any]:
+    """Lee, limpia, serializa y envía un CSV por bloques midiendo cada etapa por separado
+
+    Repite los pasos de iter_csv_batches y _body_import: los bloques leídos
+    alimentan iter_bulk_bodies y cada cuerpo se envía al salir, así que el
+    tiempo de serialize descuenta el de leer y limpiar los bloques que
+    consumió. Con reader="arrow" parse y clean son los de read_csv_arrow
+    sobre el archivo completo. Corre en un proceso propio para que la memoria
+    máxima sea solo la de este dataset.
+    """
+    es = _connect(hosts)
+    spec = dataset["read_spec"]
+    timings = dict.fromkeys(STAGES, 0.0)
+    counts = {"rows": 0, "ndjson_bytes": 0, "errors": 0}
+
+    def arrow_frames():
+        start = time.perf_counter()
+        table = parse_csv_arrow(dataset["csv_path"], spec)
+        timings["parse"] += time.perf_counter() - start
+        start = time.perf_counter()
+        table = clean_arrow_table(table, spec)
+        timings["clean"] += time.perf_counter() - start
+        counts["rows"] += table.num_rows
+        yield from iter_arrow_batches(table, batch_size)
+
+    def frames():
+        with csv_source(dataset["csv_path"]) as csv_file:
+            reader = pd.read_csv(csv_file, encoding='latin-1', chunksize=batch_size, **read_options(spec))
+            with reader:
+                while True:
+                    start = time.perf_counter()
+                    chunk = next(reader, None)
+                    timings["parse"] += time.perf_counter() - start
+                    if chunk is None:
+                        return
+                    start = time.perf_counter()
+                    df = apply_read_spec(drop_empty_rows(drop_empty_columns(chunk)), spec)
+                    timings["clean"] += time.perf_counter() - start
+                    counts["rows"] += len(df)
+                    yield df
+
+    source = arrow_frames() if reader == "arrow" else frames()
+    bodies = iter_bulk_bodies(source, dataset["index_name"], dataset["id_field"], max_bytes=bulk_bytes,
+                              max_docs=MAX_BULK_DOCS if bulk_bytes else batch_size)
+    while True:
+        reading = timings["parse"] + timings["clean"]
+        start = time.perf_counter()
+        item = next(bodies, None)
+        timings["serialize"] += time.perf_counter() - start - (timings["parse"] + timings["clean"] - reading)
+        if item is None:
+            break
+        body, body_rows = item
+        start = time.perf_counter()
+        _, failures = send_bulk_body(es, body, rows=body_rows)
+        timings["send"] += time.perf_counter() - start
+        counts["errors"] += len(failures)
+        counts["ndjson_bytes"] += len(body)
+
+    return {**counts, "timings": timings, "peak_rss": peak_rss()}
+
+
+def run_loader(
+    dataset: Dict[str, Any],
+    hosts: Optional[List[str]],
+    batch_size: int,
+    bulk_bytes: Optional[int],
+    stream: bool,
+    reader: str = "pandas"
+) -> Dict[str, Any]:
+    """Carga completa con read_table_data e import_csv_to_elastic, como la hace main()"""
+    es = _connect(hosts)
+    start = time.perf_counter()
+    data = read_table_data(dataset["csv_path"], batch_size, stream=stream, spec=dataset["read_spec"],
+                           reader=reader)
+    success, errors = import_csv_to_elastic(es, data, dataset["index_name"], dataset["id_field"],
+                                            batch_size=batch_size, bulk_bytes=bulk_bytes, dead_letter_path=None)
+    return {"rows": success + errors, "errors": errors, "seconds": time.perf_counter() - start,
+            "peak_rss": peak_rss()}
+
+
+def _in_subprocess(fn, *args) -> Dict[str, Any]:
+    """Ejecuta fn en un proceso nuevo y retorna su resultado"""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def build_datasets(
+    tables: Optional[Sequence[str]] = None,
+    scales: Sequence[int] = (10, 100),
+    bench_dir: str = DEFAULT_BENCH_DIR
+) -> List[Dict[str, Any]]:
+    """Datasets a medir: los CSV reales disponibles (tables, todas si es None) y las copias escaladas"""
+    mappings = get_mappings()
+    datasets = []
+    for table_name in TABLES_CONFIG if tables is None else tables:
+        csv_path = resolve_csv_path(CSV_DIR, TABLES_CONFIG[table_name]["csv_file"])
+        if not os.path.exists(csv_path):
+            logger.warning(f"Omitiendo {table_name}: no se encontró {csv_path}")
+            continue
+        datasets.append({"name": table_name, "table": table_name, "csv_path": csv_path})
+    source = os.path.join(CSV_DIR, TABLES_CONFIG[SCALED_TABLE]["csv_file"])
+    for factor in scales:
+        datasets.append({"name": f"{SCALED_TABLE}_x{factor}", "table": SCALED_TABLE,
+                         "csv_path": scaled_csv(source, factor, bench_dir=bench_dir)})
+    for dataset in datasets:
+        dataset["index_name"] = f"bench_ingest_{dataset['name']}"
+        dataset["id_field"] = TABLES_CONFIG[dataset["table"]]["id_field"]
+        dataset["read_spec"] = read_spec_for_csv(dataset["csv_path"], mappings[dataset["table"]])
+        dataset["csv_bytes"] = os.path.getsize(dataset["csv_path"])
+    return datasets
+
+
+def benchmark_dataset(
+    es,
+    dataset: Dict[str, Any],
+    hosts: Optional[List[str]],
+    batch_size: int,
+    bulk_bytes: Optional[int],
+    mapping: Dict[str, Any],
+    reader: str = "pandas"
+) -> Dict[str, Any]:
+    """Etapas por separado y carga completa de un dataset con un lector, cada una en un índice recién creado"""
+    result = {"dataset": dataset["name"], "reader": reader, "csv_bytes": dataset["csv_bytes"]}
+    for phase, fn, args in (("stages", run_stages, (batch_size, bulk_bytes, reader)),
+                            ("loader", run_loader, (batch_size, bulk_bytes, True, reader))):
+        es.indices.delete(index=dataset["index_name"], ignore_unavailable=True)
+        es.indices.create(index=dataset["index_name"], body=load_time_mapping(mapping))
+        result[phase] = _in_subprocess(fn, dataset, hosts, *args)
+    es.indices.delete(index=dataset["index_name"], ignore_unavailable=True)
+    return result
+
+
+def _rate(amount: Union[int, float], seconds: float) -> float:
+    """amount por segundo (0 si no hubo tiempo medible)"""
+    return amount / seconds if seconds > 0 else 0.0
+
+
+def print_results(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """Tabla por dataset y etapa: segundos, filas/s, MB/s y memoria máxima
+
+    parse, clean y la carga completa se miden sobre los MB del CSV; serialize
+    y send sobre los MB del NDJSON. Con baseline se agrega la razón de filas/s
+    de la carga completa contra la corrida anterior.
+    """
+    previous = {(r["dataset"], r.get("reader", "pandas")): r for r in (baseline or {}).get("results", [])}
+    print(f"{'dataset':<24} {'lector':<7} {'etapa':<10} {'seg':>8} {'filas/s':>11} {'MB/s':>8} {'RSS MB':>8}")
+    for r in results:
+        name = f"{r['dataset']:<24} {r['reader']:<7}"
+        stages = r["stages"]
+        sizes = {"parse": r["csv_bytes"], "clean": r["csv_bytes"],
+                 "serialize": stages["ndjson_bytes"], "send": stages["ndjson_bytes"]}
+        rss = f"{stages['peak_rss'] / (1024 * 1024):>8.0f}" if stages["peak_rss"] else f"{'-':>8}"
+        for stage in STAGES:
+            seconds = stages["timings"][stage]
+            print(f"{name} {stage:<10} {seconds:>8.2f} {_rate(stages['rows'], seconds):>11.0f} "
+                  f"{_rate(sizes[stage], seconds) / (1024 * 1024):>8.1f} {rss}")
+        loader = r["loader"]
+        rss = f"{loader['peak_rss'] / (1024 * 1024):>8.0f}" if loader["peak_rss"] else f"{'-':>8}"
+        rows_per_s = _rate(loader["rows"], loader["seconds"])
+        line = (f"{name} {'carga':<10} {loader['seconds']:>8.2f} {rows_per_s:>11.0f} "
+                f"{_rate(r['csv_bytes'], loader['seconds']) / (1024 * 1024):>8.1f} {rss}")
+        old = previous.get((r["dataset"], r["reader"]), {}).get("loader")
+        if old and _rate(old["rows"], old["seconds"]):
+            line += f"  ({rows_per_s / _rate(old['rows'], old['seconds']):.2f}× vs {baseline.get('commit') or 'base'})"
+        print(line)
+
+
+def current_commit() -> Optional[str]:
+    """Commit actual del repositorio, para identificar la corrida"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(
+    tables: Optional[List[str]] = None,
+    scales: Sequence[int] = (10, 100),
+    batch_size: int = 1000,
+    bulk_bytes: Optional[int] = DEFAULT_BULK_BYTES,
+    live: bool = False,
+    output: Optional[str] = None,
+    baseline: Optional[str] = None,
+    bench_dir: str = DEFAULT_BENCH_DIR,
+    verbose: bool = False,
+    readers: Sequence[str] = READERS
+):
+    """Mide el rendimiento de la carga sobre los CSV reales y las copias escaladas
+
+    Sin live los lotes van a un endpoint bulk local que responde todo como
+    creado, así los números dependen solo del cargador y se pueden comparar
+    entre commits; con live se usa el cluster de la configuración de es_client.
+    Cada dataset se mide con cada lector de readers (arrow solo si está pyarrow).
+    Sin verbose el log de cada lote se omite, para que no cuente en los tiempos.
+    """
+    if not verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    server = None
+    hosts = None
+    if not live:
+        server = start_mock_cluster()
+        hosts = [f"http://127.0.0.1:{server.server_address[1]}"]
+    try:
+        es = _connect(hosts)
+        if not es:
+            return
+        mappings = get_mappings()
+        results = []
+        readers = [reader for reader in readers if reader != "arrow" or arrow_available()]
+        for dataset in build_datasets(tables, scales, bench_dir):
+            for reader in readers:
+                print(f"Midiendo {dataset['name']} ({dataset['csv_bytes'] / (1024 * 1024):.1f} MB) con {reader}",
+                      flush=True)
+                results.append(benchmark_dataset(es, dataset, hosts, batch_size, bulk_bytes,
+                                                 mappings[dataset["table"]], reader))
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    previous = None
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            previous = json.load(f)
+    print_results(results, previous)
+    run = {"commit": current_commit(), "cluster": "live" if live else "mock", "batch_size": batch_size,
+           "bulk_bytes": bulk_bytes, "results": results}
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+    return run
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Opciones de línea de comandos equivalentes a los parámetros de main()"""
+    parser = argparse.ArgumentParser(description="Mide filas/s, MB/s y memoria de cada etapa de la carga")
+    parser.add_argument("--tables", nargs="*", choices=list(TABLES_CONFIG),
+                        help="tablas reales a medir (todas por omisión; sin nombres, ninguna)")
+    parser.add_argument("--scales", nargs="*", type=int, default=[10, 100],
+                        help=f"factores de las copias escaladas de {SCALED_TABLE}")
+    parser.add_argument("--batch-size", type=int, default=1000, help="filas por bloque de lectura")
+    parser.add_argument("--bulk-mb", dest="bulk_bytes", type=parse_megabytes, default=DEFAULT_BULK_BYTES,
+                        help="tamaño objetivo de cada petición bulk en MB (0 = cortar cada --batch-size filas)")
+    parser.add_argument("--live", action="store_true",
+                        help="usar el cluster de la configuración de es_client en lugar del endpoint de prueba")
+    parser.add_argument("--output", help="guardar los resultados en este archivo JSON")
+    parser.add_argument("--baseline", help="resultados JSON de otra corrida para comparar la carga completa")
+    parser.add_argument("--bench-dir", default=DEFAULT_BENCH_DIR, help="directorio de los CSV escalados")
+    parser.add_argument("--readers", nargs="+", choices=READERS, default=list(READERS),
+                        help="lectores de CSV a comparar")
+    parser.add_argument("--verbose", action="store_true", help="mostrar el log de la carga")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(**vars(parse_args()))
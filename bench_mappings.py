@@ -0,0 +1,147 @@
+import argparse
+import logging
+import os
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+from bigdata_final import (
+    CSV_DIR,
+    TABLES_CONFIG,
+    get_mappings,
+    import_csv_to_elastic,
+    process_csv_data,
+)
+from csv_input import resolve_csv_path
+from csv_schema import read_spec_for_csv
+from es_client import connect_elasticsearch
+from index_lifecycle import load_time_mapping
+from mapping_registry import MAPPING_PROFILES
+
+logger = logging.getLogger(__name__)
+
+# Tablas INE que se comparan (ine_seccion solo si su CSV está disponible)
+DEFAULT_TABLES = ["ine_entidad_2020", "ine_distrito_2020", "ine_seccion_2020"]
+
+
+def benchmark_aggs(properties: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Agregaciones representativas sobre las métricas del índice (las que existan en el mapping)"""
+    aggs = {
+        "stats_pobtot": {"stats": {"field": "POBTOT"}},
+        "sum_vivtot": {"sum": {"field": "VIVTOT"}},
+        "avg_graproes": {"avg": {"field": "GRAPROES"}},
+        "pct_rel_h_m": {"percentiles": {"field": "REL_H_M", "percents": [25, 50, 75]}},
+        "avg_prom_ocup": {"avg": {"field": "PROM_OCUP"}},
+    }
+    aggs = {name: agg for name, agg in aggs.items() if next(iter(agg.values()))["field"] in properties}
+    entity_field = next((field for field in ("ENTIDAD", "ENT") if field in properties), None)
+    if entity_field:
+        aggs["por_entidad"] = {
+            "terms": {"field": entity_field, "size": 40},
+            "aggs": {"pob_media": {"avg": {"field": "POBTOT"}}, "p_60ymas": {"sum": {"field": "P_60YMAS"}}}
+        }
+    return aggs
+
+
+def measure_aggs(es, index_name: str, aggs: Dict[str, Any], repeats: int, warmup: int = 3) -> Dict[str, float]:
+    """Mediana de latencia (cliente y 'took' del servidor) de la búsqueda de agregaciones, sin caché"""
+    wall = []
+    took = []
+    for i in range(warmup + repeats):
+        start = time.perf_counter()
+        response = es.search(index=index_name, size=0, aggs=aggs, request_cache=False)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            wall.append(elapsed * 1000)
+            took.append(response["took"])
+    return {"wall_ms": statistics.median(wall), "took_ms": statistics.median(took)}
+
+
+def store_size(es, index_name: str) -> int:
+    """Tamaño en disco de los shards primarios del índice"""
+    stats = es.indices.stats(index=index_name, metric="store")
+    return stats["indices"][index_name]["primaries"]["store"]["size_in_bytes"]
+
+
+def benchmark_table(es, table_name: str, profile: str, mapping: Dict[str, Any], repeats: int) -> Optional[Dict[str, Any]]:
+    """Carga la tabla en un índice temporal con el perfil dado y mide tamaño y agregaciones"""
+    config = TABLES_CONFIG[table_name]
+    csv_path = resolve_csv_path(CSV_DIR, config["csv_file"])
+    index_name = f"bench_{table_name}_{profile}"
+
+    if es.indices.exists(index=index_name):
+        es.indices.delete(index=index_name)
+    es.indices.create(index=index_name, body=load_time_mapping(mapping))
+
+    df = process_csv_data(csv_path, read_spec_for_csv(csv_path, mapping))
+    if df is None:
+        return None
+    start = time.perf_counter()
+    success, errors = import_csv_to_elastic(es, df, index_name, config.get("id_field"), batch_size=1000)
+    load_time = time.perf_counter() - start
+
+    # Un solo segmento para que el tamaño no dependa del momento de los merges
+    es.indices.refresh(index=index_name)
+    es.indices.forcemerge(index=index_name, max_num_segments=1)
+    es.indices.refresh(index=index_name)
+
+    properties = mapping["mappings"]["properties"]
+    result = {
+        "table": table_name,
+        "profile": profile,
+        "docs": es.count(index=index_name)["count"],
+        "errors": errors,
+        "load_s": load_time,
+        "size_bytes": store_size(es, index_name),
+    }
+    result.update(measure_aggs(es, index_name, benchmark_aggs(properties), repeats))
+    return result
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    """Tabla comparativa por tabla y perfil"""
+    print(f"{'tabla':<20} {'perfil':<8} {'docs':>7} {'errores':>7} {'carga s':>8} "
+          f"{'tamaño KB':>10} {'aggs ms':>8} {'took ms':>8}")
+    baseline = {}
+    for r in results:
+        baseline.setdefault(r["table"], r["size_bytes"])
+        ratio = r["size_bytes"] / baseline[r["table"]] if baseline[r["table"]] else 0
+        print(f"{r['table']:<20} {r['profile']:<8} {r['docs']:>7} {r['errors']:>7} {r['load_s']:>8.2f} "
+              f"{r['size_bytes'] / 1024:>10.1f} {r['wall_ms']:>8.2f} {r['took_ms']:>8.1f}  ({ratio:.0%})")
+
+
+def main(tables: Optional[List[str]] = None, repeats: int = 20, keep: bool = False):
+    """Compara el perfil de mapping por defecto contra el compacto sobre los CSV reales"""
+    es = connect_elasticsearch()
+    if not es:
+        return
+
+    mappings = {profile: get_mappings(profile) for profile in MAPPING_PROFILES}
+    results = []
+    for table_name in tables or DEFAULT_TABLES:
+        csv_path = resolve_csv_path(CSV_DIR, TABLES_CONFIG[table_name]["csv_file"])
+        if not os.path.exists(csv_path):
+            logger.warning(f"Omitiendo {table_name}: no se encontró {csv_path}")
+            continue
+        for profile in MAPPING_PROFILES:
+            result = benchmark_table(es, table_name, profile, mappings[profile][table_name], repeats)
+            if result:
+                results.append(result)
+            if not keep:
+                es.indices.delete(index=f"bench_{table_name}_{profile}", ignore_unavailable=True)
+
+    print_results(results)
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Opciones de línea de comandos equivalentes a los parámetros de main()"""
+    parser = argparse.ArgumentParser(description="Compara tamaño de índice y latencia de agregaciones por perfil de mapping")
+    parser.add_argument("--tables", nargs="+", choices=DEFAULT_TABLES, help="tablas a comparar")
+    parser.add_argument("--repeats", type=int, default=20, help="repeticiones medidas de cada búsqueda")
+    parser.add_argument("--keep", action="store_true", help="conservar los índices bench_* al terminar")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(**vars(parse_args()))
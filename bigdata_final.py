@@ -1,9 +1,64 @@
 import pandas as pd
-from elasticsearch import Elasticsearch, helpers
+from elasticsearch import helpers
+import argparse
 import os
 import logging
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+
+from arrow_reader import READERS, arrow_available, iter_arrow_batches, read_csv_arrow
+from bulk_controller import AdaptiveBulkController
+from checkpoints import DEFAULT_JOURNAL_PATH, get_checkpoint, input_fingerprint, save_checkpoint
+from csv_cache import DEFAULT_CACHE_DIR, cached_table, iter_cached_batches, table_to_pandas
+from csv_input import csv_compression, csv_source, resolve_csv_path
+from csv_schema import apply_read_spec, category_columns, read_options, read_spec_for_csv, spec_key
+from dead_letter import DEFAULT_DEAD_LETTER_PATH, FAILED_AT_FORMAT, action_failure, entries_body, write_dead_letters
+from delta_manifest import (
+    DEFAULT_MANIFEST_PATH,
+    changed_actions,
+    delete_actions,
+    load_hashes,
+    open_manifest,
+    save_hashes,
+    summarize_delta,
+)
+from es_client import connect_elasticsearch
+from index_lifecycle import (
+    finalize_index,
+    load_time_mapping,
+    new_version_name,
+    outdated_indices,
+    prepare_for_bulk,
+    production_settings,
+    prune_versions,
+    swap_alias,
+    with_id_meta,
+)
+from ingest_utils import (
+    DEFAULT_BULK_BYTES,
+    MAX_BULK_DOCS,
+    RETRYABLE_STATUSES,
+    actions_body,
+    build_actions,
+    count_csv_range_rows,
+    drop_empty_columns,
+    drop_empty_rows,
+    find_invalid_ids,
+    frame_rows,
+    iter_batches,
+    iter_bulk_bodies,
+    iter_csv_batches,
+    probe_csv_dtypes,
+    read_id_frame,
+    send_bulk_body,
+    serialize_csv_range,
+    split_csv_ranges,
+)
+from load_verification import verify_tables
+from mapping_registry import MAPPING_PROFILES, cached_numeric_ranges, compact_mapping, load_mappings, mapping_profile
 
 # logging
 logging.basicConfig(
@@ -16,857 +71,112 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def connect_elasticsearch():
-    """Establece conexión con Elasticsearch"""
-    try:
-        es = Elasticsearch("http://localhost:9200")
-        
-        if es.ping():
-            logger.info("Conexión a Elasticsearch establecida")
-            return es
-        else:
-            logger.error("No se pudo establecer conexión con Elasticsearch")
-            return None
-    except Exception as e:
-        logger.error(f"Error al conectar con Elasticsearch: {str(e)}")
-        return None
+# Configuración de tablas y archivos CSV
+# id_field: columna o columnas (en orden) que forman el _id; las claves de
+# distrito y sección solo son únicas dentro de su entidad
+# reader: lector del CSV, "pandas" (por omisión) o "arrow" (ver arrow_reader)
+# entity_field: columna de la entidad federativa con que se verifica la carga
+# csv_file puede estar comprimido (.gz o .zst) y se descomprime al leerlo; si
+# el CSV plano no existe se usa su versión comprimida (ver csv_input)
+TABLES_CONFIG = {
+    "cat_distrito_2020": {
+        "csv_file": "cat_distritos_2020.csv",
+        "id_field": ["CVE_ENT", "CVE_DISTRITO"],
+        "entity_field": "CVE_ENT"
+    },
+    "cat_seccion_2020": {
+        "csv_file": "cat_secciones_2020.csv",
+        "id_field": ["CVE_ENT", "CVE_SECCION"],
+        "entity_field": "CVE_ENT",
+        "reader": "arrow"
+    },
+    "ine_distrito_2020": {
+        "csv_file": "INE_DISTRITO_2020.CSV",
+        "id_field": ["ENTIDAD", "DISTRITO"],
+        "entity_field": "ENTIDAD",
+        "reader": "arrow"
+    },
+    "ine_entidad_2020": {
+        "csv_file": "INE_ENTIDAD_2020.CSV",
+        "id_field": ["ENT"],
+        "entity_field": "ENT",
+        "reader": "arrow"
+    },
+    "ine_seccion_2020": {
+        "csv_file": "INE_SECCION_2020.csv",
+        "id_field": ["ENTIDAD", "ID"],
+        "entity_field": "ENTIDAD",
+        "reader": "arrow"
+    }
+}
+
+# Directorio donde se encuentran los CSV
+CSV_DIR = "./eceg_2020_csv/"
 
 
 # mappings (resumidos por brevedad)
-def get_mappings():
-    """Retorna los mappings para todos los índices"""
-    
-    # Configuración común para todos los índices
-    index_settings = {
-        "settings": {
-            "number_of_shards": 1,
-            "number_of_replicas": 1,
-            "refresh_interval": "5s",
-            "analysis": {
-                "analyzer": {
-                    "spanish_analyzer": {"type": "spanish"}
-                }
-            }
-        }
-    }
-    
-    # Mapping CAT_DISTRITO_2020
-    cat_distrito_mapping = {
-        "mappings": {
-            "properties": {
-                "CVE_ENT": {"type": "keyword"},
-                "DESC_ENT": {
-                    "type": "text",
-                    "analyzer": "spanish_analyzer",
-                    "fields": {"keyword": {"type": "keyword"}}
-                },
-                "CVE_DISTRITO": {"type": "keyword"},
-                "DESC_DISTRITO": {
-                    "type": "text",
-                    "analyzer": "spanish_analyzer",
-                    "fields": {"keyword": {"type": "keyword"}}
-                }
-            }
-        }
-    }
-    cat_distrito_mapping.update(index_settings)
-    
-    # Mapping CAT_SECCION_2020
-    cat_seccion_mapping = {
-        "mappings": {
-            "properties": {
-                "CVE_ENT": {"type": "keyword"},
-                "CVE_DISTRITO": {"type": "keyword"},
-                "CVE_MUN": {"type": "keyword"},
-                "DESC_MUN": {
-                    "type": "text", 
-                    "analyzer": "spanish_analyzer",
-                    "fields": {"keyword": {"type": "keyword"}}
-                },
-                "CVE_SECCION": {"type": "keyword"},
-                "DESC_SECCION": {
-                    "type": "text",
-                    "analyzer": "spanish_analyzer",
-                    "fields": {"keyword": {"type": "keyword"}}
-                }
-            }
-        }
-    }
-    cat_seccion_mapping.update(index_settings)
-    
-    # Mapping INE_DISTRITO_2020
-    ine_distrito_mapping = {
-    "mappings": {
-        "properties": {
-            "ENTIDAD": {"type": "keyword"},
-            "NOM_ENT": {
-                "type": "text",
-                "fields": {
-                    "keyword": {"type": "keyword"}
-                }
-            },
-            "DISTRITO": {"type": "keyword"},
-            "INDIGENA": {"type": "keyword"},
-            "COMPLEJIDA": {"type": "keyword"},
-            
-            "POBTOT": {"type": "integer"},
-            "POBFEM": {"type": "integer"},
-            "POBMAS": {"type": "integer"},
-            
-            "P_0A2": {"type": "integer"},
-            "P_0A2_F": {"type": "integer"},
-            "P_0A2_M": {"type": "integer"},
-            "P_0A17": {"type": "integer"},
-            "P_3YMAS": {"type": "integer"},
-            "P_3YMAS_F": {"type": "integer"},
-            "P_3YMAS_M": {"type": "integer"},
-            "P_5YMAS": {"type": "integer"},
-            "P_5YMAS_F": {"type": "integer"},
-            "P_5YMAS_M": {"type": "integer"},
-            "P_12YMAS": {"type": "integer"},
-            "P_12YMAS_F": {"type": "integer"},
-            "P_12YMAS_M": {"type": "integer"},
-            "P_15YMAS": {"type": "integer"},
-            "P_15YMAS_F": {"type": "integer"},
-            "P_15YMAS_M": {"type": "integer"},
-            "P_18YMAS": {"type": "integer"},
-            "P_18YMAS_F": {"type": "integer"},
-            "P_18YMAS_M": {"type": "integer"},
-            "P_3A5": {"type": "integer"},
-            "P_3A5_F": {"type": "integer"},
-            "P_3A5_M": {"type": "integer"},
-            "P_6A11": {"type": "integer"},
-            "P_6A11_F": {"type": "integer"},
-            "P_6A11_M": {"type": "integer"},
-            "P_8A14": {"type": "integer"},
-            "P_8A14_F": {"type": "integer"},
-            "P_8A14_M": {"type": "integer"},
-            "P_12A14": {"type": "integer"},
-            "P_12A14_F": {"type": "integer"},
-            "P_12A14_M": {"type": "integer"},
-            "P_15A17": {"type": "integer"},
-            "P_15A17_F": {"type": "integer"},
-            "P_15A17_M": {"type": "integer"},
-            "P_18A24": {"type": "integer"},
-            "P_18A24_F": {"type": "integer"},
-            "P_18A24_M": {"type": "integer"},
-            "P_15A49_F": {"type": "integer"},
-            "P_60YMAS": {"type": "integer"},
-            "P_60YMAS_F": {"type": "integer"},
-            "P_60YMAS_M": {"type": "integer"},
-            
-            "REL_H_M": {"type": "float"},
-            "POB0_14": {"type": "integer"},
-            "POB15_64": {"type": "integer"},
-            "POB65_MAS": {"type": "integer"},
-            "POB_EDADNE": {"type": "integer"},
-            "PROM_HNV": {"type": "float"},
-            
-            "PNACENT": {"type": "integer"},
-            "PNACENT_F": {"type": "integer"},
-            "PNACENT_M": {"type": "integer"},
-            "PNACOE": {"type": "integer"},
-            "PNACOE_F": {"type": "integer"},
-            "PNACOE_M": {"type": "integer"},
-            "PRES2015": {"type": "integer"},
-            "PRES2015_F": {"type": "integer"},
-            "PRES2015_M": {"type": "integer"},
-            "PRESOE15": {"type": "integer"},
-            "PRESOE15_F": {"type": "integer"},
-            "PRESOE15_M": {"type": "integer"},
-            
-            "P3YM_HLI": {"type": "integer"},
-            "P3YM_HLI_F": {"type": "integer"},
-            "P3YM_HLI_M": {"type": "integer"},
-            "P3HLINHE": {"type": "integer"},
-            "P3HLINHE_F": {"type": "integer"},
-            "P3HLINHE_M": {"type": "integer"},
-            "P3HLI_HE": {"type": "integer"},
-            "P3HLI_HE_F": {"type": "integer"},
-            "P3HLI_HE_M": {"type": "integer"},
-            "P5_HLI": {"type": "integer"},
-            "P5_HLI_NHE": {"type": "integer"},
-            "P5_HLI_HE": {"type": "integer"},
-            "PHOG_IND": {"type": "integer"},
-            "POB_AFRO": {"type": "integer"},
-            "POB_AFRO_F": {"type": "integer"},
-            "POB_AFRO_M": {"type": "integer"},
-            
-            "PCON_DISC": {"type": "integer"},
-            "PCDISC_MOT": {"type": "integer"},
-            "PCDISC_VIS": {"type": "integer"},
-            "PCDISC_LEN": {"type": "integer"},
-            "PCDISC_AUD": {"type": "integer"},
-            "PCDISC_M_A": {"type": "integer"},
-            "PCDISC_MEN": {"type": "integer"},
-            "PCON_LIMI": {"type": "integer"},
-            "PCLIM_CSB": {"type": "integer"},
-            "PCLIM_VIS": {"type": "integer"},
-            "PCLIM_HACO": {"type": "integer"},
-            "PCLIM_OAUD": {"type": "integer"},
-            "PCLIM_MOT2": {"type": "integer"},
-            "PCLIM_RE_C": {"type": "integer"},
-            "PCLIM_PMEN": {"type": "integer"},
-            "PSIND_LIM": {"type": "integer"},
-            
-            "P3A5_NOA": {"type": "integer"},
-            "P3A5_NOA_F": {"type": "integer"},
-            "P3A5_NOA_M": {"type": "integer"},
-            "P6A11_NOA": {"type": "integer"},
-            "P6A11_NOAF": {"type": "integer"},
-            "P6A11_NOAM": {"type": "integer"},
-            "P12A14NOA": {"type": "integer"},
-            "P12A14NOAF": {"type": "integer"},
-            "P12A14NOAM": {"type": "integer"},
-            "P15A17A": {"type": "integer"},
-            "P15A17A_F": {"type": "integer"},
-            "P15A17A_M": {"type": "integer"},
-            "P18A24A": {"type": "integer"},
-            "P18A24A_F": {"type": "integer"},
-            "P18A24A_M": {"type": "integer"},
-            "P8A14AN": {"type": "integer"},
-            "P8A14AN_F": {"type": "integer"},
-            "P8A14AN_M": {"type": "integer"},
-            "P15YM_AN": {"type": "integer"},
-            "P15YM_AN_F": {"type": "integer"},
-            "P15YM_AN_M": {"type": "integer"},
-            "P15YM_SE": {"type": "integer"},
-            "P15YM_SE_F": {"type": "integer"},
-            "P15YM_SE_M": {"type": "integer"},
-            "P15PRI_IN": {"type": "integer"},
-            "P15PRI_INF": {"type": "integer"},
-            "P15PRI_INM": {"type": "integer"},
-            "P15PRI_CO": {"type": "integer"},
-            "P15PRI_COF": {"type": "integer"},
-            "P15PRI_COM": {"type": "integer"},
-            "P15SEC_IN": {"type": "integer"},
-            "P15SEC_INF": {"type": "integer"},
-            "P15SEC_INM": {"type": "integer"},
-            "P15SEC_CO": {"type": "integer"},
-            "P15SEC_COF": {"type": "integer"},
-            "P15SEC_COM": {"type": "integer"},
-            "P18YM_PB": {"type": "integer"},
-            "P18YM_PB_F": {"type": "integer"},
-            "P18YM_PB_M": {"type": "integer"},
-            "GRAPROES": {"type": "float"},
-            "GRAPROES_F": {"type": "float"},
-            "GRAPROES_M": {"type": "float"},
-            
-            "PEA": {"type": "integer"},
-            "PEA_F": {"type": "integer"},
-            "PEA_M": {"type": "integer"},
-            "PE_INAC": {"type": "integer"},
-            "PE_INAC_F": {"type": "integer"},
-            "PE_INAC_M": {"type": "integer"},
-            "POCUPADA": {"type": "integer"},
-            "POCUPADA_F": {"type": "integer"},
-            "POCUPADA_M": {"type": "integer"},
-            "PDESOCUP": {"type": "integer"},
-            "PDESOCUP_F": {"type": "integer"},
-            "PDESOCUP_M": {"type": "integer"},
-            
-            "PSINDER": {"type": "integer"},
-            "PDER_SS": {"type": "integer"},
-            "PDER_IMSS": {"type": "integer"},
-            "PDER_ISTE": {"type": "integer"},
-            "PDER_ISTEE": {"type": "integer"},
-            "PAFIL_PDOM": {"type": "integer"},
-            "PDER_SEGP": {"type": "integer"},
-            "PDER_IMSSB": {"type": "integer"},
-            "PAFIL_IPRI": {"type": "integer"},
-            "PAFIL_OTRA": {"type": "integer"},
-            
-            "P12YM_CASA": {"type": "integer"},
-            "P12YM_SEPA": {"type": "integer"},
-            
-            "TOTHOG": {"type": "integer"},
-            "HOGJEF_F": {"type": "integer"},
-            "HOGJEF_M": {"type": "integer"},
-            "POBHOG": {"type": "integer"},
-            "PHOGJEF_F": {"type": "integer"},
-            "PHOGJEF_M": {"type": "integer"},
-            
-            "VIVTOT": {"type": "integer"},
-            "TVIVHAB": {"type": "integer"},
-            "TVIVPAR": {"type": "integer"},
-            "VIVPAR_HAB": {"type": "integer"},
-            "VIVPARH_CV": {"type": "integer"},
-            "TVIVPARHAB": {"type": "integer"},
-            "VIVPAR_DES": {"type": "integer"},
-            "VIVPAR_UT": {"type": "integer"},
-            "OCUPVIVPAR": {"type": "integer"},
-            "PROM_OCUP": {"type": "float"},
-            "PRO_OCUP_C": {"type": "float"},
-            
-            "VPH_PISODT": {"type": "integer"},
-            "VPH_PISOTI": {"type": "integer"},
-            "VPH_1DOR": {"type": "integer"},
-            "VPH_2YMASD": {"type": "integer"},
-            "VPH_1CUART": {"type": "integer"},
-            "VPH_2CUART": {"type": "integer"},
-            "VPH_3YMASC": {"type": "integer"},
-            
-            "VPH_C_ELEC": {"type": "integer"},
-            "VPH_S_ELEC": {"type": "integer"},
-            "VPH_AGUADV": {"type": "integer"},
-            "VPH_AEASP": {"type": "integer"},
-            "VPH_AGUAFV": {"type": "integer"},
-            "VPH_TINACO": {"type": "integer"},
-            "VPH_CISTER": {"type": "integer"},
-            "VPH_EXCSA": {"type": "integer"},
-            "VPH_LETR": {"type": "integer"},
-            "VPH_DRENAJ": {"type": "integer"},
-            "VPH_NODREN": {"type": "integer"},
-            "VPH_C_SERV": {"type": "integer"},
-            "VPH_NDEAED": {"type": "integer"},
-            "VPH_DSADMA": {"type": "integer"},
-            "VPH_NDACMM": {"type": "integer"},
-            
-            "VPH_SNBIEN": {"type": "integer"},
-            "VPH_REFRI": {"type": "integer"},
-            "VPH_LAVAD": {"type": "integer"},
-            "VPH_HMICRO": {"type": "integer"},
-            "VPH_AUTOM": {"type": "integer"},
-            "VPH_MOTO": {"type": "integer"},
-            "VPH_BICI": {"type": "integer"},
-            "VPH_RADIO": {"type": "integer"},
-            "VPH_TV": {"type": "integer"},
-            "VPH_PC": {"type": "integer"},
-            "VPH_TELEF": {"type": "integer"},
-            "VPH_CEL": {"type": "integer"},
-            "VPH_INTER": {"type": "integer"},
-            "VPH_STVP": {"type": "integer"},
-            "VPH_SPMVPI": {"type": "integer"},
-            "VPH_CVJ": {"type": "integer"},
-            "VPH_SINRTV": {"type": "integer"},
-            "VPH_SINLTC": {"type": "integer"},
-            "VPH_SINCIN": {"type": "integer"},
-            "VPH_SINTIC": {"type": "integer"}
-            }
-        }
-    }
-    ine_distrito_mapping.update(index_settings)
+def get_mappings(profile: str = "default"):
+    """Retorna los mappings para todos los índices
 
-    # Mapping INE_ENTIDAD_2020
-    ine_entidad_mapping = {
-    "mappings": {
-        "properties": {
-            "ENT": {"type": "keyword"},  # Clave de entidad
-            "NOM_ENT": {
-                "type": "text",
-                "fields": {
-                    "keyword": {"type": "keyword"}
-                }
-            },
-            "POBTOT": {"type": "integer"},
-            "POBFEM": {"type": "integer"},
-            "POBMAS": {"type": "integer"},
-            
-            "P_0A2": {"type": "integer"},
-            "P_0A2_F": {"type": "integer"},
-            "P_0A2_M": {"type": "integer"},
-            "P_0A17": {"type": "integer"},
-            "P_3YMAS": {"type": "integer"},
-            "P_3YMAS_F": {"type": "integer"},
-            "P_3YMAS_M": {"type": "integer"},
-            "P_5YMAS": {"type": "integer"},
-            "P_5YMAS_F": {"type": "integer"},
-            "P_5YMAS_M": {"type": "integer"},
-            "P_12YMAS": {"type": "integer"},
-            "P_12YMAS_F": {"type": "integer"},
-            "P_12YMAS_M": {"type": "integer"},
-            "P_15YMAS": {"type": "integer"},
-            "P_15YMAS_F": {"type": "integer"},
-            "P_15YMAS_M": {"type": "integer"},
-            "P_18YMAS": {"type": "integer"},
-            "P_18YMAS_F": {"type": "integer"},
-            "P_18YMAS_M": {"type": "integer"},
-            "P_3A5": {"type": "integer"},
-            "P_3A5_F": {"type": "integer"},
-            "P_3A5_M": {"type": "integer"},
-            "P_6A11": {"type": "integer"},
-            "P_6A11_F": {"type": "integer"},
-            "P_6A11_M": {"type": "integer"},
-            "P_8A14": {"type": "integer"},
-            "P_8A14_F": {"type": "integer"},
-            "P_8A14_M": {"type": "integer"},
-            "P_12A14": {"type": "integer"},
-            "P_12A14_F": {"type": "integer"},
-            "P_12A14_M": {"type": "integer"},
-            "P_15A17": {"type": "integer"},
-            "P_15A17_F": {"type": "integer"},
-            "P_15A17_M": {"type": "integer"},
-            "P_18A24": {"type": "integer"},
-            "P_18A24_F": {"type": "integer"},
-            "P_18A24_M": {"type": "integer"},
-            "P_15A49_F": {"type": "integer"},
-            "P_60YMAS": {"type": "integer"},
-            "P_60YMAS_F": {"type": "integer"},
-            "P_60YMAS_M": {"type": "integer"},
-            
-            "REL_H_M": {"type": "float"},
-            "POB0_14": {"type": "integer"},
-            "POB15_64": {"type": "integer"},
-            "POB65_MAS": {"type": "integer"},
-            "POB_EDADNE": {"type": "integer"},
-            "PROM_HNV": {"type": "float"},
-            
-            "PNACENT": {"type": "integer"},
-            "PNACENT_F": {"type": "integer"},
-            "PNACENT_M": {"type": "integer"},
-            "PNACOE": {"type": "integer"},
-            "PNACOE_F": {"type": "integer"},
-            "PNACOE_M": {"type": "integer"},
-            "PRES2015": {"type": "integer"},
-            "PRES2015_F": {"type": "integer"},
-            "PRES2015_M": {"type": "integer"},
-            "PRESOE15": {"type": "integer"},
-            "PRESOE15_F": {"type": "integer"},
-            "PRESOE15_M": {"type": "integer"},
-            
-            "P3YM_HLI": {"type": "integer"},
-            "P3YM_HLI_F": {"type": "integer"},
-            "P3YM_HLI_M": {"type": "integer"},
-            "P3HLINHE": {"type": "integer"},
-            "P3HLINHE_F": {"type": "integer"},
-            "P3HLINHE_M": {"type": "integer"},
-            "P3HLI_HE": {"type": "integer"},
-            "P3HLI_HE_F": {"type": "integer"},
-            "P3HLI_HE_M": {"type": "integer"},
-            "P5_HLI": {"type": "integer"},
-            "P5_HLI_NHE": {"type": "integer"},
-            "P5_HLI_HE": {"type": "integer"},
-            "PHOG_IND": {"type": "integer"},
-            "POB_AFRO": {"type": "integer"},
-            "POB_AFRO_F": {"type": "integer"},
-            "POB_AFRO_M": {"type": "integer"},
-            
-            "PCON_DISC": {"type": "integer"},
-            "PCDISC_MOT": {"type": "integer"},
-            "PCDISC_VIS": {"type": "integer"},
-            "PCDISC_LEN": {"type": "integer"},
-            "PCDISC_AUD": {"type": "integer"},
-            "PCDISC_M_A": {"type": "integer"},
-            "PCDISC_MEN": {"type": "integer"},
-            "PCON_LIMI": {"type": "integer"},
-            "PCLIM_CSB": {"type": "integer"},
-            "PCLIM_VIS": {"type": "integer"},
-            "PCLIM_HACO": {"type": "integer"},
-            "PCLIM_OAUD": {"type": "integer"},
-            "PCLIM_MOT2": {"type": "integer"},
-            "PCLIM_RE_C": {"type": "integer"},
-            "PCLIM_PMEN": {"type": "integer"},
-            "PSIND_LIM": {"type": "integer"},
-            
-            "P3A5_NOA": {"type": "integer"},
-            "P3A5_NOA_F": {"type": "integer"},
-            "P3A5_NOA_M": {"type": "integer"},
-            "P6A11_NOA": {"type": "integer"},
-            "P6A11_NOAF": {"type": "integer"},
-            "P6A11_NOAM": {"type": "integer"},
-            "P12A14NOA": {"type": "integer"},
-            "P12A14NOAF": {"type": "integer"},
-            "P12A14NOAM": {"type": "integer"},
-            "P15A17A": {"type": "integer"},
-            "P15A17A_F": {"type": "integer"},
-            "P15A17A_M": {"type": "integer"},
-            "P18A24A": {"type": "integer"},
-            "P18A24A_F": {"type": "integer"},
-            "P18A24A_M": {"type": "integer"},
-            "P8A14AN": {"type": "integer"},
-            "P8A14AN_F": {"type": "integer"},
-            "P8A14AN_M": {"type": "integer"},
-            "P15YM_AN": {"type": "integer"},
-            "P15YM_AN_F": {"type": "integer"},
-            "P15YM_AN_M": {"type": "integer"},
-            "P15YM_SE": {"type": "integer"},
-            "P15YM_SE_F": {"type": "integer"},
-            "P15YM_SE_M": {"type": "integer"},
-            "P15PRI_IN": {"type": "integer"},
-            "P15PRI_INF": {"type": "integer"},
-            "P15PRI_INM": {"type": "integer"},
-            "P15PRI_CO": {"type": "integer"},
-            "P15PRI_COF": {"type": "integer"},
-            "P15PRI_COM": {"type": "integer"},
-            "P15SEC_IN": {"type": "integer"},
-            "P15SEC_INF": {"type": "integer"},
-            "P15SEC_INM": {"type": "integer"},
-            "P15SEC_CO": {"type": "integer"},
-            "P15SEC_COF": {"type": "integer"},
-            "P15SEC_COM": {"type": "integer"},
-            "P18YM_PB": {"type": "integer"},
-            "P18YM_PB_F": {"type": "integer"},
-            "P18YM_PB_M": {"type": "integer"},
-            "GRAPROES": {"type": "float"},
-            "GRAPROES_F": {"type": "float"},
-            "GRAPROES_M": {"type": "float"},
-            
-            "PEA": {"type": "integer"},
-            "PEA_F": {"type": "integer"},
-            "PEA_M": {"type": "integer"},
-            "PE_INAC": {"type": "integer"},
-            "PE_INAC_F": {"type": "integer"},
-            "PE_INAC_M": {"type": "integer"},
-            "POCUPADA": {"type": "integer"},
-            "POCUPADA_F": {"type": "integer"},
-            "POCUPADA_M": {"type": "integer"},
-            "PDESOCUP": {"type": "integer"},
-            "PDESOCUP_F": {"type": "integer"},
-            "PDESOCUP_M": {"type": "integer"},
-            
-            "PSINDER": {"type": "integer"},
-            "PDER_SS": {"type": "integer"},
-            "PDER_IMSS": {"type": "integer"},
-            "PDER_ISTE": {"type": "integer"},
-            "PDER_ISTEE": {"type": "integer"},
-            "PAFIL_PDOM": {"type": "integer"},
-            "PDER_SEGP": {"type": "integer"},
-            "PDER_IMSSB": {"type": "integer"},
-            "PAFIL_IPRI": {"type": "integer"},
-            "PAFIL_OTRA": {"type": "integer"},
-            
-            "P12YM_CASA": {"type": "integer"},
-            "P12YM_SEPA": {"type": "integer"},
-            
-            "TOTHOG": {"type": "integer"},
-            "HOGJEF_F": {"type": "integer"},
-            "HOGJEF_M": {"type": "integer"},
-            "POBHOG": {"type": "integer"},
-            "PHOGJEF_F": {"type": "integer"},
-            "PHOGJEF_M": {"type": "integer"},
-            
-            "VIVTOT": {"type": "integer"},
-            "TVIVHAB": {"type": "integer"},
-            "TVIVPAR": {"type": "integer"},
-            "VIVPAR_HAB": {"type": "integer"},
-            "VIVPARH_CV": {"type": "integer"},
-            "TVIVPARHAB": {"type": "integer"},
-            "VIVPAR_DES": {"type": "integer"},
-            "VIVPAR_UT": {"type": "integer"},
-            "OCUPVIVPAR": {"type": "integer"},
-            "PROM_OCUP": {"type": "float"},
-            "PRO_OCUP_C": {"type": "float"},
-            
-            "VPH_PISODT": {"type": "integer"},
-            "VPH_PISOTI": {"type": "integer"},
-            "VPH_1DOR": {"type": "integer"},
-            "VPH_2YMASD": {"type": "integer"},
-            "VPH_1CUART": {"type": "integer"},
-            "VPH_2CUART": {"type": "integer"},
-            "VPH_3YMASC": {"type": "integer"},
-            
-            "VPH_C_ELEC": {"type": "integer"},
-            "VPH_S_ELEC": {"type": "integer"},
-            "VPH_AGUADV": {"type": "integer"},
-            "VPH_AEASP": {"type": "integer"},
-            "VPH_AGUAFV": {"type": "integer"},
-            "VPH_TINACO": {"type": "integer"},
-            "VPH_CISTER": {"type": "integer"},
-            "VPH_EXCSA": {"type": "integer"},
-            "VPH_LETR": {"type": "integer"},
-            "VPH_DRENAJ": {"type": "integer"},
-            "VPH_NODREN": {"type": "integer"},
-            "VPH_C_SERV": {"type": "integer"},
-            "VPH_NDEAED": {"type": "integer"},
-            "VPH_DSADMA": {"type": "integer"},
-            "VPH_NDACMM": {"type": "integer"},
-            
-            "VPH_SNBIEN": {"type": "integer"},
-            "VPH_REFRI": {"type": "integer"},
-            "VPH_LAVAD": {"type": "integer"},
-            "VPH_HMICRO": {"type": "integer"},
-            "VPH_AUTOM": {"type": "integer"},
-            "VPH_MOTO": {"type": "integer"},
-            "VPH_BICI": {"type": "integer"},
-            "VPH_RADIO": {"type": "integer"},
-            "VPH_TV": {"type": "integer"},
-            "VPH_PC": {"type": "integer"},
-            "VPH_TELEF": {"type": "integer"},
-            "VPH_CEL": {"type": "integer"},
-            "VPH_INTER": {"type": "integer"},
-            "VPH_STVP": {"type": "integer"},
-            "VPH_SPMVPI": {"type": "integer"},
-            "VPH_CVJ": {"type": "integer"},
-            "VPH_SINRTV": {"type": "integer"},
-            "VPH_SINLTC": {"type": "integer"},
-            "VPH_SINCIN": {"type": "integer"},
-            "VPH_SINTIC": {"type": "integer"}
-            }
-        }
-    }
-    ine_entidad_mapping.update(index_settings)
+    Los de las tablas INE se generan de los descriptores del ECEG en CSV_DIR
+    (ver mapping_registry) y se construyen una sola vez por proceso. Con
+    profile="compact" los tipos numéricos se ajustan al rango observado en cada
+    CSV y las métricas que solo se agregan quedan sin índice; los rangos se
+    guardan y solo se vuelven a leer del CSV cuando el archivo cambia.
+    El _meta de cada mapping guarda las columnas del _id de la tabla.
+    """
+    if profile not in MAPPING_PROFILES:
+        raise ValueError(f"Perfil de mapping desconocido: {profile}")
+    mappings = load_mappings(CSV_DIR)
+    if profile == "compact":
+        for index_name, mapping in mappings.items():
+            csv_path = resolve_csv_path(CSV_DIR, TABLES_CONFIG[index_name]["csv_file"])
+            observed = None
+            if os.path.exists(csv_path):
+                observed = cached_numeric_ranges(csv_path, read_spec_for_csv(csv_path, mapping))
+            mappings[index_name] = compact_mapping(index_name, mapping, observed)
+    # Las columnas del _id quedan en el _meta del índice (ver outdated_indices)
+    return {index_name: with_id_meta(mapping, TABLES_CONFIG.get(index_name, {}).get("id_field"))
+            for index_name, mapping in mappings.items()}
 
-    # Mapping INE_SECCION_2020
-    ine_seccion_mapping = {
-    "mappings": {
-        "properties": {
-            "ID": {"type": "integer"},  # ID unico de sección
-            "ENTIDAD": {"type": "integer"},
-            "DISTRITO": {"type": "integer"},
-            "MUNICIPIO": {"type": "integer"},
-            "SECCION": {"type": "integer"},
-            "TIPO": {"type": "integer"},
-            
-            "POBTOT": {"type": "integer"},
-            "POBFEM": {"type": "integer"},
-            "POBMAS": {"type": "integer"},
-            
-            "P_0A2": {"type": "integer"},
-            "P_0A2_F": {"type": "integer"},
-            "P_0A2_M": {"type": "integer"},
-            "P_0A17": {"type": "integer"},
-            "P_3YMAS": {"type": "integer"},
-            "P_3YMAS_F": {"type": "integer"},
-            "P_3YMAS_M": {"type": "integer"},
-            "P_5YMAS": {"type": "integer"},
-            "P_5YMAS_F": {"type": "integer"},
-            "P_5YMAS_M": {"type": "integer"},
-            "P_12YMAS": {"type": "integer"},
-            "P_12YMAS_F": {"type": "integer"},
-            "P_12YMAS_M": {"type": "integer"},
-            "P_15YMAS": {"type": "integer"},
-            "P_15YMAS_F": {"type": "integer"},
-            "P_15YMAS_M": {"type": "integer"},
-            "P_18YMAS": {"type": "integer"},
-            "P_18YMAS_F": {"type": "integer"},
-            "P_18YMAS_M": {"type": "integer"},
-            "P_3A5": {"type": "integer"},
-            "P_3A5_F": {"type": "integer"},
-            "P_3A5_M": {"type": "integer"},
-            "P_6A11": {"type": "integer"},
-            "P_6A11_F": {"type": "integer"},
-            "P_6A11_M": {"type": "integer"},
-            "P_8A14": {"type": "integer"},
-            "P_8A14_F": {"type": "integer"},
-            "P_8A14_M": {"type": "integer"},
-            "P_12A14": {"type": "integer"},
-            "P_12A14_F": {"type": "integer"},
-            "P_12A14_M": {"type": "integer"},
-            "P_15A17": {"type": "integer"},
-            "P_15A17_F": {"type": "integer"},
-            "P_15A17_M": {"type": "integer"},
-            "P_18A24": {"type": "integer"},
-            "P_18A24_F": {"type": "integer"},
-            "P_18A24_M": {"type": "integer"},
-            "P_15A49_F": {"type": "integer"},
-            "P_60YMAS": {"type": "integer"},
-            "P_60YMAS_F": {"type": "integer"},
-            "P_60YMAS_M": {"type": "integer"},
-            
-            "REL_H_M": {"type": "float"},
-            "POB0_14": {"type": "integer"},
-            "POB15_64": {"type": "integer"},
-            "POB65_MAS": {"type": "integer"},
-            "POB_EDADNE": {"type": "integer"},
-            "PROM_HNV": {"type": "float"},
-            
-            "PNACENT": {"type": "integer"},
-            "PNACENT_F": {"type": "integer"},
-            "PNACENT_M": {"type": "integer"},
-            "PNACOE": {"type": "integer"},
-            "PNACOE_F": {"type": "integer"},
-            "PNACOE_M": {"type": "integer"},
-            "PRES2015": {"type": "integer"},
-            "PRES2015_F": {"type": "integer"},
-            "PRES2015_M": {"type": "integer"},
-            "PRESOE15": {"type": "integer"},
-            "PRESOE15_F": {"type": "integer"},
-            "PRESOE15_M": {"type": "integer"},
-            
-            "P3YM_HLI": {"type": "integer"},
-            "P3YM_HLI_F": {"type": "integer"},
-            "P3YM_HLI_M": {"type": "integer"},
-            "P3HLINHE": {"type": "integer"},
-            "P3HLINHE_F": {"type": "integer"},
-            "P3HLINHE_M": {"type": "integer"},
-            "P3HLI_HE": {"type": "integer"},
-            "P3HLI_HE_F": {"type": "integer"},
-            "P3HLI_HE_M": {"type": "integer"},
-            "P5_HLI": {"type": "integer"},
-            "P5_HLI_NHE": {"type": "integer"},
-            "P5_HLI_HE": {"type": "integer"},
-            "PHOG_IND": {"type": "integer"},
-            "POB_AFRO": {"type": "integer"},
-            "POB_AFRO_F": {"type": "integer"},
-            "POB_AFRO_M": {"type": "integer"},
-            
-            "PCON_DISC": {"type": "integer"},
-            "PCDISC_MOT": {"type": "integer"},
-            "PCDISC_VIS": {"type": "integer"},
-            "PCDISC_LEN": {"type": "integer"},
-            "PCDISC_AUD": {"type": "integer"},
-            "PCDISC_M_A": {"type": "integer"},
-            "PCDISC_MEN": {"type": "integer"},
-            "PCON_LIMI": {"type": "integer"},
-            "PCLIM_CSB": {"type": "integer"},
-            "PCLIM_VIS": {"type": "integer"},
-            "PCLIM_HACO": {"type": "integer"},
-            "PCLIM_OAUD": {"type": "integer"},
-            "PCLIM_MOT2": {"type": "integer"},
-            "PCLIM_RE_C": {"type": "integer"},
-            "PCLIM_PMEN": {"type": "integer"},
-            "PSIND_LIM": {"type": "integer"},
-            
-            "P3A5_NOA": {"type": "integer"},
-            "P3A5_NOA_F": {"type": "integer"},
-            "P3A5_NOA_M": {"type": "integer"},
-            "P6A11_NOA": {"type": "integer"},
-            "P6A11_NOAF": {"type": "integer"},
-            "P6A11_NOAM": {"type": "integer"},
-            "P12A14NOA": {"type": "integer"},
-            "P12A14NOAF": {"type": "integer"},
-            "P12A14NOAM": {"type": "integer"},
-            "P15A17A": {"type": "integer"},
-            "P15A17A_F": {"type": "integer"},
-            "P15A17A_M": {"type": "integer"},
-            "P18A24A": {"type": "integer"},
-            "P18A24A_F": {"type": "integer"},
-            "P18A24A_M": {"type": "integer"},
-            "P8A14AN": {"type": "integer"},
-            "P8A14AN_F": {"type": "integer"},
-            "P8A14AN_M": {"type": "integer"},
-            "P15YM_AN": {"type": "integer"},
-            "P15YM_AN_F": {"type": "integer"},
-            "P15YM_AN_M": {"type": "integer"},
-            "P15YM_SE": {"type": "integer"},
-            "P15YM_SE_F": {"type": "integer"},
-            "P15YM_SE_M": {"type": "integer"},
-            "P15PRI_IN": {"type": "integer"},
-            "P15PRI_INF": {"type": "integer"},
-            "P15PRI_INM": {"type": "integer"},
-            "P15PRI_CO": {"type": "integer"},
-            "P15PRI_COF": {"type": "integer"},
-            "P15PRI_COM": {"type": "integer"},
-            "P15SEC_IN": {"type": "integer"},
-            "P15SEC_INF": {"type": "integer"},
-            "P15SEC_INM": {"type": "integer"},
-            "P15SEC_CO": {"type": "integer"},
-            "P15SEC_COF": {"type": "integer"},
-            "P15SEC_COM": {"type": "integer"},
-            "P18YM_PB": {"type": "integer"},
-            "P18YM_PB_F": {"type": "integer"},
-            "P18YM_PB_M": {"type": "integer"},
-            "GRAPROES": {"type": "float"},
-            "GRAPROES_F": {"type": "float"},
-            "GRAPROES_M": {"type": "float"},
-            
-            "PEA": {"type": "integer"},
-            "PEA_F": {"type": "integer"},
-            "PEA_M": {"type": "integer"},
-            "PE_INAC": {"type": "integer"},
-            "PE_INAC_F": {"type": "integer"},
-            "PE_INAC_M": {"type": "integer"},
-            "POCUPADA": {"type": "integer"},
-            "POCUPADA_F": {"type": "integer"},
-            "POCUPADA_M": {"type": "integer"},
-            "PDESOCUP": {"type": "integer"},
-            "PDESOCUP_F": {"type": "integer"},
-            "PDESOCUP_M": {"type": "integer"},
-            
-            "PSINDER": {"type": "integer"},
-            "PDER_SS": {"type": "integer"},
-            "PDER_IMSS": {"type": "integer"},
-            "PDER_ISTE": {"type": "integer"},
-            "PDER_ISTEE": {"type": "integer"},
-            "PAFIL_PDOM": {"type": "integer"},
-            "PDER_SEGP": {"type": "integer"},
-            "PDER_IMSSB": {"type": "integer"},
-            "PAFIL_IPRI": {"type": "integer"},
-            "PAFIL_OTRA": {"type": "integer"},
-            
-            "P12YM_CASA": {"type": "integer"},
-            "P12YM_SEPA": {"type": "integer"},
-            
-            "TOTHOG": {"type": "integer"},
-            "HOGJEF_F": {"type": "integer"},
-            "HOGJEF_M": {"type": "integer"},
-            "POBHOG": {"type": "integer"},
-            "PHOGJEF_F": {"type": "integer"},
-            "PHOGJEF_M": {"type": "integer"},
-            
-            "VIVTOT": {"type": "integer"},
-            "TVIVHAB": {"type": "integer"},
-            "TVIVPAR": {"type": "integer"},
-            "VIVPAR_HAB": {"type": "integer"},
-            "VIVPARH_CV": {"type": "integer"},
-            "TVIVPARHAB": {"type": "integer"},
-            "VIVPAR_DES": {"type": "integer"},
-            "VIVPAR_UT": {"type": "integer"},
-            "OCUPVIVPAR": {"type": "integer"},
-            "PROM_OCUP": {"type": "float"},
-            "PRO_OCUP_C": {"type": "float"},
-            
-            "VPH_PISODT": {"type": "integer"},
-            "VPH_PISOTI": {"type": "integer"},
-            "VPH_1DOR": {"type": "integer"},
-            "VPH_2YMASD": {"type": "integer"},
-            "VPH_1CUART": {"type": "integer"},
-            "VPH_2CUART": {"type": "integer"},
-            "VPH_3YMASC": {"type": "integer"},
-            
-            "VPH_C_ELEC": {"type": "integer"},
-            "VPH_S_ELEC": {"type": "integer"},
-            "VPH_AGUADV": {"type": "integer"},
-            "VPH_AEASP": {"type": "integer"},
-            "VPH_AGUAFV": {"type": "integer"},
-            "VPH_TINACO": {"type": "integer"},
-            "VPH_CISTER": {"type": "integer"},
-            "VPH_EXCSA": {"type": "integer"},
-            "VPH_LETR": {"type": "integer"},
-            "VPH_DRENAJ": {"type": "integer"},
-            "VPH_NODREN": {"type": "integer"},
-            "VPH_C_SERV": {"type": "integer"},
-            "VPH_NDEAED": {"type": "integer"},
-            "VPH_DSADMA": {"type": "integer"},
-            "VPH_NDACMM": {"type": "integer"},
-            
-            "VPH_SNBIEN": {"type": "integer"},
-            "VPH_REFRI": {"type": "integer"},
-            "VPH_LAVAD": {"type": "integer"},
-            "VPH_HMICRO": {"type": "integer"},
-            "VPH_AUTOM": {"type": "integer"},
-            "VPH_MOTO": {"type": "integer"},
-            "VPH_BICI": {"type": "integer"},
-            "VPH_RADIO": {"type": "integer"},
-            "VPH_TV": {"type": "integer"},
-            "VPH_PC": {"type": "integer"},
-            "VPH_TELEF": {"type": "integer"},
-            "VPH_CEL": {"type": "integer"},
-            "VPH_INTER": {"type": "integer"},
-            "VPH_STVP": {"type": "integer"},
-            "VPH_SPMVPI": {"type": "integer"},
-            "VPH_CVJ": {"type": "integer"},
-            "VPH_SINRTV": {"type": "integer"},
-            "VPH_SINLTC": {"type": "integer"},
-            "VPH_SINCIN": {"type": "integer"},
-            "VPH_SINTIC": {"type": "integer"}
-            }
-        }
-    }
-    ine_seccion_mapping.update(index_settings)
+def warn_kept_profile(es, index_name: str, mapping: Dict[str, Any]) -> None:
+    """Avisa si un índice que ya existe tiene un mapping de otro perfil que el pedido
 
-    # Retornar todos los mappings
-    return {
-        "cat_distrito_2020": cat_distrito_mapping,
-        "cat_seccion_2020": cat_seccion_mapping,
-        "ine_distrito_2020": ine_distrito_mapping,
-        "ine_entidad_2020": ine_entidad_mapping,
-        "ine_seccion_2020": ine_seccion_mapping
-    }
+    Un índice existente conserva su mapping: el perfil elegido solo se aplica a
+    índices nuevos (con use_aliases cada carga crea una versión nueva).
+    """
+    try:
+        stored = next(iter(es.indices.get_mapping(index=index_name).values()), {})
+    except Exception as e:
+        logger.warning(f"No se pudo leer el mapping de {index_name}: {str(e)}")
+        return
+    if mapping_profile(stored) != mapping_profile(mapping):
+        logger.warning(f"{index_name} ya existe con el perfil de mapping {mapping_profile(stored)} y lo conserva: "
+                       f"el perfil {mapping_profile(mapping)} solo se aplica a índices nuevos "
+                       f"(use --use-aliases o elimine el índice)")
 
-def create_indices(es, mappings):
-    """Crea todos los índices necesarios con sus mappings"""
+
+def create_indices(es, mappings, load_profile: bool = False):
+    """Crea todos los índices necesarios con sus mappings
+
+    Con load_profile=True los índices se crean (o se ajustan, si ya existen) sin
+    refresh ni réplicas; finalize_indices restaura los settings de producción.
+    """
     created_indices = []
     failed_indices = []
     
     for index_name, mapping in mappings.items():
         try:
             if not es.indices.exists(index=index_name):
-                es.indices.create(index=index_name, body=mapping)
+                body = load_time_mapping(mapping) if load_profile else mapping
+                es.indices.create(index=index_name, body=body)
                 logger.info(f"Índice {index_name} creado con éxito")
                 created_indices.append(index_name)
             else:
                 logger.info(f"Índice {index_name} ya existe")
+                warn_kept_profile(es, index_name, mapping)
+                if load_profile:
+                    prepare_for_bulk(es, index_name)
                 created_indices.append(index_name)
         except Exception as e:
             logger.error(f"Error al crear índice {index_name}: {str(e)}")
@@ -874,17 +184,43 @@ def create_indices(es, mappings):
     
     return created_indices, failed_indices
 
-def process_csv_data(csv_path: str) -> Optional[pd.DataFrame]:
-    """Procesa un archivo CSV y retorna un DataFrame"""
+def finalize_indices(es, mappings, index_names: List[str], force_merge: bool = False) -> Dict[str, float]:
+    """Devuelve los índices cargados a sus settings de producción y suma el tiempo de cada fase"""
+    timings = {}
+    for index_name in index_names:
+        try:
+            index_timings = finalize_index(
+                es, index_name, production_settings(mappings[index_name]), force_merge=force_merge
+            )
+        except Exception as e:
+            logger.error(f"Error al restaurar settings de {index_name}: {str(e)}")
+            continue
+        for phase, seconds in index_timings.items():
+            timings[phase] = timings.get(phase, 0.0) + seconds
+    return timings
+
+def process_csv_data(csv_path: str, spec: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+    """Procesa un archivo CSV y retorna un DataFrame
+
+    spec es la especificación de lectura derivada del mapping (tipos, columnas y
+    claves con ceros a la izquierda, ver csv_schema); sin ella pandas infiere los tipos.
+    Las columnas 'Unnamed: N' que dejan las comas finales del CSV no están en
+    el mapping y se descartan aquí: siempre vienen vacías, así que los
+    documentos ya no llevan esos campos en null.
+    """
     try:
         logger.info(f"Leyendo archivo {csv_path}")
-        df = pd.read_csv(csv_path, encoding='latin-1')
+        with csv_source(csv_path) as source:
+            df = pd.read_csv(source, encoding='latin-1', **read_options(spec))
+        df = apply_read_spec(drop_empty_rows(drop_empty_columns(df)).reset_index(drop=True), spec)
         
-        df = df.where(pd.notnull(df), None)
-        
-        for col in df.columns:
-            if df[col].dtype == 'float64' and df[col].isnull().any():
-                df[col] = df[col].astype('float')
+        # Con spec los tipos ya vienen fijados (los nulos se convierten a None al construir los documentos)
+        if spec is None:
+            df = df.where(pd.notnull(df), None)
+            
+            for col in df.columns:
+                if df[col].dtype == 'float64' and df[col].isnull().any():
+                    df[col] = df[col].astype('float')
         
         logger.info(f"CSV leído correctamente con {len(df)} registros")
         return df
@@ -893,136 +229,828 @@ def process_csv_data(csv_path: str) -> Optional[pd.DataFrame]:
         return None
 
 
+def iter_csv_data(
+    csv_path: str,
+    batch_size: int = 1000,
+    skip_rows: int = 0,
+    spec: Optional[Dict[str, Any]] = None
+) -> Iterator[pd.DataFrame]:
+    """Lee un CSV por bloques de batch_size filas para importarlo sin cargarlo completo"""
+    logger.info(f"Leyendo archivo {csv_path} por bloques de {batch_size} registros")
+    return iter_csv_batches(csv_path, batch_size=batch_size, encoding='latin-1', skip_rows=skip_rows, spec=spec)
+
+
+def _full_csv_blocks(csv_path: str, spec: Optional[Dict[str, Any]] = None) -> List[pd.DataFrame]:
+    """El CSV completo como un único bloque, para construir su caché"""
+    df = process_csv_data(csv_path, spec)
+    return [] if df is None else [df]
+
+
+def read_arrow_data(
+    csv_path: str,
+    batch_size: int = 1000,
+    skip_rows: int = 0,
+    spec: Optional[Dict[str, Any]] = None
+) -> Optional[Iterator[Any]]:
+    """Lee un CSV con pyarrow y retorna sus lotes desde skip_rows, o None si no se pudo leer"""
+    try:
+        logger.info(f"Leyendo archivo {csv_path} con pyarrow")
+        table = read_csv_arrow(csv_path, spec, encoding='latin-1')
+        logger.info(f"CSV leído correctamente con {table.num_rows} registros")
+        return iter_arrow_batches(table, batch_size, skip_rows=skip_rows)
+    except Exception as e:
+        logger.error(f"Error procesando CSV {csv_path}: {str(e)}")
+        return None
+
+
+def read_table_data(
+    csv_path: str,
+    batch_size: int = 1000,
+    stream: bool = False,
+    skip_rows: int = 0,
+    cache_dir: Optional[str] = None,
+    spec: Optional[Dict[str, Any]] = None,
+    reader: str = "pandas"
+) -> Optional[Union[pd.DataFrame, Iterator[pd.DataFrame]]]:
+    """Datos de una tabla listos para importar, desde la caché Arrow si se da cache_dir
+
+    La primera lectura de cada versión del CSV crea la caché; las siguientes la
+    mapean en memoria sin volver a parsear el archivo. Si la caché no está
+    disponible (p. ej. sin pyarrow) se lee el CSV como siempre.
+    Sin caché, reader="arrow" parsea el CSV completo con el lector multihilo de
+    pyarrow y lo entrega en lotes Arrow de batch_size filas (stream no cambia
+    nada: la tabla Arrow ya es compacta); si pyarrow no está se usa pandas.
+    """
+    if reader not in READERS:
+        raise ValueError(f"Lector de CSV desconocido: {reader}")
+    if cache_dir:
+        if stream:
+            table = cached_table(csv_path, lambda path: iter_csv_data(path, batch_size, spec=spec),
+                                 cache_dir, variant="stream", version=spec_key(spec))
+            if table is not None:
+                return iter_cached_batches(table, batch_size, skip_rows=skip_rows,
+                                           categories=category_columns(spec))
+        else:
+            table = cached_table(csv_path, partial(_full_csv_blocks, spec=spec),
+                                 cache_dir, variant="full", version=spec_key(spec))
+            if table is not None:
+                return table_to_pandas(table, skip_rows=skip_rows, categories=category_columns(spec))
+    
+    if reader == "arrow":
+        if arrow_available():
+            return read_arrow_data(csv_path, batch_size, skip_rows, spec)
+        logger.warning(f"pyarrow no está instalado; {csv_path} se lee con pandas")
+    
+    if stream:
+        return iter_csv_data(csv_path, batch_size, skip_rows=skip_rows, spec=spec)
+    data = process_csv_data(csv_path, spec)
+    if data is not None and skip_rows:
+        data = data.iloc[skip_rows:]
+    return data
+
+
+def validate_table_ids(
+    csv_path: str,
+    id_field: Union[str, Sequence[str], None],
+    spec: Optional[Dict[str, Any]] = None,
+    sample_size: int = 5
+) -> Optional[int]:
+    """Verifica antes de cargar que cada fila del CSV tenga un _id completo y único
+
+    Lee solo las columnas clave. Retorna el número de documentos que debe tener
+    el índice, o None (con ejemplos en el log) si hay claves incompletas o
+    repetidas: con ellas una recarga no escribiría cada documento una sola vez.
+    """
+    if not id_field:
+        return None
+    try:
+        keys = read_id_frame(csv_path, id_field, encoding='latin-1', spec=spec)
+    except Exception as e:
+        logger.error(f"Error leyendo las claves {id_field} de {csv_path}: {str(e)}")
+        return None
+    missing, duplicated = find_invalid_ids(keys, id_field)
+    if len(missing):
+        logger.error(f"{csv_path}: {len(missing)} filas sin clave completa {id_field}, "
+                     f"p. ej. filas {missing.index[:sample_size].tolist()}")
+    if len(duplicated):
+        sample = duplicated.drop_duplicates().head(sample_size).to_dict('records')
+        logger.error(f"{csv_path}: {len(duplicated)} filas comparten clave {id_field}, p. ej. {sample}")
+    if len(missing) or len(duplicated):
+        return None
+    return len(keys)
+
+
+def load_table_frame(table_name: str, cache_dir: str = DEFAULT_CACHE_DIR) -> Optional[pd.DataFrame]:
+    """DataFrame completo de una tabla de TABLES_CONFIG, p. ej. para análisis en el notebook"""
+    csv_path = resolve_csv_path(CSV_DIR, TABLES_CONFIG[table_name]["csv_file"])
+    spec = read_spec_for_csv(csv_path, get_mappings()[table_name])
+    return read_table_data(csv_path, cache_dir=cache_dir, spec=spec)
+
+
+def _parallel_import(
+    es,
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    index_name: str,
+    id_field: Union[str, Sequence[str], None],
+    batch_size: int,
+    workers: int,
+    queue_depth: int,
+    checkpoint: Optional[Callable[[int], None]] = None,
+    bulk_bytes: Optional[int] = None,
+    dead_letter_path: Optional[str] = DEFAULT_DEAD_LETTER_PATH
+) -> Tuple[int, int]:
+    """Indexa con helpers.parallel_bulk manteniendo varios lotes en vuelo a la vez
+
+    parallel_bulk entrega los resultados en orden, así que cada múltiplo de
+    batch_size procesado es un punto de reanudación válido. Con bulk_bytes cada
+    petición se corta por tamaño y no cada batch_size documentos.
+    parallel_bulk no reintenta ni devuelve el documento de un ítem fallido: las
+    acciones en vuelo se guardan en orden para emparejarlas con su resultado, y
+    antes de cada checkpoint los rechazados con un estado transitorio se
+    reenvían juntos con send_bulk_body; los que siguen fallando van a
+    dead_letter_path con su fila del CSV.
+    """
+    success_count = 0
+    error_count = 0
+    retryable = []
+    failures = []
+    
+    def settle_failures():
+        nonlocal success_count, error_count
+        if retryable:
+            success, still_failed = send_bulk_body(es, entries_body(retryable),
+                                                   rows=[entry["row"] for entry in retryable])
+            success_count += success
+            error_count -= success
+            failures.extend(still_failed)
+            retryable.clear()
+        write_dead_letters(dead_letter_path, failures)
+        failures.clear()
+    
+    in_flight = deque()
+    
+    def actions():
+        for batch_df in iter_batches(data, batch_size):
+            for action, row in zip(build_actions(batch_df, index_name, id_field), frame_rows(batch_df)):
+                in_flight.append((action, row))
+                yield action
+    
+    results = helpers.parallel_bulk(
+        es,
+        actions(),
+        thread_count=workers,
+        queue_size=queue_depth,
+        chunk_size=MAX_BULK_DOCS if bulk_bytes else batch_size,
+        max_chunk_bytes=bulk_bytes or 100 * 1024 * 1024,  # 100 MB: el valor por omisión de helpers
+        raise_on_error=False,
+        raise_on_exception=False
+    )
+    processed = 0
+    for ok, item in results:
+        processed += 1
+        action, row = in_flight.popleft()
+        if ok:
+            success_count += 1
+        else:
+            error_count += 1
+            entry = action_failure(action, item, row)
+            (retryable if entry["status"] in RETRYABLE_STATUSES else failures).append(entry)
+        if processed % batch_size == 0:
+            settle_failures()
+            logger.info(f"{index_name}: {processed} documentos procesados, fallidos: {error_count}")
+            if checkpoint:
+                checkpoint(processed)
+    settle_failures()
+    if checkpoint:
+        checkpoint(processed)
+    return success_count, error_count
+
+
+def _body_import(
+    es,
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    index_name: str,
+    id_field: Union[str, Sequence[str], None],
+    batch_size: int,
+    bulk_bytes: Optional[int],
+    checkpoint: Optional[Callable[[int], None]] = None,
+    dead_letter_path: Optional[str] = DEFAULT_DEAD_LETTER_PATH
+) -> Tuple[int, int]:
+    """Envía los documentos como cuerpos NDJSON ya serializados de hasta bulk_bytes
+
+    Sin bulk_bytes cada cuerpo lleva batch_size documentos. Cada cuerpo
+    confirmado es un punto de reanudación: sus filas siguen en orden a las de
+    los cuerpos anteriores, y sus documentos rechazados ya están en dead_letter_path.
+    """
+    success_count = 0
+    error_count = 0
+    processed = 0
+    if bulk_bytes:
+        bodies = iter_bulk_bodies(iter_batches(data, batch_size), index_name, id_field, max_bytes=bulk_bytes)
+    else:
+        bodies = iter_bulk_bodies(iter_batches(data, batch_size), index_name, id_field,
+                                  max_bytes=None, max_docs=batch_size)
+    for body_num, (body, rows) in enumerate(bodies, start=1):
+        success, failures = send_bulk_body(es, body, rows=rows)
+        write_dead_letters(dead_letter_path, failures)
+        success_count += success
+        error_count += len(failures)
+        processed += len(rows)
+        logger.info(f"Lote {body_num}: Indexados {success} documentos, fallidos: {len(failures)} "
+                    f"({len(body) / (1024 * 1024):.1f} MB)")
+        if checkpoint:
+            checkpoint(processed)
+    return success_count, error_count
+
+
+def _adaptive_import(
+    es,
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    index_name: str,
+    id_field: Union[str, Sequence[str], None],
+    batch_size: int,
+    controller: AdaptiveBulkController,
+    checkpoint: Optional[Callable[[int], None]] = None,
+    dead_letter_path: Optional[str] = DEFAULT_DEAD_LETTER_PATH
+) -> Tuple[int, int]:
+    """Envía cuerpos NDJSON con el tamaño y la concurrencia que decide el controlador
+
+    Los cuerpos se confirman en el orden en que se armaron, así cada cuerpo
+    confirmado sigue siendo un punto de reanudación válido. Los documentos
+    rechazados van a dead_letter_path.
+    """
+    success_count = 0
+    error_count = 0
+    processed = 0
+    bodies = iter_bulk_bodies(iter_batches(data, batch_size), index_name, id_field,
+                              max_bytes=controller.current_bytes)
+    pending = deque()
+    
+    def confirm_oldest():
+        nonlocal success_count, error_count, processed
+        future, doc_count, body_num = pending.popleft()
+        success, failures = future.result()
+        write_dead_letters(dead_letter_path, failures)
+        failed = len(failures)
+        success_count += success
+        error_count += failed
+        processed += doc_count
+        logger.info(f"Lote {body_num}: Indexados {success} documentos, fallidos: {failed} "
+                    f"(siguiente: {controller.current_bytes() / (1024 * 1024):.1f} MB, "
+                    f"{controller.concurrency} simultáneas)")
+        if checkpoint:
+            checkpoint(processed)
+    
+    with ThreadPoolExecutor(max_workers=controller.max_concurrency) as pool:
+        for body_num, (body, rows) in enumerate(bodies, start=1):
+            while len(pending) >= controller.concurrency:
+                confirm_oldest()
+            controller.wait()
+            pending.append((pool.submit(controller.send, es, body, rows), len(rows), body_num))
+        while pending:
+            confirm_oldest()
+    return success_count, error_count
+
+
 def import_csv_to_elastic(
     es,
-    df: pd.DataFrame,
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
     index_name: str,
-    id_field: Optional[str] = None,
-    batch_size: int = 5000
+    id_field: Union[str, Sequence[str], None] = None,
+    batch_size: int = 5000,
+    workers: int = 1,
+    queue_depth: int = 4,
+    checkpoint: Optional[Callable[[int], None]] = None,
+    bulk_bytes: Optional[int] = None,
+    controller: Optional[AdaptiveBulkController] = None,
+    dead_letter_path: Optional[str] = DEFAULT_DEAD_LETTER_PATH
 ) -> Tuple[int, int]:
-    """Importa datos desde un DataFrame a Elasticsearch"""
+    """Importa datos desde un DataFrame (o un generador de bloques) a Elasticsearch
+
+    Con workers > 1 se usan hasta workers peticiones bulk simultáneas y una cola
+    de queue_depth lotes ya construidos, así se arman documentos mientras el
+    cluster indexa los anteriores. checkpoint, si se da, recibe tras cada lote
+    confirmado el número de filas ya confirmadas en esta llamada.
+    Los documentos se serializan directo a NDJSON; con bulk_bytes cada petición
+    se corta por tamaño (~bulk_bytes) en lugar de cada batch_size filas y
+    batch_size queda solo como tamaño de lectura.
+    Con controller el tamaño de cada petición y las peticiones simultáneas (hasta
+    controller.max_concurrency) se ajustan según la latencia, el 'took' y los
+    rechazos de las respuestas; workers y bulk_bytes no se usan.
+    Solo los documentos rechazados se reintentan, y los que siguen fallando se
+    escriben con su motivo en dead_letter_path.
+    """
     
     success_count = 0
     error_count = 0
     
     try:
-        total_records = len(df)
-        logger.info(f"Preparando {total_records} documentos para indexar en {index_name}")
+        if isinstance(data, pd.DataFrame):
+            logger.info(f"Preparando {len(data)} documentos para indexar en {index_name}")
+        else:
+            logger.info(f"Indexando en {index_name} por bloques a medida que se leen")
         
-        for i in range(0, total_records, batch_size):
-            batch_df = df.iloc[i:i+batch_size]
-            actions = []
-            
-            for _, row in batch_df.iterrows():
-                doc = row.to_dict()
-                action = {
-                    "_index": index_name,
-                    "_source": doc
-                }
-                
-                if id_field and id_field in doc and doc[id_field] is not None:
-                    action["_id"] = str(doc[id_field])
-                    
-                actions.append(action)
-            
-            # Bulk indexing
-            if actions:
-                success, failed = helpers.bulk(
-                    es, 
-                    actions, 
-                    stats_only=True,
-                    raise_on_error=False,
-                    max_retries=3
-                )
-                success_count += success
-                error_count += failed
-                logger.info(f"Lote {i//batch_size + 1}: Indexados {success} documentos, fallidos: {failed}")
+        if controller is not None:
+            success_count, error_count = _adaptive_import(
+                es, data, index_name, id_field, batch_size, controller, checkpoint, dead_letter_path
+            )
+        elif workers > 1:
+            logger.info(f"Indexación paralela en {index_name}: {workers} hilos, cola de {queue_depth} lotes")
+            success_count, error_count = _parallel_import(
+                es, data, index_name, id_field, batch_size, workers, queue_depth, checkpoint, bulk_bytes,
+                dead_letter_path
+            )
+        else:
+            success_count, error_count = _body_import(
+                es, data, index_name, id_field, batch_size, bulk_bytes, checkpoint, dead_letter_path
+            )
         
         logger.info(f"Importación a {index_name} completada: {success_count} éxitos, {error_count} errores")
         return success_count, error_count
         
     except Exception as e:
         logger.error(f"Error en importación a {index_name}: {str(e)}")
-        return success_count, error_count + (total_records - success_count)
+        if isinstance(data, pd.DataFrame):
+            return success_count, max(error_count, len(data) - success_count)
+        return success_count, max(error_count, 1)
+
+def import_delta(
+    es,
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    index_name: str,
+    table_name: str,
+    id_field: Union[str, Sequence[str], None],
+    manifest,
+    batch_size: int = 1000,
+    dead_letter_path: Optional[str] = DEFAULT_DEAD_LETTER_PATH
+) -> Tuple[int, int]:
+    """Envía solo los documentos nuevos, modificados o eliminados desde la última carga
+
+    Compara el hash de cada documento con el manifiesto de la tabla; si todo se
+    indexa sin errores el manifiesto se actualiza con la carga actual. Las
+    operaciones rechazadas se escriben con su motivo en dead_letter_path.
+    """
+    previous = load_hashes(manifest, table_name)
+    if previous and es.count(index=index_name)["count"] == 0:
+        logger.warning(f"{index_name} está vacío; se ignora el manifiesto y se carga completo")
+        previous = {}
+    
+    success_count = 0
+    error_count = 0
+    current = {}
+    
+    try:
+        for batch_num, batch_df in enumerate(iter_batches(data, batch_size), start=1):
+            batch_actions = build_actions(batch_df, index_name, id_field)
+            rows_by_id = {action.get("_id"): row for action, row in zip(batch_actions, frame_rows(batch_df))}
+            actions = changed_actions(batch_actions, previous, current)
+            if not actions:
+                continue
+            success, failures = send_bulk_body(es, actions_body(actions),
+                                               rows=[rows_by_id.get(action.get("_id")) for action in actions])
+            write_dead_letters(dead_letter_path, failures)
+            success_count += success
+            error_count += len(failures)
+            logger.info(f"Lote {batch_num}: {len(actions)} documentos nuevos o modificados, "
+                        f"fallidos: {len(failures)}")
+        
+        deletes = delete_actions(index_name, previous, current)
+        if deletes:
+            success, failures = send_bulk_body(es, actions_body(deletes))
+            # Un 404 al borrar significa que el documento ya no estaba
+            failed = [f for f in failures if f["status"] != 404]
+            write_dead_letters(dead_letter_path, failed)
+            success_count += len(deletes) - len(failed)
+            error_count += len(failed)
+    except Exception as e:
+        logger.error(f"Error en importación incremental a {index_name}: {str(e)}")
+        return success_count, max(error_count, 1)
+    
+    new, changed, deleted = summarize_delta(previous, current)
+    logger.info(f"{index_name}: {new} nuevos, {changed} modificados, {deleted} eliminados, "
+                f"{len(current) - new - changed} sin cambios")
+    
+    if error_count == 0:
+        save_hashes(manifest, table_name, current)
+    else:
+        logger.warning(f"No se actualiza el manifiesto de {table_name} porque hubo {error_count} errores")
+    return success_count, error_count
+
+def import_tables_multiprocess(
+    es,
+    tables: Dict[str, Dict[str, Any]],
+    processes: int,
+    batch_size: int = 1000,
+    range_bytes: int = 1 << 20,
+    bulk_bytes: Optional[int] = None,
+    dead_letter_path: Optional[str] = DEFAULT_DEAD_LETTER_PATH
+) -> Dict[str, Tuple[int, int]]:
+    """Lee y serializa todas las tablas en un pool de procesos y envía los lotes desde aquí
 
-def main():
-    """Función principal para ejecutar todo el proceso"""
+    Cada CSV se parte en rangos de ~range_bytes; cada rango se convierte en cuerpos
+    NDJSON en un proceso del pool y este proceso los envía a la API bulk en cuanto
+    están listos, sin esperar a que termine la tabla anterior. Con bulk_bytes
+    los cuerpos se cortan por tamaño en lugar de cada batch_size documentos.
+    Los documentos rechazados se escriben con su motivo en dead_letter_path.
+    """
+    results = {index_name: [0, 0] for index_name in tables}
+    
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {}
+        for index_name, table in tables.items():
+            csv_path, id_field = table["csv_path"], table["id_field"]
+            spec = table.get("read_spec")
+            dtypes = probe_csv_dtypes(csv_path, nrows=batch_size, spec=spec)
+            ranges = split_csv_ranges(csv_path, range_bytes)
+            logger.info(f"{index_name}: {len(ranges)} rangos enviados al pool de {processes} procesos")
+            first_row = 0
+            for start, end in ranges:
+                future = pool.submit(
+                    serialize_csv_range, csv_path, start, end, index_name, id_field, batch_size, 'latin-1',
+                    dtypes, spec, bulk_bytes, first_row
+                )
+                futures[future] = (index_name, csv_path, start, end)
+                first_row += count_csv_range_rows(csv_path, start, end)
+        
+        for future in as_completed(futures):
+            index_name, csv_path, start, end = futures[future]
+            try:
+                bodies = future.result()
+            except Exception as e:
+                logger.error(f"Error procesando {csv_path} [{start}:{end}]: {str(e)}")
+                results[index_name][1] += count_csv_range_rows(csv_path, start, end)
+                continue
+            
+            for body, rows in bodies:
+                success, failures = send_bulk_body(es, body, rows=rows)
+                write_dead_letters(dead_letter_path, failures)
+                results[index_name][0] += success
+                results[index_name][1] += len(failures)
+            logger.info(f"{index_name}: rango [{start}:{end}] indexado, "
+                        f"acumulado {results[index_name][0]} éxitos, {results[index_name][1]} errores")
+    
+    return {index_name: (success, errors) for index_name, (success, errors) in results.items()}
+
+def import_tables(
+    es,
+    tables: Dict[str, Dict[str, Any]],
+    batch_size: int = 1000,
+    stream: bool = False,
+    workers: int = 1,
+    queue_depth: int = 4,
+    processes: int = 1,
+    manifest=None,
+    journal_path: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+    bulk_bytes: Optional[int] = None,
+    controller: Optional[AdaptiveBulkController] = None,
+    dead_letter_path: Optional[str] = DEFAULT_DEAD_LETTER_PATH
+) -> Dict[str, Tuple[int, int]]:
+    """Importa cada tabla con el modo elegido y retorna (éxitos, errores) por índice
+
+    tables asocia cada índice destino con su tabla: csv_path, id_field (una o
+    varias columnas), table (nombre en TABLES_CONFIG), read_spec (tipos
+    derivados del mapping), reader (lector del CSV), expected_docs y, para
+    reanudar, fingerprint y offset.
+    Con un manifiesto (modo incremental) cada tabla se compara contra su última
+    carga y solo se envían las diferencias. Con journal_path la carga secuencial
+    registra un checkpoint tras cada lote confirmado. Con cache_dir los CSV se
+    leen desde su caché Arrow (el pool de procesos siempre lee los CSV por
+    rangos con pandas, sin importar reader; los CSV comprimidos no se pueden
+    partir por rangos y se cargan fuera del pool). Las
+    tablas cuyo CSV no se pudo leer no aparecen en el resultado. bulk_bytes
+    corta las peticiones bulk por tamaño y controller las adapta a la respuesta
+    del cluster (ver import_csv_to_elastic); el controlador se comparte entre
+    tablas para que cada una empiece con lo aprendido en la anterior. Los
+    documentos rechazados de todas las tablas van a dead_letter_path.
+    """
+    results = {}
+    if manifest is None and processes > 1:
+        compressed = {index_name: table for index_name, table in tables.items()
+                      if csv_compression(table["csv_path"])}
+        results = import_tables_multiprocess(
+            es, {index_name: table for index_name, table in tables.items() if index_name not in compressed},
+            processes, batch_size=batch_size, bulk_bytes=bulk_bytes, dead_letter_path=dead_letter_path
+        )
+        if compressed:
+            logger.warning(f"{', '.join(compressed)}: un CSV comprimido no se puede partir por rangos de bytes; "
+                           f"se carga sin el pool de procesos")
+        tables = compressed
+    
+    for index_name, table in tables.items():
+        csv_path, id_field = table["csv_path"], table["id_field"]
+        offset = table.get("offset", 0)
+        data = read_table_data(csv_path, batch_size, stream=stream, skip_rows=offset, cache_dir=cache_dir,
+                               spec=table.get("read_spec"), reader=table.get("reader", "pandas"))
+        if data is None:
+            continue
+        
+        if manifest is not None:
+            results[index_name] = import_delta(
+                es, data, index_name, table["table"], id_field, manifest, batch_size=batch_size,
+                dead_letter_path=dead_letter_path
+            )
+            continue
+        
+        checkpoint = None
+        if journal_path:
+            if offset:
+                logger.info(f"Reanudando {index_name} desde la fila {offset}")
+            checkpoint = partial(
+                _record_checkpoint, journal_path, table["table"], index_name, table["fingerprint"], offset
+            )
+            checkpoint(0)
+            
+        # Importar a Elasticsearch
+        results[index_name] = import_csv_to_elastic(
+            es, 
+            data, 
+            index_name,
+            id_field,
+            batch_size=batch_size,
+            workers=workers,
+            queue_depth=queue_depth,
+            checkpoint=checkpoint,
+            bulk_bytes=bulk_bytes,
+            controller=controller,
+            dead_letter_path=dead_letter_path
+        )
+        success, errors = results[index_name]
+        if journal_path and errors == 0:
+            save_checkpoint(
+                journal_path, table["table"], index_name, table["fingerprint"], offset + success, completed=True
+            )
+    return results
+
+def _record_checkpoint(
+    journal_path: str,
+    table_name: str,
+    index_name: str,
+    fingerprint: Dict[str, Any],
+    start_offset: int,
+    acknowledged: int
+) -> None:
+    """Guarda el offset absoluto (filas saltadas + confirmadas) de una tabla"""
+    save_checkpoint(journal_path, table_name, index_name, fingerprint, start_offset + acknowledged)
+
+def main(
+    stream: bool = False,
+    workers: int = 1,
+    queue_depth: int = 4,
+    processes: int = 1,
+    load_profile: bool = True,
+    force_merge: bool = False,
+    use_aliases: bool = False,
+    keep_versions: int = 2,
+    incremental: bool = False,
+    manifest_path: str = DEFAULT_MANIFEST_PATH,
+    resume: bool = False,
+    journal_path: str = DEFAULT_JOURNAL_PATH,
+    cache_dir: Optional[str] = None,
+    mapping_profile: str = "default",
+    bulk_bytes: Optional[int] = DEFAULT_BULK_BYTES,
+    adaptive: bool = False,
+    dead_letter_path: str = DEFAULT_DEAD_LETTER_PATH,
+    verify: bool = False
+):
+    """Función principal para ejecutar todo el proceso
+
+    Con stream=True cada CSV se lee por bloques de batch_size filas y cada bloque
+    se indexa en cuanto se lee, así la memoria no crece con el tamaño del archivo.
+    workers y queue_depth activan la indexación paralela de import_csv_to_elastic.
+    Con processes > 1 todas las tablas se leen y serializan en un pool de procesos
+    (ver import_tables_multiprocess).
+    Con load_profile=True los índices se cargan sin refresh ni réplicas y al final
+    se restauran los settings de producción (y force_merge fusiona segmentos);
+    no aplica con incremental, que escribe pocos documentos en índices en uso.
+    Con use_aliases=True cada tabla se carga en un índice nuevo <tabla>_v<fecha> y
+    el alias <tabla> se cambia a él solo si el conteo cuadra; se conservan las
+    keep_versions versiones más recientes. Sin alias, un índice existente cuyo
+    _id se armaba con otras columnas se elimina y se carga de nuevo completo.
+    Con incremental=True solo se envían los documentos que cambiaron desde la
+    última carga exitosa según el manifiesto de hashes en manifest_path.
+    La carga secuencial (sin processes ni incremental) registra en journal_path
+    el último lote confirmado de cada tabla; con resume=True una tabla cuyo CSV
+    no cambió continúa desde ese punto (y en su misma versión si se usan alias).
+    Con cache_dir cada CSV se parsea una sola vez y las cargas siguientes leen su
+    caché Arrow mapeada en memoria.
+    mapping_profile elige los mappings de get_mappings() ("default" o "compact");
+    un índice que ya existe conserva el suyo (se avisa si es de otro perfil), así
+    que para cambiar de perfil se carga con use_aliases.
+    bulk_bytes es el tamaño objetivo de cada petición bulk; con None (o 0) las
+    peticiones se arman cada batch_size filas.
+    Con adaptive=True la carga secuencial parte de bulk_bytes y ajusta el tamaño
+    de petición y las peticiones simultáneas (hasta workers) según la respuesta
+    del cluster (ver AdaptiveBulkController).
+    Los documentos que el cluster rechaza (tras reintentar solo ellos) se
+    escriben con su motivo en dead_letter_path.
+    Con verify=True cada índice cargado se compara con su CSV por sumas, nulos
+    por campo y documentos por entidad (ver load_verification); con alias, una
+    versión que no pasa la verificación no se publica.
+    """
     start_time = time.time()
+    # Las entradas del dead letter de esta carga son las que fallaron desde aquí
+    run_started = time.strftime(FAILED_AT_FORMAT)
     logger.info("Iniciando proceso de importación de datos censales")
     
     # Conectar a Elasticsearch
-    es = connect_elasticsearch()
+    # Una conexión por petición simultánea (hilos de workers o del bulk adaptativo)
+    es = connect_elasticsearch(concurrency=workers)
     if not es:
         logger.error("No se puede continuar sin conexión a Elasticsearch")
         return
     
-    mappings = get_mappings()
+    mappings = get_mappings(mapping_profile)
     
-    created_indices, failed_indices = create_indices(es, mappings)
-    if failed_indices:
-        logger.warning(f"Algunos índices no pudieron crearse: {failed_indices}")
+    if incremental and use_aliases:
+        logger.warning("La carga incremental no aplica con use_aliases: cada versión nueva se carga completa")
+        incremental = False
+    if incremental and load_profile:
+        # Quitar las réplicas del índice en vivo por un delta obliga a copiarlas completas al restaurarlas
+        logger.info("La carga incremental escribe en los índices en uso: se omite el perfil de carga "
+                    "(sin refresh ni réplicas)")
+        load_profile = False
     
-    # Configuración de tablas y archivos CSV
-    tables_config = {
-        "cat_distrito_2020": {
-            "csv_file": "cat_distritos_2020.csv",
-            "id_field": "CVE_DISTRITO"
-        },
-        "cat_seccion_2020": {
-            "csv_file": "cat_secciones_2020.csv",
-            "id_field": "CVE_SECCION"
-        },
-        "ine_distrito_2020": {
-            "csv_file": "INE_DISTRITO_2020.CSV",
-            "id_field": "DISTRITO"
-        },
-        "ine_entidad_2020": {
-            "csv_file": "INE_ENTIDAD_2020.CSV",
-            "id_field": "ENT"
-        },
-        "ine_seccion_2020": {
-            "csv_file": "INE_SECCION_2020.csv",
-            "id_field": "ID"
-        }
-    }
+    # Checkpoints: solo la carga secuencial avanza en orden y puede reanudarse
+    journaling = not incremental and processes <= 1
+    if resume and not journaling:
+        logger.warning("resume solo aplica a la carga secuencial; se carga desde el inicio")
+    fingerprints = {}
+    checkpoints = {}
+    skipped_tables = []
+    if journaling:
+        for table_name, config in TABLES_CONFIG.items():
+            csv_path = resolve_csv_path(CSV_DIR, config["csv_file"])
+            if not os.path.exists(csv_path):
+                continue
+            # Sin resume el SHA-256 se toma del diario si el archivo no cambió (tamaño y mtime)
+            fingerprints[table_name] = input_fingerprint(journal_path, table_name, csv_path, confirm=resume)
+            if resume:
+                entry = get_checkpoint(journal_path, table_name, fingerprints[table_name])
+                if entry and entry.get("completed"):
+                    logger.info(f"{table_name} ya se cargó por completo en {entry['index']}; se omite")
+                    skipped_tables.append(table_name)
+                elif entry:
+                    checkpoints[table_name] = entry
     
-    # Directorio donde se encuentran los CSV
-    csv_dir = "./eceg_2020_csv/" 
+    # Índice físico donde se carga cada tabla (una versión nueva si se usan alias,
+    # salvo que se reanude una versión que quedó a medias)
+    targets = {}
+    for index_name in mappings:
+        if index_name in skipped_tables:
+            continue
+        entry = checkpoints.get(index_name)
+        if use_aliases and entry and es.indices.exists(index=entry["index"]):
+            targets[index_name] = entry["index"]
+        elif use_aliases:
+            targets[index_name] = new_version_name(es, index_name)
+        else:
+            targets[index_name] = index_name
+    index_mappings = {targets[index_name]: mapping for index_name, mapping in mappings.items()
+                      if index_name in targets}
     
-    # Resultados totales
-    total_success = 0
-    total_errors = 0
-    processed_tables = []
+    phase_timings = {}
+    phase_start = time.time()
+    # Un índice en uso con _id de otro esquema se recrea y su tabla se carga completa
+    recreated = outdated_indices(es, index_mappings)
+    for table_name in recreated:
+        checkpoints.pop(table_name, None)
+    created_indices, failed_indices = create_indices(es, index_mappings, load_profile=load_profile)
+    phase_timings["creación de índices"] = time.time() - phase_start
+    if failed_indices:
+        logger.warning(f"Algunos índices no pudieron crearse: {failed_indices}")
+    
+    # Tablas que no llegan a cargarse
     failed_tables = []
+    batch_size = 1000
     
-    # Procesar cada tabla
-    for index_name, config in tables_config.items():
+    # Tablas con índice y archivo disponibles
+    tables = {}
+    for table_name, config in TABLES_CONFIG.items():
+        if table_name in skipped_tables:
+            continue
+        index_name = targets.get(table_name, table_name)
         if index_name not in created_indices:
             logger.warning(f"Omitiendo tabla {index_name} porque el índice no existe")
             continue
             
-        csv_path = os.path.join(csv_dir, config["csv_file"])
+        csv_path = resolve_csv_path(CSV_DIR, config["csv_file"])
         
         if not os.path.exists(csv_path):
             logger.error(f"No se encontró el archivo {csv_path}")
             failed_tables.append(index_name)
             continue
-            
-        df = process_csv_data(csv_path)
-        if df is None:
+        
+        # Claves completas y únicas antes de enviar cualquier lote
+        read_spec = read_spec_for_csv(csv_path, mappings[table_name])
+        expected_docs = validate_table_ids(csv_path, config.get("id_field"), read_spec)
+        if expected_docs is None:
+            logger.error(f"Omitiendo tabla {index_name}: claves {config.get('id_field')} incompletas o repetidas")
             failed_tables.append(index_name)
             continue
-            
-        # Importar a Elasticsearch
-        success, errors = import_csv_to_elastic(
-            es, 
-            df, 
-            index_name,
-            config.get("id_field"),
-            batch_size=1000
-         )
-
         
+        tables[index_name] = {
+            "table": table_name,
+            "csv_path": csv_path,
+            "id_field": config.get("id_field"),
+            "fingerprint": fingerprints.get(table_name),
+            "offset": checkpoints.get(table_name, {}).get("offset", 0),
+            "read_spec": read_spec,
+            "reader": config.get("reader", "pandas"),
+            "entity_field": config.get("entity_field"),
+            "expected_docs": expected_docs
+        }
+    
+    # Manifiesto de hashes para la carga incremental
+    manifest = open_manifest(manifest_path) if incremental else None
+    if manifest is not None:
+        for table_name in recreated:
+            save_hashes(manifest, table_name, {})
+    
+    controller = None
+    if adaptive and (incremental or processes > 1):
+        logger.warning("adaptive solo aplica a la carga secuencial o con workers; se usa tamaño fijo")
+    elif adaptive:
+        controller = AdaptiveBulkController(bulk_bytes or DEFAULT_BULK_BYTES, max_concurrency=workers)
+    
+    # Procesar cada tabla
+    phase_start = time.time()
+    try:
+        results = import_tables(
+            es, tables, batch_size,
+            stream=stream, workers=workers, queue_depth=queue_depth, processes=processes,
+            manifest=manifest, journal_path=journal_path if journaling else None,
+            cache_dir=cache_dir, bulk_bytes=bulk_bytes, controller=controller,
+            dead_letter_path=dead_letter_path
+        )
+        if use_aliases:
+            # Versiones creadas pero sin datos (CSV ausente o ilegible): se borran
+            # antes de restaurarlas y ya no se cuentan ni se publican
+            for index_name in list(targets.values()):
+                if index_name in created_indices and index_name not in results:
+                    es.indices.delete(index=index_name, ignore_unavailable=True)
+                    created_indices.remove(index_name)
+                    logger.info(f"Versión vacía {index_name} eliminada")
+    finally:
+        if manifest is not None:
+            manifest.close()
+        phase_timings["carga"] = time.time() - phase_start
+        if load_profile:
+            phase_timings.update(finalize_indices(es, index_mappings, created_indices, force_merge=force_merge))
+    
+    # Comparar cada índice con su CSV por agregados
+    reports = {}
+    if verify:
+        phase_start = time.time()
+        loaded = {index_name: table for index_name, table in tables.items() if index_name in results}
+        reports = verify_tables(es, loaded, mappings, dead_letter_path=dead_letter_path, since=run_started)
+        phase_timings["verificación"] = time.time() - phase_start
+    
+    # Cambiar los alias a las versiones nuevas que cargaron completas
+    if use_aliases:
+        phase_start = time.time()
+        for alias, index_name in targets.items():
+            if index_name not in created_indices:
+                continue
+            success, errors = results[index_name]
+            # Una fila por documento: las claves se validaron antes de cargar
+            expected_count = tables[index_name]["expected_docs"]
+            verified = reports.get(index_name, {}).get("ok", True)
+            if errors > 0 or not verified or not swap_alias(es, alias, index_name, expected_count=expected_count):
+                logger.warning(f"El alias {alias} sigue apuntando a la versión anterior; {index_name} queda sin publicar")
+            prune_versions(es, alias, keep=keep_versions)
+        phase_timings["cambio de alias"] = time.time() - phase_start
+    
+    counts = count_documents(es, created_indices)
+    log_summary(time.time() - start_time, phase_timings, results, tables, failed_tables, skipped_tables,
+                counts, controller)
+
+def count_documents(es, index_names: List[str]) -> Dict[str, Union[int, Exception]]:
+    """Conteo final de documentos de cada índice (o el error al contarlo)"""
+    counts = {}
+    for index_name in index_names:
+        try:
+            counts[index_name] = es.count(index=index_name)["count"]
+        except Exception as e:
+            counts[index_name] = e
+    return counts
+
+def log_summary(
+    elapsed_time: float,
+    phase_timings: Dict[str, float],
+    results: Dict[str, Tuple[int, int]],
+    tables: Dict[str, Dict[str, Any]],
+    failed_tables: List[str],
+    skipped_tables: List[str],
+    counts: Dict[str, Union[int, Exception]],
+    controller: Optional[AdaptiveBulkController] = None
+) -> None:
+    """Resumen final de la carga (compartido por main y main_async)"""
+    total_success = 0
+    total_errors = 0
+    processed_tables = []
+    failed_tables = failed_tables + [index_name for index_name in tables if index_name not in results]
+    for index_name, (success, errors) in results.items():
         total_success += success
         total_errors += errors
         
@@ -1032,9 +1060,15 @@ def main():
             failed_tables.append(f"{index_name} (parcial: {success}/{success+errors})")
     
     # Resumen pa saber que pedo
-    elapsed_time = time.time() - start_time
     logger.info("=" * 60)
     logger.info(f"Proceso completado en {elapsed_time:.2f} segundos")
+    for phase, seconds in phase_timings.items():
+        logger.info(f"  Fase {phase}: {seconds:.2f} segundos")
+    if controller is not None:
+        state = controller.summary()
+        logger.info(f"Bulk adaptativo: {state['requests']} peticiones, {state['rejected']} rechazos, "
+                    f"{state['backoff_s']:.1f} s de espera; terminó en {state['bulk_mb']} MB "
+                    f"y {state['concurrency']} peticiones simultáneas")
     logger.info(f"Total documentos indexados: {total_success}")
     logger.info(f"Total errores: {total_errors}")
     logger.info(f"Tablas procesadas correctamente: {len(processed_tables)}")
@@ -1044,16 +1078,51 @@ def main():
         logger.info(f"Tablas OK: {', '.join(processed_tables)}")
     if failed_tables:
         logger.warning(f"Tablas con errores: {', '.join(failed_tables)}")
+    if skipped_tables:
+        logger.info(f"Tablas omitidas (ya cargadas): {', '.join(skipped_tables)}")
     
     # El conteo final
-    for index_name in created_indices:
-        try:
-            count = es.count(index=index_name)["count"]
+    for index_name, count in counts.items():
+        if isinstance(count, Exception):
+            logger.error(f"Error al contar documentos en {index_name}: {str(count)}")
+        else:
             logger.info(f"Índice {index_name}: {count} documentos")
-        except Exception as e:
-            logger.error(f"Error al contar documentos en {index_name}: {str(e)}")
     
     logger.info("=" * 60)
 
+def parse_megabytes(value: str) -> int:
+    """Convierte un tamaño en MB de la línea de comandos a bytes"""
+    return int(float(value) * 1024 * 1024)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Opciones de línea de comandos equivalentes a los parámetros de main()"""
+    parser = argparse.ArgumentParser(description="Importa los CSV censales del INEGI a Elasticsearch")
+    parser.add_argument("--stream", action="store_true", help="leer cada CSV por bloques")
+    parser.add_argument("--workers", type=int, default=1, help="peticiones bulk simultáneas")
+    parser.add_argument("--queue-depth", type=int, default=4, help="lotes en cola para los workers")
+    parser.add_argument("--processes", type=int, default=1, help="procesos para leer y serializar")
+    parser.add_argument("--no-load-profile", dest="load_profile", action="store_false",
+                        help="crear los índices directamente con los settings de producción")
+    parser.add_argument("--force-merge", action="store_true", help="fusionar segmentos al terminar")
+    parser.add_argument("--use-aliases", action="store_true", help="cargar en versiones nuevas detrás de alias")
+    parser.add_argument("--keep-versions", type=int, default=2, help="versiones que se conservan por alias")
+    parser.add_argument("--incremental", action="store_true", help="enviar solo documentos que cambiaron")
+    parser.add_argument("--manifest-path", default=DEFAULT_MANIFEST_PATH, help="manifiesto de hashes")
+    parser.add_argument("--resume", action="store_true", help="continuar desde el último checkpoint")
+    parser.add_argument("--journal-path", default=DEFAULT_JOURNAL_PATH, help="diario de checkpoints")
+    parser.add_argument("--cache", dest="cache_dir", nargs="?", const=DEFAULT_CACHE_DIR, default=None,
+                        help="leer los CSV desde una caché Arrow (directorio opcional)")
+    parser.add_argument("--mapping-profile", choices=MAPPING_PROFILES, default="default",
+                        help="mappings por defecto o compactos (tipos mínimos, métricas sin índice)")
+    parser.add_argument("--bulk-mb", dest="bulk_bytes", type=parse_megabytes, default=DEFAULT_BULK_BYTES,
+                        help="tamaño objetivo de cada petición bulk en MB (0 = cortar cada 1000 filas)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="ajustar tamaño de petición y concurrencia (hasta --workers) según el cluster")
+    parser.add_argument("--dead-letter-path", default=DEFAULT_DEAD_LETTER_PATH,
+                        help="archivo NDJSON con los documentos rechazados y su motivo")
+    parser.add_argument("--verify", action="store_true",
+                        help="comparar cada índice con su CSV por sumas, nulos y documentos por entidad")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    main()
+    main(**vars(parse_args()))
@@ -0,0 +1,387 @@
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bigdata_final import (
+    CSV_DIR,
+    TABLES_CONFIG,
+    count_documents,
+    create_indices,
+    finalize_indices,
+    get_mappings,
+    log_summary,
+    parse_megabytes,
+    read_table_data,
+    validate_table_ids,
+)
+from csv_cache import DEFAULT_CACHE_DIR
+from csv_input import resolve_csv_path
+from csv_schema import read_spec_for_csv
+from dead_letter import DEFAULT_DEAD_LETTER_PATH, write_dead_letters
+from es_client import connect_elasticsearch
+from index_lifecycle import outdated_indices
+from ingest_utils import DEFAULT_BULK_BYTES, MAX_BULK_DOCS, file_fingerprint, iter_bulk_bodies, send_bulk_body
+from mapping_registry import MAPPING_PROFILES
+
+logger = logging.getLogger(__name__)
+
+# Directorio de los artefactos: un subdirectorio de segmentos por tabla y manifest.json
+DEFAULT_ARTIFACT_DIR = "./.bulk_artifacts/"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Tamaño máximo de cada segmento NDJSON (un segmento siempre contiene cuerpos completos)
+DEFAULT_SEGMENT_BYTES = 256 * 1024 * 1024
+
+
+def row_ranges(rows: Sequence[Any]) -> Optional[List[List[int]]]:
+    """Filas del CSV como rangos [inicio, fin) consecutivos (None si alguna no es un entero)"""
+    ranges = []
+    for row in rows:
+        if not isinstance(row, int):
+            return None
+        if ranges and ranges[-1][1] == row:
+            ranges[-1][1] += 1
+        else:
+            ranges.append([row, row + 1])
+    return ranges
+
+
+def expand_rows(ranges: Optional[List[List[int]]]) -> Optional[List[int]]:
+    """Filas del CSV de un cuerpo a partir de sus rangos (inverso de row_ranges)"""
+    if ranges is None:
+        return None
+    return [row for start, end in ranges for row in range(start, end)]
+
+
+def read_manifest(artifact_dir: str) -> Dict[str, Any]:
+    """Manifiesto de los artefactos; uno ausente se trata como vacío"""
+    try:
+        with open(os.path.join(artifact_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {"version": MANIFEST_VERSION, "tables": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Versión de manifiesto no soportada en {artifact_dir}: {manifest.get('version')}")
+    return manifest
+
+
+def write_manifest(artifact_dir: str, manifest: Dict[str, Any]) -> None:
+    """Escribe el manifiesto de forma atómica (archivo temporal + rename)"""
+    path = os.path.join(artifact_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _is_current(artifact_dir: str, entry: Optional[Dict[str, Any]], fingerprint: Dict[str, Any],
+                mapping: Dict[str, Any], bulk_bytes: Optional[int]) -> bool:
+    """Si los segmentos de una tabla se armaron con el mismo CSV, mapping y tamaño de petición"""
+    if not entry:
+        return False
+    return (entry["source"]["sha256"] == fingerprint["sha256"]
+            and entry["mapping"] == json.loads(json.dumps(mapping))
+            and entry["bulk_bytes"] == bulk_bytes
+            and all(os.path.exists(os.path.join(artifact_dir, segment["file"])) for segment in entry["segments"]))
+
+
+def build_table_artifact(
+    artifact_dir: str,
+    index_name: str,
+    table: Dict[str, Any],
+    batch_size: int = 1000,
+    bulk_bytes: Optional[int] = DEFAULT_BULK_BYTES,
+    segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+    cache_dir: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Serializa una tabla a segmentos NDJSON en artifact_dir/<índice>/ y retorna su entrada del manifiesto
+
+    Los cuerpos son los mismos que enviaría la carga secuencial con bulk_bytes
+    (iter_bulk_bodies); por cada uno se guarda su posición en el segmento, sus
+    documentos y sus filas del CSV. Los segmentos se escriben en un directorio
+    temporal que reemplaza al anterior solo al terminar.
+    """
+    data = read_table_data(table["csv_path"], batch_size, stream=True, cache_dir=cache_dir,
+                           spec=table.get("read_spec"), reader=table.get("reader", "pandas"))
+    if data is None:
+        return None
+
+    table_dir = os.path.join(artifact_dir, index_name)
+    tmp_dir = f"{table_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    segments = []
+    out = None
+    digest = None
+
+    def close_segment():
+        if out is not None:
+            out.close()
+            segments[-1]["sha256"] = digest.hexdigest()
+
+    try:
+        for body, rows in iter_bulk_bodies(data, index_name, table["id_field"], max_bytes=bulk_bytes,
+                                           max_docs=MAX_BULK_DOCS if bulk_bytes else batch_size):
+            if out is None or segments[-1]["bytes"] + len(body) > segment_bytes:
+                close_segment()
+                name = f"{len(segments):05d}.ndjson"
+                out = open(os.path.join(tmp_dir, name), 'wb')
+                digest = hashlib.sha256()
+                segments.append({"file": f"{index_name}/{name}", "bytes": 0, "bodies": []})
+            segment = segments[-1]
+            segment["bodies"].append({
+                "offset": segment["bytes"],
+                "length": len(body),
+                "docs": len(rows),
+                "rows": row_ranges(rows)
+            })
+            out.write(body)
+            digest.update(body)
+            segment["bytes"] += len(body)
+    finally:
+        close_segment()
+
+    shutil.rmtree(table_dir, ignore_errors=True)
+    os.replace(tmp_dir, table_dir)
+    documents = sum(body["docs"] for segment in segments for body in segment["bodies"])
+    logger.info(f"{index_name}: {documents} documentos en {len(segments)} segmentos "
+                f"({sum(segment['bytes'] for segment in segments) / 1024 / 1024:.1f} MB)")
+    return {
+        "documents": documents,
+        "expected_docs": table["expected_docs"],
+        "segments": segments
+    }
+
+
+def build_artifacts(
+    artifact_dir: str = DEFAULT_ARTIFACT_DIR,
+    tables: Optional[List[str]] = None,
+    mapping_profile: str = "default",
+    bulk_bytes: Optional[int] = DEFAULT_BULK_BYTES,
+    segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+    cache_dir: Optional[str] = None,
+    force: bool = False
+) -> Dict[str, Any]:
+    """Fase build: convierte las tablas en cuerpos bulk listos para enviar, sin conectarse al cluster
+
+    Valida las claves igual que main() y guarda en el manifiesto, por tabla,
+    la huella del CSV, el mapping de producción y la ubicación de cada cuerpo.
+    Una tabla cuyo CSV, mapping y bulk_bytes no cambiaron conserva sus
+    segmentos (salvo con force=True).
+    """
+    start_time = time.time()
+    os.makedirs(artifact_dir, exist_ok=True)
+    manifest = read_manifest(artifact_dir)
+    mappings = get_mappings(mapping_profile)
+    batch_size = 1000
+
+    for table_name in tables or list(TABLES_CONFIG):
+        config = TABLES_CONFIG[table_name]
+        csv_path = resolve_csv_path(CSV_DIR, config["csv_file"])
+        if not os.path.exists(csv_path):
+            logger.error(f"No se encontró el archivo {csv_path}")
+            continue
+
+        fingerprint = file_fingerprint(csv_path)
+        if not force and _is_current(artifact_dir, manifest["tables"].get(table_name), fingerprint,
+                                     mappings[table_name], bulk_bytes):
+            logger.info(f"{table_name}: el CSV no cambió desde el último build; se conservan sus segmentos")
+            continue
+
+        read_spec = read_spec_for_csv(csv_path, mappings[table_name])
+        expected_docs = validate_table_ids(csv_path, config.get("id_field"), read_spec)
+        if expected_docs is None:
+            logger.error(f"Omitiendo tabla {table_name}: claves {config.get('id_field')} incompletas o repetidas")
+            continue
+
+        table = {
+            "csv_path": csv_path,
+            "id_field": config.get("id_field"),
+            "read_spec": read_spec,
+            "reader": config.get("reader", "pandas"),
+            "expected_docs": expected_docs
+        }
+        entry = build_table_artifact(artifact_dir, table_name, table, batch_size, bulk_bytes, segment_bytes,
+                                     cache_dir)
+        if entry is None:
+            continue
+        manifest["tables"][table_name] = {
+            "index": table_name,
+            "source": fingerprint,
+            "mapping": mappings[table_name],
+            "bulk_bytes": bulk_bytes,
+            "built_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            **entry
+        }
+        write_manifest(artifact_dir, manifest)
+
+    logger.info(f"Build completado en {time.time() - start_time:.2f} segundos")
+    return manifest
+
+
+def _segment_error(mm: mmap.mmap, segment: Dict[str, Any], verify: bool) -> Optional[str]:
+    """Motivo por el que un segmento no coincide con el manifiesto (None si está bien)"""
+    if len(mm) != segment["bytes"]:
+        return f"tiene {len(mm)} bytes y el manifiesto dice {segment['bytes']}"
+    if verify and hashlib.sha256(mm).hexdigest() != segment["sha256"]:
+        return "su SHA-256 no coincide con el manifiesto"
+    return None
+
+
+def ship_table_artifact(
+    es,
+    artifact_dir: str,
+    entry: Dict[str, Any],
+    workers: int = 1,
+    verify: bool = False,
+    dead_letter_path: Optional[str] = DEFAULT_DEAD_LETTER_PATH
+) -> Tuple[int, int]:
+    """Envía los cuerpos de una tabla desde sus segmentos mapeados en memoria y retorna (éxitos, errores)
+
+    Cada cuerpo es un slice del segmento que va tal cual a send_bulk_body
+    (con workers peticiones simultáneas), sin tocar los documentos. Un
+    segmento que no coincide con el manifiesto cuenta todos sus documentos
+    como errores.
+    """
+    index_name = entry["index"]
+    success_count = 0
+    error_count = 0
+    for segment in entry["segments"]:
+        path = os.path.join(artifact_dir, segment["file"])
+        segment_docs = sum(body["docs"] for body in segment["bodies"])
+        try:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                error = _segment_error(mm, segment, verify)
+                if error:
+                    logger.error(f"El segmento {path} {error}; se omite")
+                    error_count += segment_docs
+                    continue
+
+                def send(body: Dict[str, Any]) -> Tuple[int, List[Dict[str, Any]]]:
+                    return send_bulk_body(es, mm[body["offset"]:body["offset"] + body["length"]],
+                                          rows=expand_rows(body["rows"]))
+
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    for success, failures in pool.map(send, segment["bodies"]):
+                        write_dead_letters(dead_letter_path, failures)
+                        success_count += success
+                        error_count += len(failures)
+        except (OSError, ValueError) as e:
+            logger.error(f"No se pudo leer el segmento {path}: {str(e)}")
+            error_count += segment_docs
+            continue
+        logger.info(f"{index_name}: segmento {segment['file']} enviado, "
+                    f"acumulado {success_count} éxitos, {error_count} errores")
+    return success_count, error_count
+
+
+def ship_artifacts(
+    artifact_dir: str = DEFAULT_ARTIFACT_DIR,
+    tables: Optional[List[str]] = None,
+    workers: int = 1,
+    load_profile: bool = True,
+    force_merge: bool = False,
+    verify: bool = False,
+    dead_letter_path: str = DEFAULT_DEAD_LETTER_PATH
+):
+    """Fase ship: crea los índices con el mapping del manifiesto y envía los cuerpos ya armados
+
+    No necesita los CSV: basta con artifact_dir, que puede venir de otra
+    máquina. Termina con el mismo resumen que main().
+    """
+    start_time = time.time()
+    manifest = read_manifest(artifact_dir)
+    entries = {table_name: entry for table_name, entry in manifest["tables"].items()
+               if not tables or table_name in tables}
+    if not entries:
+        logger.error(f"No hay artefactos que enviar en {artifact_dir}")
+        return
+
+    es = connect_elasticsearch(concurrency=workers)
+    if not es:
+        logger.error("No se puede continuar sin conexión a Elasticsearch")
+        return
+
+    mappings = {entry["index"]: entry["mapping"] for entry in entries.values()}
+    phase_timings = {}
+    phase_start = time.time()
+    # Un índice con _id de otro esquema se recrea antes de enviar (ver outdated_indices)
+    outdated_indices(es, mappings)
+    created_indices, failed_indices = create_indices(es, mappings, load_profile=load_profile)
+    phase_timings["creación de índices"] = time.time() - phase_start
+    if failed_indices:
+        logger.warning(f"Algunos índices no pudieron crearse: {failed_indices}")
+
+    results = {}
+    phase_start = time.time()
+    try:
+        for entry in entries.values():
+            if entry["index"] not in created_indices:
+                logger.warning(f"Omitiendo tabla {entry['index']} porque el índice no existe")
+                continue
+            results[entry["index"]] = ship_table_artifact(es, artifact_dir, entry, workers=workers, verify=verify,
+                                                          dead_letter_path=dead_letter_path)
+    finally:
+        phase_timings["envío"] = time.time() - phase_start
+        if load_profile:
+            phase_timings.update(finalize_indices(es, mappings, created_indices, force_merge=force_merge))
+
+    counts = count_documents(es, created_indices)
+    for entry in entries.values():
+        count = counts.get(entry["index"])
+        if isinstance(count, int) and count != entry["expected_docs"]:
+            logger.warning(f"{entry['index']}: {count} documentos en el índice, se esperaban {entry['expected_docs']}")
+    log_summary(time.time() - start_time, phase_timings, results, mappings, failed_indices, [], counts)
+    return results
+
+
+def main(command: str, **options):
+    """Ejecuta la fase build o ship con las opciones de la línea de comandos"""
+    if command == "build":
+        return build_artifacts(**options)
+    return ship_artifacts(**options)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Opciones de línea de comandos equivalentes a los parámetros de build_artifacts() y ship_artifacts()"""
+    parser = argparse.ArgumentParser(description="Arma cuerpos bulk de los CSV censales y los envía después")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="serializar las tablas a segmentos NDJSON con su manifiesto")
+    build.add_argument("--mapping-profile", choices=MAPPING_PROFILES, default="default",
+                       help="mappings por defecto o compactos (tipos mínimos, métricas sin índice)")
+    build.add_argument("--bulk-mb", dest="bulk_bytes", type=parse_megabytes, default=DEFAULT_BULK_BYTES,
+                       help="tamaño objetivo de cada petición bulk en MB (0 = cortar cada 1000 filas)")
+    build.add_argument("--segment-mb", dest="segment_bytes", type=parse_megabytes,
+                       default=DEFAULT_SEGMENT_BYTES, help="tamaño máximo de cada segmento en MB")
+    build.add_argument("--cache", dest="cache_dir", nargs="?", const=DEFAULT_CACHE_DIR, default=None,
+                       help="leer los CSV desde una caché Arrow (directorio opcional)")
+    build.add_argument("--force", action="store_true", help="rearmar también las tablas que no cambiaron")
+
+    ship = commands.add_parser("ship", help="enviar al cluster los segmentos de un build")
+    ship.add_argument("--workers", type=int, default=1, help="peticiones bulk simultáneas")
+    ship.add_argument("--no-load-profile", dest="load_profile", action="store_false",
+                      help="crear los índices directamente con los settings de producción")
+    ship.add_argument("--force-merge", action="store_true", help="fusionar segmentos al terminar")
+    ship.add_argument("--verify", action="store_true", help="comprobar el SHA-256 de cada segmento antes de enviarlo")
+    ship.add_argument("--dead-letter-path", default=DEFAULT_DEAD_LETTER_PATH,
+                      help="archivo NDJSON con los documentos rechazados y su motivo")
+
+    for command in (build, ship):
+        command.add_argument("--dir", dest="artifact_dir", default=DEFAULT_ARTIFACT_DIR,
+                             help="directorio de los segmentos y el manifiesto")
+        command.add_argument("--table", dest="tables", action="append", choices=list(TABLES_CONFIG),
+                             help="solo esta tabla (repetible)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(**vars(parse_args()))
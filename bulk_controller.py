@@ -0,0 +1,175 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dead_letter import operation_failure, request_failure
+from ingest_utils import DEFAULT_BULK_BYTES, body_row, bulk_item_results, bulk_operations, retryable_error
+
+logger = logging.getLogger(__name__)
+
+# Límites del tamaño de petición que el controlador puede elegir
+MIN_BULK_BYTES = 1 * 1024 * 1024
+MAX_BULK_BYTES = 15 * 1024 * 1024
+
+# Latencia objetivo por petición: por encima se achica el tamaño
+TARGET_LATENCY = 2.0
+
+# Respuestas sanas seguidas antes de abrir una petición simultánea más
+GROW_EVERY = 5
+
+# Un 'took' por MB este múltiplo por encima del mejor visto indica cluster saturado
+SATURATION_RATIO = 1.5
+
+
+class AdaptiveBulkController:
+    """Ajusta el tamaño de petición y las peticiones simultáneas según las respuestas bulk
+
+    Crecimiento aditivo y reducción multiplicativa (AIMD):
+    - rechazos (429 u otro estado transitorio, de ítems o de la petición
+      completa): tamaño a la mitad, una petición simultánea menos y pausa
+      global con espera exponencial y jitter antes de enviar la siguiente;
+    - latencia por encima de target_latency: tamaño al 75 %;
+    - 'took' por MB muy por encima del mejor visto (el cluster tarda más por el
+      mismo trabajo): una petición simultánea menos;
+    - respuesta sana: el tamaño crece step_bytes y cada grow_every respuestas
+      sanas seguidas se abre una petición simultánea más.
+    Es seguro usarlo desde varios hilos a la vez.
+    """
+
+    def __init__(
+        self,
+        bulk_bytes: int = DEFAULT_BULK_BYTES,
+        max_concurrency: int = 1,
+        min_bytes: int = MIN_BULK_BYTES,
+        max_bytes: int = MAX_BULK_BYTES,
+        target_latency: float = TARGET_LATENCY,
+        step_bytes: int = 1024 * 1024,
+        grow_every: int = GROW_EVERY,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        max_retries: int = 5
+    ):
+        self.min_bytes = min_bytes
+        self.max_bytes = max(max_bytes, min_bytes)
+        self.bulk_bytes = min(max(bulk_bytes, self.min_bytes), self.max_bytes)
+        self.max_concurrency = max(max_concurrency, 1)
+        self.concurrency = 1
+        self.target_latency = target_latency
+        self.step_bytes = step_bytes
+        self.grow_every = grow_every
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self._healthy = 0
+        self._rejections = 0
+        self._best_took_per_mb = None
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "rejected": 0, "backoff_s": 0.0}
+
+    def current_bytes(self) -> int:
+        """Tamaño de petición a usar en el siguiente cuerpo"""
+        return self.bulk_bytes
+
+    def backoff(self, attempt: int) -> float:
+        """Espera exponencial con jitter completo para el intento dado"""
+        return random.uniform(0, min(self.max_backoff, self.initial_backoff * 2 ** attempt))
+
+    def wait(self) -> None:
+        """Respeta la pausa global que dejó el último rechazo"""
+        delay = self._pause_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, latency: float, took_ms: Optional[float], body_bytes: int, rejected: int) -> None:
+        """Registra una respuesta bulk (rejected: ítems con estado transitorio) y ajusta tamaño y concurrencia"""
+        with self._lock:
+            self.stats["requests"] += 1
+            previous = (self.bulk_bytes, self.concurrency)
+            if rejected:
+                self.stats["rejected"] += rejected
+                self._healthy = 0
+                self.bulk_bytes = max(self.min_bytes, self.bulk_bytes // 2)
+                self.concurrency = max(1, self.concurrency - 1)
+                delay = self.backoff(self._rejections)
+                self._rejections += 1
+                self._pause_until = max(self._pause_until, time.monotonic() + delay)
+                self.stats["backoff_s"] += delay
+            else:
+                self._rejections = 0
+                saturated = self._saturated(took_ms, body_bytes)
+                if latency > self.target_latency:
+                    self._healthy = 0
+                    self.bulk_bytes = max(self.min_bytes, int(self.bulk_bytes * 0.75))
+                if saturated:
+                    self._healthy = 0
+                    self.concurrency = max(1, self.concurrency - 1)
+                if latency <= self.target_latency and not saturated:
+                    self._healthy += 1
+                    self.bulk_bytes = min(self.max_bytes, self.bulk_bytes + self.step_bytes)
+                    if self._healthy % self.grow_every == 0:
+                        self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            if (self.bulk_bytes, self.concurrency) != previous:
+                logger.debug(f"Bulk adaptativo: {self.bulk_bytes / (1024 * 1024):.1f} MB, "
+                             f"{self.concurrency} peticiones simultáneas")
+
+    def _saturated(self, took_ms: Optional[float], body_bytes: int) -> bool:
+        """Compara el 'took' por MB de la respuesta con el mejor visto hasta ahora"""
+        if took_ms is None or body_bytes <= 0:
+            return False
+        took_per_mb = took_ms / (body_bytes / (1024 * 1024))
+        if self._best_took_per_mb is None or took_per_mb < self._best_took_per_mb:
+            self._best_took_per_mb = took_per_mb
+            return False
+        return took_per_mb > self._best_took_per_mb * SATURATION_RATIO
+
+    def send(self, es, body: bytes, rows: Optional[Sequence[Any]] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """Envía un cuerpo NDJSON y reintenta solo los ítems transitorios con backoff
+
+        Retorna (éxitos, fallidos) como send_bulk_body: los fallidos son entradas
+        de dead letter con su fila de rows. Una petición completa rechazada por
+        un error transitorio (429, timeout...) cuenta como rechazo de todos sus
+        ítems: ajusta tamaño, concurrencia y pausa, y el cuerpo se reenvía.
+        """
+        success_count = 0
+        failures = []
+        for attempt in range(self.max_retries + 1):
+            self.wait()
+            start = time.perf_counter()
+            try:
+                response = es.bulk(operations=body)
+            except Exception as e:
+                if retryable_error(e):
+                    self.record(time.perf_counter() - start, None, len(body), rejected=len(bulk_operations(body)))
+                    if attempt < self.max_retries:
+                        logger.warning(f"Petición bulk rechazada ({str(e)}); "
+                                       f"reintento {attempt + 1} de {self.max_retries}")
+                        continue
+                logger.error(f"Error en petición bulk: {str(e)}")
+                failures.extend(request_failure(operation, e, body_row(rows, i))
+                                for i, operation in enumerate(bulk_operations(body)))
+                break
+            latency = time.perf_counter() - start
+            success, failed, retry = bulk_item_results(response, retry=attempt < self.max_retries)
+            self.record(latency, response.get("took"), len(body), len(retry))
+            success_count += success
+            if not failed and not retry:
+                break
+            operations = bulk_operations(body)
+            failures.extend(operation_failure(operations[i], result, body_row(rows, i)) for i, result in failed)
+            if not retry:
+                break
+            body = b''.join(operations[i] for i in retry)
+            if rows is not None:
+                rows = [rows[i] for i in retry]
+        return success_count, failures
+
+    def summary(self) -> Dict[str, Any]:
+        """Estado final del controlador para el resumen de la carga"""
+        return {
+            "bulk_mb": round(self.bulk_bytes / (1024 * 1024), 1),
+            "concurrency": self.concurrency,
+            **self.stats
+        }
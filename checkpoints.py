@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from ingest_utils import file_fingerprint, file_sha256
+
+logger = logging.getLogger(__name__)
+
+# Diario de checkpoints: último lote confirmado por tabla y archivo de entrada
+DEFAULT_JOURNAL_PATH = "./.ingest_state/checkpoints.json"
+
+
+def _read_journal(path: str) -> Dict[str, Any]:
+    """Lee el diario completo; un diario ausente o corrupto se trata como vacío"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudo leer el diario de checkpoints {path}: {str(e)}")
+        return {}
+
+
+def _write_journal(path: str, journal: Dict[str, Any]) -> None:
+    """Escribe el diario de forma atómica (archivo temporal + rename)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(journal, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def input_fingerprint(path: str, table_name: str, csv_path: str, confirm: bool = False) -> Dict[str, Any]:
+    """Huella del CSV de una tabla para el diario, leyendo el archivo solo cuando hace falta
+
+    Si la entrada de la tabla en el diario es del mismo archivo (ruta, tamaño
+    y mtime) se reutiliza su SHA-256 sin leer el CSV; un archivo nuevo o
+    cambiado se lee una vez para la entrada nueva. Con confirm=True (al
+    reanudar) el hash se recalcula siempre, para no continuar una carga sobre
+    un contenido distinto que conservó tamaño y mtime.
+    """
+    fingerprint = file_fingerprint(csv_path, content_hash=False)
+    stored = (_read_journal(path).get(table_name) or {}).get("fingerprint") or {}
+    same_file = all(stored.get(key) == fingerprint[key] for key in ("path", "size", "mtime"))
+    if same_file and stored.get("sha256") and not confirm:
+        fingerprint["sha256"] = stored["sha256"]
+    else:
+        fingerprint["sha256"] = file_sha256(csv_path)
+    return fingerprint
+
+
+def get_checkpoint(path: str, table_name: str, fingerprint: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Checkpoint de la tabla si corresponde al mismo archivo de entrada"""
+    entry = _read_journal(path).get(table_name)
+    if not entry:
+        return None
+    if entry.get("fingerprint", {}).get("sha256") != fingerprint["sha256"]:
+        logger.info(f"El CSV de {table_name} cambió desde el último checkpoint; se carga desde el inicio")
+        return None
+    return entry
+
+
+def save_checkpoint(
+    path: str,
+    table_name: str,
+    index_name: str,
+    fingerprint: Dict[str, Any],
+    offset: int,
+    completed: bool = False
+) -> None:
+    """Registra que las primeras offset filas del CSV ya fueron confirmadas por el cluster
+
+    completed=True marca la tabla como cargada por completo: al reanudar se omite.
+    """
+    journal = _read_journal(path)
+    journal[table_name] = {
+        "index": index_name,
+        "fingerprint": fingerprint,
+        "offset": offset,
+        "completed": completed,
+        "updated": time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    _write_journal(path, journal)
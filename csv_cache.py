@@ -0,0 +1,150 @@
+import glob
+import hashlib
+import logging
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from ingest_utils import file_fingerprint
+
+try:
+    import pyarrow as pa
+except ImportError:  # la caché es opcional: sin pyarrow se lee siempre el CSV
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# Caché Arrow IPC de los CSV ya leídos y limpiados
+DEFAULT_CACHE_DIR = "./.ingest_state/csv_cache"
+
+
+def cache_path(
+    csv_path: str,
+    fingerprint: Dict[str, Any],
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    variant: str = "",
+    version: str = ""
+) -> str:
+    """Archivo de caché para una versión concreta del CSV (ruta, tamaño, mtime y contenido)
+
+    variant distingue lecturas del mismo archivo que producen tipos distintos;
+    version (p. ej. la huella de la especificación de lectura) invalida la caché
+    anterior de la misma variante cuando cambia.
+    """
+    key_source = (f"{fingerprint['path']}|{fingerprint['size']}|{fingerprint['mtime']}|"
+                  f"{fingerprint['sha256']}|{variant}|{version}")
+    key = hashlib.sha256(key_source.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{_cache_prefix(csv_path, variant)}.{key}.arrow")
+
+
+def _cache_prefix(csv_path: str, variant: str) -> str:
+    """Prefijo común a todas las cachés de un CSV y variante"""
+    return f"{os.path.basename(csv_path)}.{variant or 'full'}"
+
+
+def _decode_dictionaries(table: "pa.Table") -> "pa.Table":
+    """Guarda las categorías como sus valores: un archivo IPC admite un solo diccionario por columna"""
+    fields = [field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+              for field in table.schema]
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+
+def _write_cache(path: str, batches: Iterable[pd.DataFrame]) -> None:
+    """Escribe los bloques en un archivo Arrow IPC sin comprimir (para poder mapearlo en memoria)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    writer = None
+    schema = None
+    try:
+        for batch_df in batches:
+            table = _decode_dictionaries(pa.Table.from_pandas(batch_df, preserve_index=False))
+            if writer is None:
+                schema = table.schema
+                writer = pa.ipc.new_file(tmp_path, schema)
+            else:
+                table = table.cast(schema)
+            writer.write_table(table)
+        if writer is None:
+            raise ValueError("El CSV no produjo ningún bloque para la caché")
+        writer.close()
+        os.replace(tmp_path, path)
+    except Exception:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _remove_stale(csv_path: str, keep_path: str, cache_dir: str, variant: str) -> None:
+    """Borra las cachés de versiones anteriores del mismo CSV y variante"""
+    pattern = os.path.join(cache_dir, f"{glob.escape(_cache_prefix(csv_path, variant))}.*.arrow")
+    for path in glob.glob(pattern):
+        if path != keep_path:
+            os.remove(path)
+
+
+def cached_table(
+    csv_path: str,
+    reader: Callable[[str], Iterable[pd.DataFrame]],
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    variant: str = "",
+    version: str = ""
+) -> Optional["pa.Table"]:
+    """Tabla Arrow mapeada en memoria del CSV, construyendo la caché si hace falta
+
+    reader recibe la ruta y retorna los DataFrames ya limpios y tipados (uno o
+    varios bloques). Retorna None si pyarrow no está instalado o la caché falla.
+    """
+    if pa is None:
+        return None
+    path = cache_path(csv_path, file_fingerprint(csv_path), cache_dir, variant, version)
+    try:
+        if not os.path.exists(path):
+            logger.info(f"Creando caché Arrow de {csv_path}")
+            _write_cache(path, reader(csv_path))
+            _remove_stale(csv_path, path, cache_dir, variant)
+        else:
+            logger.info(f"Usando caché Arrow {path}")
+        return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    except Exception as e:
+        logger.warning(f"No se pudo usar la caché de {csv_path}: {str(e)}")
+        return None
+
+
+def table_to_pandas(table: "pa.Table", skip_rows: int = 0, categories: Optional[List[str]] = None) -> pd.DataFrame:
+    """DataFrame de una tabla cacheada desde skip_rows, con las columnas indicadas como categoría
+
+    El índice sigue la numeración de filas del CSV, como al leerlo directamente.
+    """
+    df = table.slice(skip_rows).to_pandas(categories=_present(table, categories))
+    if skip_rows:
+        df.index += skip_rows
+    return df
+
+
+def iter_cached_batches(
+    table: "pa.Table",
+    batch_size: int = 1000,
+    skip_rows: int = 0,
+    categories: Optional[List[str]] = None
+) -> Iterator[pd.DataFrame]:
+    """Lotes de batch_size filas de una tabla cacheada, sin copiar la tabla completa a pandas
+
+    El índice de cada lote es el número de fila de sus registros en el CSV.
+    """
+    categories = _present(table, categories)
+    first_row = skip_rows
+    for record_batch in table.slice(skip_rows).to_batches(max_chunksize=batch_size):
+        batch_df = record_batch.to_pandas(categories=categories)
+        batch_df.index += first_row
+        first_row += len(batch_df)
+        yield batch_df
+
+
+def _present(table: "pa.Table", columns: Optional[List[str]]) -> Optional[List[str]]:
+    """Las columnas de la lista que existen en la tabla"""
+    if not columns:
+        return None
+    return [col for col in columns if col in table.column_names] or None
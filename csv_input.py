@@ -0,0 +1,65 @@
+import gzip
+import io
+import logging
+import os
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # zstandard es opcional: sin él los .zst se descomprimen con pyarrow
+    zstandard = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow es opcional (ver arrow_reader)
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# Extensiones de los CSV comprimidos que se leen directamente, con su compresión
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
+def csv_compression(csv_path: str) -> Optional[str]:
+    """Compresión del CSV según su extensión ("gzip", "zstd" o None si es texto plano)"""
+    return COMPRESSIONS.get(os.path.splitext(csv_path)[1].lower())
+
+
+def resolve_csv_path(csv_dir: str, csv_file: str) -> str:
+    """Ruta del CSV, o de su versión comprimida (.gz o .zst) si solo existe esa"""
+    csv_path = os.path.join(csv_dir, csv_file)
+    if os.path.exists(csv_path) or csv_compression(csv_path):
+        return csv_path
+    for extension in COMPRESSIONS:
+        if os.path.exists(csv_path + extension):
+            return csv_path + extension
+    return csv_path
+
+
+def open_csv(csv_path: str) -> BinaryIO:
+    """Abre el CSV en binario descomprimiéndolo al vuelo según su extensión
+
+    La descompresión es por flujo: solo se mantiene en memoria el bloque que
+    se está leyendo, nunca el archivo descomprimido completo.
+    """
+    compression = csv_compression(csv_path)
+    if compression == "gzip":
+        return gzip.open(csv_path, 'rb')
+    if compression == "zstd":
+        if zstandard is not None:
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(csv_path, 'rb'), closefd=True))
+        if pa is not None:
+            return pa.input_stream(csv_path, compression="zstd")
+        raise ImportError(f"Para leer {csv_path} se necesita zstandard o pyarrow")
+    return open(csv_path, 'rb')
+
+
+@contextmanager
+def csv_source(csv_path: str) -> Iterator[Union[str, BinaryIO]]:
+    """Lo que se pasa a pd.read_csv: la ruta si es texto plano o el flujo descomprimido"""
+    if not csv_compression(csv_path):
+        yield csv_path
+        return
+    with open_csv(csv_path) as f:
+        yield f
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from csv_input import csv_source
+
+logger = logging.getLogger(__name__)
+
+# Tipo de pandas con el que se lee cada tipo de campo del mapping
+FIELD_DTYPES = {
+    "keyword": str,
+    "text": str,
+    "byte": "Int8",
+    "short": "Int16",
+    "integer": "Int32",
+    "long": "Int64",
+    "half_float": "float64",
+    "float": "float64",
+    "scaled_float": "float64",
+    "double": "float64",
+    "boolean": "boolean",
+}
+
+# Ancho de las claves geográficas del INEGI (p. ej. CVE_SECCION 0338)
+KEY_WIDTHS = {
+    "CVE_ENT": 2,
+    "CVE_DISTRITO": 3,
+    "CVE_MUN": 3,
+    "CVE_SECCION": 4,
+}
+
+# Nombres que se repiten en muchas filas: como categoría se guardan una sola vez
+CATEGORY_FIELDS = ("DESC_ENT", "NOM_ENT", "DESC_MUN")
+
+# Marcas del INEGI para datos confidenciales o no disponibles en columnas numéricas
+MISSING_VALUES = ["*", "N/D"]
+
+
+def read_csv_header(csv_path: str, encoding: str = 'latin-1') -> List[str]:
+    """Nombres de columna del CSV tal como los deja pandas (las vacías como 'Unnamed: n')"""
+    with csv_source(csv_path) as source:
+        return list(pd.read_csv(source, encoding=encoding, nrows=0).columns)
+
+
+def build_read_spec(mapping: Dict[str, Any], columns: List[str]) -> Dict[str, Any]:
+    """Especificación de lectura de un CSV a partir del mapping de su índice
+
+    Cada columna se busca en el mapping sin espacios sobrantes (el CSV trae
+    'NOM_ENT ') pero conserva su nombre original. Las columnas que el mapping
+    no declara se dejan a la inferencia de pandas; las 'Unnamed' no se leen.
+    Los enteros se parsean como float64 y se convierten después al entero
+    nullable: el parser de pandas es mucho más lento leyendo directo a Int32.
+    """
+    properties = mapping.get("mappings", {}).get("properties", {})
+    spec = {"usecols": [], "dtype": {}, "na_values": {}, "casts": {}, "pad_widths": {}}
+    for col in columns:
+        if 'Unnamed' in str(col):
+            continue
+        spec["usecols"].append(col)
+        name = str(col).strip()
+        field_type = properties.get(name, {}).get("type")
+        if field_type not in FIELD_DTYPES:
+            continue
+        dtype = FIELD_DTYPES[field_type]
+        if field_type == "text" and name in CATEGORY_FIELDS:
+            spec["dtype"][col] = "category"
+        elif isinstance(dtype, str) and dtype.startswith("Int"):
+            spec["dtype"][col] = "float64"
+            spec["casts"][col] = dtype
+        else:
+            spec["dtype"][col] = dtype
+        if field_type not in ("keyword", "text"):
+            spec["na_values"][col] = MISSING_VALUES
+        if field_type == "keyword" and name in KEY_WIDTHS:
+            spec["pad_widths"][col] = KEY_WIDTHS[name]
+    return spec
+
+
+def read_spec_for_csv(csv_path: str, mapping: Dict[str, Any], encoding: str = 'latin-1') -> Dict[str, Any]:
+    """Especificación de lectura para un CSV concreto y el mapping de su índice"""
+    return build_read_spec(mapping, read_csv_header(csv_path, encoding))
+
+
+def read_options(spec: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Argumentos de pd.read_csv que corresponden a la especificación"""
+    if not spec:
+        return {}
+    return {"usecols": spec["usecols"], "dtype": spec["dtype"], "na_values": spec["na_values"]}
+
+
+def apply_read_spec(df: pd.DataFrame, spec: Optional[Dict[str, Any]]) -> pd.DataFrame:
+    """Convierte los enteros a su tipo nullable y completa las claves con ceros a la izquierda"""
+    if not spec:
+        return df
+    casts = {col: dtype for col, dtype in spec["casts"].items() if col in df.columns}
+    try:
+        df = df.astype(casts)
+    except (TypeError, ValueError):
+        for col, dtype in casts.items():
+            try:
+                df[col] = df[col].astype(dtype)
+            except (TypeError, ValueError):
+                logger.warning(f"La columna {col} tiene valores no enteros, se conserva {df[col].dtype}")
+    for col, width in spec["pad_widths"].items():
+        if col in df.columns and df[col].str.len().min() < width:
+            df[col] = df[col].str.zfill(width)
+    return df
+
+
+def category_columns(spec: Optional[Dict[str, Any]]) -> List[str]:
+    """Columnas que la especificación lee como categoría"""
+    if not spec:
+        return []
+    return [col for col, dtype in spec["dtype"].items() if dtype == "category"]
+
+
+def spec_key(spec: Optional[Dict[str, Any]]) -> str:
+    """Huella corta de la especificación (para invalidar cachés cuando cambia el mapping)"""
+    if not spec:
+        return ""
+    source = json.dumps(spec, sort_keys=True, default=lambda value: getattr(value, "__name__", str(value)))
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
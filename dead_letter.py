@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Documentos que el cluster rechazó de forma definitiva, con el motivo y la fila
+# del CSV de la que salieron (fila de datos contando desde 0, sin el encabezado,
+# como los offsets de los checkpoints)
+DEFAULT_DEAD_LETTER_PATH = "./.ingest_state/dead_letter.ndjson"
+
+# Formato de failed_at; el orden del texto es el orden en el tiempo
+FAILED_AT_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def _entry(
+    op_type: str,
+    result: Dict[str, Any],
+    meta: Dict[str, Any],
+    document: Any,
+    row: Optional[int] = None
+) -> Dict[str, Any]:
+    """Entrada de dead letter a partir del resultado de un ítem bulk"""
+    error = result.get("error") or {}
+    if not isinstance(error, dict):
+        # Error de la petición completa (helpers trae la excepción aparte)
+        exception = result.get("exception")
+        error = {"type": type(exception).__name__ if exception else "error", "reason": str(error)}
+    return {
+        "index": result.get("_index", meta.get("_index")),
+        "_id": result.get("_id", meta.get("_id")),
+        "op_type": op_type,
+        "status": result.get("status"),
+        "error_type": error.get("type"),
+        "reason": error.get("reason"),
+        "row": row,
+        "failed_at": time.strftime(FAILED_AT_FORMAT),
+        "document": document,
+    }
+
+
+def operation_failure(operation: bytes, result: Dict[str, Any], row: Optional[int] = None) -> Dict[str, Any]:
+    """Entrada de dead letter de una operación NDJSON (acción + documento) y su resultado"""
+    lines = operation.splitlines()
+    op_type, meta = next(iter(json.loads(lines[0]).items()))
+    document = json.loads(lines[1]) if len(lines) > 1 else None
+    return _entry(op_type, result, meta, document, row)
+
+
+def action_failure(action: Dict[str, Any], item: Dict[str, Any], row: Optional[int] = None) -> Dict[str, Any]:
+    """Entrada de dead letter de una acción con formato de helpers y su ítem de la respuesta bulk"""
+    op_type, result = next(iter(item.items()))
+    return _entry(op_type, result, action, action.get("_source"), row)
+
+
+def request_failure(operation: bytes, error: Exception, row: Optional[int] = None) -> Dict[str, Any]:
+    """Entrada de dead letter de una operación cuya petición bulk completa falló"""
+    return operation_failure(operation, {"error": {"type": type(error).__name__, "reason": str(error)}}, row)
+
+
+def entries_body(entries: Iterable[Dict[str, Any]], index_name: Optional[str] = None) -> bytes:
+    """Cuerpo NDJSON que vuelve a indexar los documentos de las entradas (en index_name si se da)"""
+    lines = []
+    for entry in entries:
+        meta = {"_index": index_name or entry["index"]}
+        if entry.get("_id") is not None:
+            meta["_id"] = entry["_id"]
+        op_type = entry.get("op_type") or "index"
+        lines.append(json.dumps({op_type: meta}, ensure_ascii=False))
+        if op_type != "delete":
+            lines.append(json.dumps(entry["document"], ensure_ascii=False))
+    return ('\n'.join(lines) + '\n').encode('utf-8') if lines else b''
+
+
+def write_dead_letters(path: str, entries: List[Dict[str, Any]]) -> int:
+    """Agrega las entradas al archivo de dead letter (NDJSON) y retorna cuántas se escribieron"""
+    if not entries or not path:
+        return 0
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+    reasons = sorted({entry["error_type"] or str(entry["status"]) for entry in entries})
+    logger.warning(f"{len(entries)} documentos enviados a {path} ({', '.join(reasons)})")
+    return len(entries)
+
+
+def read_dead_letters(path: str, since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Entradas del archivo de dead letter, en el orden en que se escribieron
+
+    Con since (fecha en FAILED_AT_FORMAT) solo las que fallaron desde entonces.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if since:
+        entries = [entry for entry in entries if (entry.get("failed_at") or "") >= since]
+    return entries
+
+
+def replace_dead_letters(path: str, entries: List[Dict[str, Any]]) -> None:
+    """Reescribe el archivo de dead letter solo con las entradas dadas (lo borra si no queda ninguna)"""
+    if not entries:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+    os.replace(tmp_path, path)
@@ -0,0 +1,92 @@
+import hashlib
+import logging
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Tuple
+
+from ingest_utils import dumps
+
+logger = logging.getLogger(__name__)
+
+# Manifiesto local con el hash de cada documento de la última carga exitosa
+DEFAULT_MANIFEST_PATH = "./.ingest_state/delta_manifest.sqlite"
+
+
+def open_manifest(path: str = DEFAULT_MANIFEST_PATH) -> sqlite3.Connection:
+    """Abre (o crea) el manifiesto SQLite de hashes por documento"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS doc_hashes ("
+        " table_name TEXT NOT NULL,"
+        " doc_id TEXT NOT NULL,"
+        " hash TEXT NOT NULL,"
+        " PRIMARY KEY (table_name, doc_id))"
+    )
+    return conn
+
+
+def document_hash(doc: Dict[str, Any]) -> str:
+    """Hash estable del contenido de un documento (el mismo JSON que se envía)"""
+    return hashlib.blake2b(dumps(doc).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def load_hashes(conn: sqlite3.Connection, table_name: str) -> Dict[str, str]:
+    """Hashes de la última carga exitosa de la tabla, por _id"""
+    rows = conn.execute("SELECT doc_id, hash FROM doc_hashes WHERE table_name = ?", (table_name,))
+    return dict(rows.fetchall())
+
+
+def save_hashes(conn: sqlite3.Connection, table_name: str, hashes: Dict[str, str]) -> None:
+    """Reemplaza los hashes de la tabla por los de la carga que acaba de terminar"""
+    with conn:
+        conn.execute("DELETE FROM doc_hashes WHERE table_name = ?", (table_name,))
+        conn.executemany(
+            "INSERT INTO doc_hashes (table_name, doc_id, hash) VALUES (?, ?, ?)",
+            ((table_name, doc_id, doc_hash) for doc_id, doc_hash in hashes.items())
+        )
+
+
+def changed_actions(
+    actions: Iterable[Dict[str, Any]],
+    previous: Dict[str, str],
+    current: Dict[str, str]
+) -> List[Dict[str, Any]]:
+    """Filtra las acciones nuevas o modificadas respecto al manifiesto
+
+    Registra en current el hash de cada documento visto. Las acciones sin _id no
+    se pueden comparar y siempre se envían; un _id repetido en la misma carga
+    también se envía para que en el índice quede la última fila, como en una
+    carga completa.
+    """
+    pending = []
+    for action in actions:
+        doc_id = action.get("_id")
+        if doc_id is None:
+            pending.append(action)
+            continue
+        doc_hash = document_hash(action["_source"])
+        repeated = doc_id in current
+        current[doc_id] = doc_hash
+        if repeated or previous.get(doc_id) != doc_hash:
+            pending.append(action)
+    return pending
+
+
+def delete_actions(index_name: str, previous: Dict[str, str], current: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Acciones bulk delete para los documentos que ya no están en el CSV"""
+    return [
+        {"_op_type": "delete", "_index": index_name, "_id": doc_id}
+        for doc_id in previous.keys() - current.keys()
+    ]
+
+
+def summarize_delta(previous: Dict[str, str], current: Dict[str, str]) -> Tuple[int, int, int]:
+    """Cuenta documentos (nuevos, modificados, eliminados) entre dos manifiestos"""
+    new = sum(1 for doc_id in current if doc_id not in previous)
+    changed = sum(1 for doc_id, doc_hash in current.items()
+                  if doc_id in previous and previous[doc_id] != doc_hash)
+    deleted = len(previous.keys() - current.keys())
+    return new, changed, deleted
@@ -1,10 +1,21 @@
-import pandas as pd
-from elasticsearch import Elasticsearch, helpers
 import logging
 import time
 import os
-import numpy as np
-import math
+
+from csv_schema import read_spec_for_csv
+from dead_letter import DEFAULT_DEAD_LETTER_PATH, write_dead_letters
+from es_client import connect_elasticsearch
+from index_lifecycle import (
+    LOAD_SETTINGS,
+    finalize_index,
+    load_time_mapping,
+    new_version_name,
+    production_settings,
+    prune_versions,
+    swap_alias,
+)
+from ingest_utils import find_invalid_ids, iter_bulk_bodies, iter_csv_batches, read_id_frame, send_bulk_body
+from mapping_registry import build_index_mapping
 
 # Configuración de logging
 logging.basicConfig(
@@ -17,57 +28,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Conexión a Elasticsearch
-def connect_elasticsearch():
-    try:
-        es = Elasticsearch("http://localhost:9200")
-        if es.ping():
-            logger.info("Conexión a Elasticsearch establecida")
-            return es
-        else:
-            logger.error("No se pudo establecer conexión con Elasticsearch")
-            return None
-    except Exception as e:
-        logger.error(f"Error al conectar con Elasticsearch: {str(e)}")
-        return None
-
 # Definir mapping para cat_seccion_2020
 def get_mapping():
-    index_settings = {
-        "settings": {
-            "number_of_shards": 1,
-            "number_of_replicas": 1,
-            "refresh_interval": "5s",
-            "analysis": {
-                "analyzer": {
-                    "spanish_analyzer": {"type": "spanish"}
-                }
-            }
-        },
-        "mappings": {
-            "properties": {
-                "CVE_ENT": {"type": "keyword"},
-                "CVE_DISTRITO": {"type": "keyword"},
-                "CVE_MUN": {"type": "keyword"},
-                "DESC_MUN": {
-                    "type": "text",
-                    "analyzer": "spanish_analyzer",
-                    "fields": {"keyword": {"type": "keyword"}}
-                },
-                "CVE_SECCION": {"type": "keyword"},
-                "DESC_SECCION": {
-                    "type": "text",
-                    "analyzer": "spanish_analyzer",
-                    "fields": {"keyword": {"type": "keyword"}}
-                }
-            }
-        }
-    }
-    return index_settings
+    return build_index_mapping("cat_seccion_2020")
 
 # Preparar índice
-def setup_index(es, index_name, mapping=None):
-    """Crea o recrea un índice con el mapping especificado"""
+def setup_index(es, index_name, mapping=None, load_profile=True):
+    """Crea o recrea un índice con el mapping especificado
+
+    Con load_profile=True se crea sin refresh ni réplicas; main() restaura los
+    settings del mapping cuando termina la importación.
+    """
     try:
         # Eliminar índice si existe
         if es.indices.exists(index=index_name):
@@ -76,7 +47,10 @@ def setup_index(es, index_name, mapping=None):
         
         # Crear índice nuevo
         if mapping:
-            es.indices.create(index=index_name, body=mapping)
+            body = load_time_mapping(mapping) if load_profile else mapping
+            es.indices.create(index=index_name, body=body)
+        elif load_profile:
+            es.indices.create(index=index_name, settings=LOAD_SETTINGS)
         else:
             es.indices.create(index=index_name)
         
@@ -86,94 +60,48 @@ def setup_index(es, index_name, mapping=None):
         logger.error(f"Error al configurar índice {index_name}: {str(e)}")
         return False
 
-# Función para limpiar valores NaN
-def clean_nan_values(doc):
-    """Reemplaza valores NaN por None para que Elasticsearch pueda procesarlos"""
-    for key, value in doc.items():
-        if isinstance(value, float) and (math.isnan(value) or np.isnan(value)):
-            doc[key] = None
-    return doc
-
 # Procesar CSV
-def import_csv_to_elastic(es, csv_path, index_name, id_field=None, batch_size=1000, encoding='latin-1'):
-    """Importa datos desde un CSV a Elasticsearch"""
+def import_csv_to_elastic(es, csv_path, index_name, id_field=None, batch_size=1000, encoding='latin-1', mapping=None,
+                          dead_letter_path=DEFAULT_DEAD_LETTER_PATH):
+    """Importa datos desde un CSV a Elasticsearch
+
+    Con mapping las columnas se leen con los tipos que declara (claves como texto
+    con sus ceros a la izquierda, p. ej. CVE_SECCION 0338). Los documentos que el
+    cluster rechaza se escriben con su motivo y su fila del CSV en dead_letter_path.
+    """
     start_time = time.time()
     
     try:
-        # Leer CSV
-        logger.info(f"Leyendo archivo {csv_path}")
-        df = pd.read_csv(csv_path, encoding=encoding)
-        
-        # Limpiar datos - Reemplazar NaN por None
-        df = df.replace({np.nan: None})
-        
-        # Eliminar columnas vacías (opcional)
-        unnamed_cols = [col for col in df.columns if 'Unnamed' in col]
-        if unnamed_cols:
-            df = df.drop(columns=unnamed_cols)
-            logger.info(f"Columnas eliminadas: {unnamed_cols}")
-        
-        # Estadísticas básicas
-        logger.info(f"CSV leído. Registros: {len(df)}, Columnas: {len(df.columns)}")
+        # Leer CSV por bloques del tamaño del lote (las columnas 'Unnamed' no se leen)
+        logger.info(f"Leyendo archivo {csv_path} por bloques de {batch_size} registros")
+        spec = read_spec_for_csv(csv_path, mapping, encoding) if mapping else None
+        batches = iter_csv_batches(csv_path, batch_size=batch_size, encoding=encoding, spec=spec)
         
         # Importar por lotes
-        total_records = len(df)
+        total_records = 0
         success_count = 0
         error_count = 0
         
-        for i in range(0, total_records, batch_size):
-            batch_df = df.iloc[i:i+batch_size]
-            actions = []
-            
-            for _, row in batch_df.iterrows():
-                # Convertir a diccionario y limpiar valores NaN
-                doc = clean_nan_values(row.to_dict())
-                
-                action = {
-                    "_index": index_name,
-                    "_source": doc
-                }
-                
-                # Asignar ID si se especifica
-                if id_field and id_field in doc and doc[id_field] is not None:
-                    action["_id"] = str(doc[id_field])
-                
-                actions.append(action)
-            
-            # Bulk indexing
-            try:
-                # Usar stats_only=True para evitar el error "object of type 'int' has no len()"
-                success, errors = helpers.bulk(
-                    es, 
-                    actions, 
-                    stats_only=True,  # Cambiar a True para evitar el error
-                    raise_on_error=False,
-                    max_retries=3
-                )
-                
+        for batch_num, batch_df in enumerate(batches, start=1):
+            total_records += len(batch_df)
+            # Documentos construidos por columnas directo a NDJSON; NaN ya sale como None
+            for body, rows in iter_bulk_bodies([batch_df], index_name, id_field, max_bytes=None, max_docs=None):
+                # Solo los documentos rechazados se reintentan; los que siguen fallando van al dead letter
+                success, failures = send_bulk_body(es, body, rows=rows)
+                write_dead_letters(dead_letter_path, failures)
                 success_count += success
-                error_count += len(actions) - success
-                
-                logger.info(f"Lote {i//batch_size + 1}/{(total_records+batch_size-1)//batch_size}: "
-                           f"Indexados {success} documentos, fallidos: {len(actions) - success}")
+                error_count += len(failures)
                 
-            except Exception as e:
-                logger.error(f"Error en lote {i//batch_size + 1}: {str(e)}")
-                # Intentar indexar uno por uno para ver cuál falla
-                for j, action in enumerate(actions):
-                    try:
-                        es.index(index=index_name, document=action["_source"], id=action.get("_id"))
-                        success_count += 1
-                    except Exception as e2:
-                        logger.error(f"Error en documento {i+j}: {str(e2)}")
-                        error_count += 1
+                logger.info(f"Lote {batch_num}: "
+                           f"Indexados {success} documentos, fallidos: {len(failures)}")
         
         elapsed_time = time.time() - start_time
         logger.info(f"Importación completada en {elapsed_time:.2f} segundos")
         logger.info(f"Total: {success_count} éxitos, {error_count} errores de {total_records} registros")
         
-        # Verificar conteo final
+        # Verificar conteo final (refresh explícito: el índice puede estar en modo carga)
         try:
+            es.indices.refresh(index=index_name)
             count = es.count(index=index_name)["count"]
             logger.info(f"Documentos en el índice {index_name}: {count}")
             return count, error_count
@@ -189,9 +117,10 @@ def import_csv_to_elastic(es, csv_path, index_name, id_field=None, batch_size=10
 def main():
     # Parámetros
     csv_path = "./eceg_2020_csv/cat_secciones_2020.csv"  # Ajusta la ruta a tu archivo
-    index_name = "cat_seccion_2020"
-    id_field = "CVE_SECCION"  # Si quieres asignar IDs desde el inicio
+    alias = "cat_seccion_2020"  # Nombre estable que usan las consultas
+    id_field = ["CVE_ENT", "CVE_SECCION"]  # _id compuesto: la sección solo es única dentro de la entidad
     batch_size = 1000
+    keep_versions = 2  # Versiones anteriores que se conservan para rollback
     
     # Conectar a Elasticsearch
     es = connect_elasticsearch()
@@ -203,22 +132,48 @@ def main():
         logger.error(f"No se encontró el archivo {csv_path}")
         return
     
-    # Preparar índice
+    # Verificar que cada fila tenga un _id completo y único antes de cargar
     mapping = get_mapping()
+    keys = read_id_frame(csv_path, id_field, spec=read_spec_for_csv(csv_path, mapping))
+    missing, duplicated = find_invalid_ids(keys, id_field)
+    if len(missing) or len(duplicated):
+        logger.error(f"Claves {id_field} inválidas: {len(missing)} incompletas, {len(duplicated)} repetidas")
+        return
+    
+    # Preparar índice: versión nueva detrás del alias, la actual sigue sirviendo consultas
+    index_name = new_version_name(es, alias)
     success = setup_index(es, index_name, mapping)
     if not success:
         return
     
     # Importar datos
     logger.info(f"Iniciando importación desde {csv_path} a {index_name}")
-    success_count, error_count = import_csv_to_elastic(
-        es, 
-        csv_path, 
-        index_name, 
-        id_field=id_field,
-        batch_size=batch_size,
-        encoding='latin-1'
-    )
+    load_start = time.time()
+    try:
+        success_count, error_count = import_csv_to_elastic(
+            es, 
+            csv_path, 
+            index_name, 
+            id_field=id_field,
+            batch_size=batch_size,
+            encoding='latin-1',
+            mapping=mapping
+        )
+    finally:
+        load_time = time.time() - load_start
+        # Restaurar refresh y réplicas de producción
+        try:
+            timings = finalize_index(es, index_name, production_settings(mapping))
+            logger.info(f"Fases: carga {load_time:.2f}s, restaurar {timings['restaurar']:.2f}s, "
+                        f"refresh {timings['refresh']:.2f}s")
+        except Exception as e:
+            logger.error(f"Error al restaurar settings de {index_name}: {str(e)}")
+    
+    # Publicar la versión nueva solo si cargó completa
+    if success_count > 0 and error_count == 0 and swap_alias(es, alias, index_name, expected_count=len(keys)):
+        prune_versions(es, alias, keep=keep_versions)
+    else:
+        logger.warning(f"El alias {alias} no se cambió; {index_name} queda sin publicar")
     
     # Resumen
     if success_count > 0:
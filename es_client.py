@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+
+logger = logging.getLogger(__name__)
+
+# Archivo JSON opcional con la configuración del cliente (las variables ES_* tienen prioridad)
+CONFIG_FILE_ENV = "ES_CONFIG_FILE"
+DEFAULT_CONFIG_FILE = "./es_client.json"
+
+DEFAULT_CLIENT_CONFIG = {
+    "hosts": ["http://localhost:9200"],
+    "api_key": None,
+    "username": None,
+    "password": None,
+    "ca_certs": None,
+    "verify_certs": True,
+    # Conexiones keep-alive por nodo; nunca menos que las peticiones simultáneas de la carga
+    "connections_per_node": 10,
+    # gzip en las peticiones: los cuerpos bulk NDJSON comprimen muy bien
+    "http_compress": True,
+    "request_timeout": 60.0,
+    "max_retries": 3,
+    "retry_on_timeout": True,
+    # Descubrir los demás nodos del cluster para repartir el bulk entre ellos
+    "sniff_on_start": False,
+    "sniff_on_node_failure": False,
+}
+
+# Variable de entorno de cada opción y su tipo
+ENV_VARS = {
+    "hosts": ("ES_HOSTS", list),
+    "api_key": ("ES_API_KEY", str),
+    "username": ("ES_USERNAME", str),
+    "password": ("ES_PASSWORD", str),
+    "ca_certs": ("ES_CA_CERTS", str),
+    "verify_certs": ("ES_VERIFY_CERTS", bool),
+    "connections_per_node": ("ES_CONNECTIONS_PER_NODE", int),
+    "http_compress": ("ES_HTTP_COMPRESS", bool),
+    "request_timeout": ("ES_REQUEST_TIMEOUT", float),
+    "max_retries": ("ES_MAX_RETRIES", int),
+    "retry_on_timeout": ("ES_RETRY_ON_TIMEOUT", bool),
+    "sniff_on_start": ("ES_SNIFF_ON_START", bool),
+    "sniff_on_node_failure": ("ES_SNIFF_ON_NODE_FAILURE", bool),
+}
+
+# Clientes síncronos ya creados, por configuración (se reutilizan dentro del proceso)
+_CLIENTS = {}
+
+
+def _parse_env(value: str, kind: type) -> Any:
+    """Convierte el texto de una variable de entorno al tipo de la opción"""
+    if kind is bool:
+        return value.strip().lower() in ("1", "true", "yes", "si", "sí", "on")
+    if kind is list:
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return kind(value)
+
+
+def load_client_config(path: Optional[str] = None) -> Dict[str, Any]:
+    """Configuración del cliente: valores por defecto, luego el archivo JSON y luego las variables ES_*
+
+    path (o ES_CONFIG_FILE, o ./es_client.json si existe) apunta al archivo;
+    sus claves son las de DEFAULT_CLIENT_CONFIG.
+    """
+    config = dict(DEFAULT_CLIENT_CONFIG)
+    path = path or os.environ.get(CONFIG_FILE_ENV) or DEFAULT_CONFIG_FILE
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            file_config = json.load(f)
+        unknown = set(file_config) - set(DEFAULT_CLIENT_CONFIG)
+        if unknown:
+            logger.warning(f"Opciones desconocidas en {path}: {sorted(unknown)}")
+        config.update({key: value for key, value in file_config.items() if key in DEFAULT_CLIENT_CONFIG})
+    for key, (env_var, kind) in ENV_VARS.items():
+        if os.environ.get(env_var):
+            config[key] = _parse_env(os.environ[env_var], kind)
+    if isinstance(config["hosts"], str):
+        config["hosts"] = [config["hosts"]]
+    return config
+
+
+def client_options(config: Dict[str, Any], concurrency: int = 1) -> Dict[str, Any]:
+    """Argumentos de Elasticsearch / AsyncElasticsearch para la configuración dada
+
+    El pool por nodo se agranda hasta concurrency para que cada petición
+    simultánea tenga su propia conexión keep-alive.
+    """
+    options = {
+        "hosts": config["hosts"],
+        "connections_per_node": max(config["connections_per_node"], concurrency),
+        "http_compress": config["http_compress"],
+        "request_timeout": config["request_timeout"],
+        "max_retries": config["max_retries"],
+        "retry_on_timeout": config["retry_on_timeout"],
+        "sniff_on_start": config["sniff_on_start"],
+        "sniff_on_node_failure": config["sniff_on_node_failure"],
+    }
+    if config["api_key"]:
+        options["api_key"] = config["api_key"]
+    elif config["username"]:
+        options["basic_auth"] = (config["username"], config["password"] or "")
+    if config["ca_certs"]:
+        options["ca_certs"] = config["ca_certs"]
+    if not config["verify_certs"]:
+        options["verify_certs"] = False
+    return options
+
+
+def _describe(options: Dict[str, Any]) -> str:
+    """Resumen de las opciones del cliente para el log (sin credenciales)"""
+    return (f"{', '.join(options['hosts'])} (pool {options['connections_per_node']} por nodo, "
+            f"gzip {'sí' if options['http_compress'] else 'no'}, timeout {options['request_timeout']} s)")
+
+
+def connect_elasticsearch(concurrency: int = 1, config: Optional[Dict[str, Any]] = None) -> Optional[Elasticsearch]:
+    """Cliente compartido de Elasticsearch listo para usar, o None si no hay conexión
+
+    concurrency son las peticiones simultáneas que hará la carga; el cliente de
+    una misma configuración se crea una sola vez por proceso.
+    """
+    config = config or load_client_config()
+    options = client_options(config, concurrency)
+    key = json.dumps(options, sort_keys=True, default=str)
+    es = _CLIENTS.get(key)
+    try:
+        if es is None:
+            es = Elasticsearch(**options)
+        if es.ping():
+            logger.info(f"Conexión a Elasticsearch establecida: {_describe(options)}")
+            _CLIENTS[key] = es
+            return es
+        else:
+            logger.error("No se pudo establecer conexión con Elasticsearch")
+            return None
+    except Exception as e:
+        logger.error(f"Error al conectar con Elasticsearch: {str(e)}")
+        return None
+
+
+async def connect_elasticsearch_async(
+    concurrency: int = 1,
+    config: Optional[Dict[str, Any]] = None
+) -> Optional[AsyncElasticsearch]:
+    """Cliente AsyncElasticsearch con la misma configuración, o None si no hay conexión
+
+    No se comparte: queda ligado al event loop que lo crea y quien lo pide debe cerrarlo.
+    AsyncElasticsearch necesita aiohttp (pip install "elasticsearch[async]");
+    sin él también se retorna None.
+    """
+    options = client_options(config or load_client_config(), concurrency)
+    try:
+        es = AsyncElasticsearch(**options)
+    except (ImportError, ValueError) as e:
+        logger.error(f"No se pudo crear el cliente asíncrono de Elasticsearch: {str(e)}")
+        return None
+    try:
+        if await es.ping():
+            logger.info(f"Conexión a Elasticsearch establecida: {_describe(options)}")
+            return es
+        logger.error("No se pudo establecer conexión con Elasticsearch")
+    except Exception as e:
+        logger.error(f"Error al conectar con Elasticsearch: {str(e)}")
+    await es.close()
+    return None
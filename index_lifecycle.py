@@ -0,0 +1,202 @@
+import copy
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from elasticsearch import NotFoundError
+
+logger = logging.getLogger(__name__)
+
+# Settings de carga: sin refresh periódico ni réplicas mientras dura el bulk
+LOAD_SETTINGS = {
+    "refresh_interval": "-1",
+    "number_of_replicas": 0
+}
+
+
+# Clave de _meta del mapping con las columnas que forman el _id de los documentos
+ID_META_KEY = "id_field"
+
+
+def with_id_meta(mapping: Dict[str, Any], id_field: Any) -> Dict[str, Any]:
+    """Copia del mapping que guarda en su _meta las columnas del _id (ver outdated_indices)"""
+    id_mapping = copy.deepcopy(mapping)
+    if id_field is not None:
+        columns = [id_field] if isinstance(id_field, str) else list(id_field)
+        id_mapping.setdefault("mappings", {}).setdefault("_meta", {})[ID_META_KEY] = columns
+    return id_mapping
+
+
+def id_scheme(mapping: Dict[str, Any]) -> Optional[List[str]]:
+    """Columnas del _id que declara el _meta del mapping (None si no lo declara)"""
+    return (mapping.get("mappings", {}).get("_meta") or {}).get(ID_META_KEY)
+
+
+def load_time_mapping(mapping: Dict[str, Any]) -> Dict[str, Any]:
+    """Copia del mapping con los settings de carga en lugar de los de producción"""
+    load_mapping = copy.deepcopy(mapping)
+    load_mapping.setdefault("settings", {}).update(LOAD_SETTINGS)
+    return load_mapping
+
+
+def production_settings(mapping: Dict[str, Any]) -> Dict[str, Any]:
+    """Settings dinámicos de producción a restaurar cuando termina la carga"""
+    settings = mapping.get("settings", {})
+    return {
+        "refresh_interval": settings.get("refresh_interval", "1s"),
+        "number_of_replicas": settings.get("number_of_replicas", 1)
+    }
+
+
+def prepare_for_bulk(es, index_name: str) -> bool:
+    """Aplica los settings de carga a un índice que ya existe"""
+    try:
+        es.indices.put_settings(index=index_name, settings=LOAD_SETTINGS)
+        logger.info(f"Índice {index_name} en modo carga (sin refresh ni réplicas)")
+        return True
+    except Exception as e:
+        logger.error(f"Error al aplicar settings de carga a {index_name}: {str(e)}")
+        return False
+
+
+def finalize_index(
+    es,
+    index_name: str,
+    settings: Dict[str, Any],
+    force_merge: bool = False,
+    max_num_segments: int = 1
+) -> Dict[str, float]:
+    """Restaura los settings de producción, refresca y opcionalmente fusiona segmentos
+
+    Retorna la duración en segundos de cada fase ejecutada.
+    """
+    timings = {}
+
+    start = time.time()
+    es.indices.put_settings(index=index_name, settings=settings)
+    timings["restaurar"] = time.time() - start
+
+    start = time.time()
+    es.indices.refresh(index=index_name)
+    timings["refresh"] = time.time() - start
+
+    if force_merge:
+        start = time.time()
+        es.indices.forcemerge(index=index_name, max_num_segments=max_num_segments)
+        timings["forcemerge"] = time.time() - start
+
+    logger.info(f"Índice {index_name} restaurado a producción: {settings}")
+    return timings
+
+
+def versioned_index_name(alias: str, timestamp: Optional[datetime] = None) -> str:
+    """Nombre del índice físico de una versión, p. ej. cat_seccion_2020_v20240101120000123456
+
+    El sufijo llega a microsegundos para que dos cargas en el mismo segundo no
+    compartan índice; tiene ancho fijo, así el orden alfabético de las
+    versiones (ver list_versions) sigue siendo el cronológico, también frente
+    a las versiones anteriores que solo tenían segundos.
+    """
+    timestamp = timestamp or datetime.now()
+    return f"{alias}_v{timestamp.strftime('%Y%m%d%H%M%S%f')}"
+
+
+def new_version_name(es, alias: str) -> str:
+    """Nombre de una versión nueva del alias que todavía no existe en el cluster
+
+    Nunca se reutiliza una versión existente: create_indices la tomaría como
+    ya creada y la carga se agregaría a los documentos de otra corrida.
+    """
+    index_name = versioned_index_name(alias)
+    while es.indices.exists(index=index_name):
+        logger.warning(f"La versión {index_name} ya existe; se genera otro nombre")
+        index_name = versioned_index_name(alias)
+    return index_name
+
+
+def alias_indices(es, alias: str) -> List[str]:
+    """Índices a los que apunta actualmente el alias"""
+    try:
+        return list(es.indices.get_alias(name=alias).keys())
+    except NotFoundError:
+        return []
+
+
+def outdated_indices(es, mappings: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Elimina los índices existentes cuyo _id se arma con otras columnas que las del mapping
+
+    Una carga sobre ellos dejaría cada documento con el _id anterior junto a su
+    copia con el nuevo (conteos al doble); así se recrean vacíos. Un índice sin
+    _meta es de antes de los _id compuestos y también se elimina, una sola vez.
+    Retorna los índices eliminados. Un nombre que es alias no se toca: sus
+    versiones se reemplazan cargando con alias.
+    """
+    removed = []
+    for index_name, mapping in mappings.items():
+        expected = id_scheme(mapping)
+        if expected is None or not es.indices.exists(index=index_name):
+            continue
+        if alias_indices(es, index_name):
+            continue
+        response = es.indices.get_mapping(index=index_name)
+        stored = id_scheme(response[index_name]) if index_name in response else None
+        if stored == expected:
+            continue
+        es.indices.delete(index=index_name)
+        logger.warning(f"{index_name} tenía _id de {stored or 'otro esquema'} y ahora se arma con {expected}: "
+                       f"se elimina y se recrea para no duplicar documentos")
+        removed.append(index_name)
+    return removed
+
+
+def list_versions(es, alias: str) -> List[str]:
+    """Versiones físicas del alias, de la más antigua a la más reciente"""
+    return sorted(es.indices.get(index=f"{alias}_v*").keys())
+
+
+def swap_alias(es, alias: str, new_index: str, expected_count: Optional[int] = None) -> bool:
+    """Apunta el alias a new_index en una sola operación atómica
+
+    Si se da expected_count, el cambio solo se hace cuando el índice nuevo tiene
+    exactamente ese número de documentos. Un índice concreto que se llame igual
+    que el alias (carga anterior sin versiones) se elimina en la misma operación.
+    """
+    try:
+        es.indices.refresh(index=new_index)
+        count = es.count(index=new_index)["count"]
+        if expected_count is not None and count != expected_count:
+            logger.error(f"No se cambia el alias {alias}: {new_index} tiene {count} documentos, "
+                         f"se esperaban {expected_count}")
+            return False
+
+        actions = [{"remove": {"index": index_name, "alias": alias}}
+                   for index_name in alias_indices(es, alias) if index_name != new_index]
+        if es.indices.exists(index=alias) and not es.indices.exists_alias(name=alias):
+            actions.append({"remove_index": {"index": alias}})
+        actions.append({"add": {"index": new_index, "alias": alias}})
+
+        es.indices.update_aliases(actions=actions)
+        logger.info(f"Alias {alias} -> {new_index} ({count} documentos)")
+        return True
+    except Exception as e:
+        logger.error(f"Error al cambiar el alias {alias} a {new_index}: {str(e)}")
+        return False
+
+
+def prune_versions(es, alias: str, keep: int = 2) -> List[str]:
+    """Elimina las versiones más antiguas del alias y conserva las keep más recientes
+
+    La versión a la que apunta el alias nunca se elimina.
+    """
+    active = set(alias_indices(es, alias))
+    versions = list_versions(es, alias)
+    stale = [index_name for index_name in versions[:max(len(versions) - keep, 0)]
+             if index_name not in active]
+    for index_name in stale:
+        try:
+            es.indices.delete(index=index_name)
+            logger.info(f"Versión antigua {index_name} eliminada")
+        except Exception as e:
+            logger.error(f"Error al eliminar la versión {index_name}: {str(e)}")
+    return stale
@@ -0,0 +1,536 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from elasticsearch import ConnectionError as TransportConnectionError, ConnectionTimeout
+
+from arrow_reader import batch_documents, batch_ids, batch_rows
+from csv_input import csv_source
+from csv_schema import apply_read_spec, read_options
+from dead_letter import operation_failure, request_failure
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se serializa con json
+    orjson = None
+
+# Separador entre las partes de un _id compuesto, p. ej. 01-0338
+ID_SEPARATOR = "-"
+
+# Tamaño objetivo de cada petición bulk y tope de documentos aunque no se alcance
+DEFAULT_BULK_BYTES = 10 * 1024 * 1024
+MAX_BULK_DOCS = 50000
+
+# Estados de un ítem bulk (o de la petición completa) que vale la pena
+# reintentar: cola llena, circuit breaker o nodo no disponible
+RETRYABLE_STATUSES = (429, 502, 503, 504)
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 del contenido de un archivo (lo lee completo, por bloques)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: str, content_hash: bool = True) -> Dict[str, Any]:
+    """Huella de un archivo de entrada: ruta, tamaño, mtime y SHA-256 del contenido
+
+    Con content_hash=False no se lee el archivo y la huella no trae sha256.
+    """
+    stat = os.stat(path)
+    fingerprint = {
+        "path": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime
+    }
+    if content_hash:
+        fingerprint["sha256"] = file_sha256(path)
+    return fingerprint
+
+
+def drop_empty_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Elimina las columnas sin nombre ('Unnamed') que dejan las comas finales del CSV"""
+    unnamed_cols = [col for col in df.columns if 'Unnamed' in str(col)]
+    if unnamed_cols:
+        df = df.drop(columns=unnamed_cols)
+    return df
+
+
+def drop_empty_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Elimina las filas completamente vacías (las comas sueltas al final del CSV)"""
+    empty = df.isna().all(axis=1)
+    if empty.any():
+        df = df[~empty]
+    return df
+
+
+def iter_csv_batches(
+    csv_path: str,
+    batch_size: int = 1000,
+    encoding: str = 'latin-1',
+    dtype: Optional[Dict[str, Any]] = None,
+    skip_rows: int = 0,
+    spec: Optional[Dict[str, Any]] = None
+) -> Iterator[pd.DataFrame]:
+    """Lee un CSV en bloques de batch_size filas sin cargar el archivo completo
+
+    Los tipos del primer bloque se fijan para todos los demás (los enteros como
+    Int64 nullable), así un bloque con celdas vacías no convierte las claves en
+    float y los documentos salen igual sin importar en qué bloque caen.
+    skip_rows descarta las primeras filas de datos (el encabezado se conserva).
+    spec es la especificación de lectura derivada del mapping (ver csv_schema).
+    El índice de cada bloque es el número de fila de datos en el CSV, contando
+    también las filas saltadas.
+    """
+    skiprows = range(1, skip_rows + 1) if skip_rows else None
+    batch_dtypes = None
+    with csv_source(csv_path) as source:
+        reader = pd.read_csv(source, encoding=encoding, chunksize=batch_size, skiprows=skiprows,
+                             **_csv_options(spec, dtype))
+        with reader:
+            for chunk in reader:
+                chunk = apply_read_spec(drop_empty_rows(drop_empty_columns(chunk)), spec)
+                if skip_rows:
+                    chunk.index += skip_rows
+                if batch_dtypes is None:
+                    batch_dtypes = infer_batch_dtypes(chunk)
+                yield _apply_dtypes(chunk, batch_dtypes)
+
+
+def _csv_options(spec: Optional[Dict[str, Any]], dtype: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Argumentos de read_csv de la especificación, con dtype por encima de ella"""
+    options = read_options(spec)
+    if dtype:
+        options["dtype"] = {**options.get("dtype", {}), **dtype}
+    return options
+
+
+def _batch_dtype(dtype: Any) -> Any:
+    """Tipo a fijar para una columna: enteros de NumPy como Int64 y categorías sin fijar sus valores"""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return 'category'
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iu':
+        return 'Int64'
+    return dtype
+
+
+def infer_batch_dtypes(df: pd.DataFrame) -> Dict[str, Any]:
+    """Tipos a fijar en todos los bloques de un CSV (enteros como Int64 nullable)"""
+    return {col: _batch_dtype(df[col].dtype) for col in df.columns}
+
+
+def probe_csv_dtypes(
+    csv_path: str,
+    nrows: int = 1000,
+    encoding: str = 'latin-1',
+    spec: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Infiere con las primeras nrows filas los tipos a fijar al leer el CSV por partes"""
+    with csv_source(csv_path) as source:
+        df = pd.read_csv(source, encoding=encoding, nrows=nrows, **_csv_options(spec))
+    return infer_batch_dtypes(apply_read_spec(drop_empty_columns(df), spec))
+
+
+def _apply_dtypes(df: pd.DataFrame, dtypes: Dict[str, Any]) -> pd.DataFrame:
+    """Convierte las columnas a los tipos indicados dejando igual las que no se pueden convertir"""
+    for col, col_dtype in dtypes.items():
+        if col not in df.columns or df[col].dtype == col_dtype:
+            continue
+        try:
+            df[col] = df[col].astype(col_dtype)
+        except (TypeError, ValueError):
+            logger.warning(f"No se pudo convertir la columna {col} a {col_dtype}, se conserva {df[col].dtype}")
+    return df
+
+
+def iter_batches(
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    batch_size: int = 1000
+) -> Iterator[pd.DataFrame]:
+    """Devuelve lotes de un DataFrame completo o de un generador de bloques ya leídos
+
+    Los bloques pueden ser DataFrames o lotes Arrow de arrow_reader.
+    """
+    if isinstance(data, pd.DataFrame):
+        for i in range(0, len(data), batch_size):
+            yield data.iloc[i:i+batch_size]
+    else:
+        yield from data
+
+
+def _column_values(series: pd.Series) -> List[Any]:
+    """Convierte una columna en una lista de valores nativos de Python con None en lugar de NaN"""
+    values = series.to_numpy(dtype=object, copy=True)
+    nulls = series.isna().to_numpy()
+    if nulls.any():
+        values[nulls] = None
+    return values.tolist()
+
+
+def frame_rows(df: pd.DataFrame) -> List[Any]:
+    """Número de fila del CSV de cada registro de un bloque (DataFrame o lote Arrow)"""
+    if isinstance(df, pd.DataFrame):
+        return df.index.tolist()
+    return batch_rows(df)
+
+
+def build_documents(df: pd.DataFrame, drop_empty: bool = True) -> List[Dict[str, Any]]:
+    """Construye los documentos de un DataFrame columna por columna, sin iterrows()
+
+    Un lote Arrow se convierte directamente, sin pasar por pandas.
+    """
+    if not isinstance(df, pd.DataFrame):
+        return batch_documents(df)
+    if drop_empty:
+        df = drop_empty_columns(df)
+    columns = [str(col) for col in df.columns]
+    values = [_column_values(df[col]) for col in df.columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def id_columns(id_field: Union[str, Sequence[str], None]) -> List[str]:
+    """Columnas que forman el _id: una sola o varias para un _id compuesto"""
+    if not id_field:
+        return []
+    if isinstance(id_field, str):
+        return [id_field]
+    return list(id_field)
+
+
+def build_ids(df: pd.DataFrame, id_field: Union[str, Sequence[str], None]) -> Optional[List[Optional[str]]]:
+    """_id de cada fila uniendo las columnas clave con ID_SEPARATOR (None si falta alguna)
+
+    Retorna None si el DataFrame no tiene todas las columnas clave.
+    """
+    columns = id_columns(id_field)
+    if not isinstance(df, pd.DataFrame):
+        return batch_ids(df, columns, ID_SEPARATOR)
+    if not columns or any(col not in df.columns for col in columns):
+        return None
+    ids = df[columns[0]].astype(str)
+    for col in columns[1:]:
+        ids = ids + ID_SEPARATOR + df[col].astype(str)
+    values = ids.to_numpy(dtype=object, copy=True)
+    missing = df[columns].isna().any(axis=1).to_numpy()
+    if missing.any():
+        values[missing] = None
+    return values.tolist()
+
+
+def read_id_frame(
+    csv_path: str,
+    id_field: Union[str, Sequence[str]],
+    encoding: str = 'latin-1',
+    spec: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """Lee solo las columnas clave del CSV (sin las filas vacías) para validar los _id"""
+    columns = id_columns(id_field)
+    options = read_options(spec)
+    options["usecols"] = columns
+    if "dtype" in options:
+        options["dtype"] = {col: dtype for col, dtype in options["dtype"].items() if col in columns}
+    if "na_values" in options:
+        options["na_values"] = {col: values for col, values in options["na_values"].items() if col in columns}
+    with csv_source(csv_path) as source:
+        df = pd.read_csv(source, encoding=encoding, **options)
+    return apply_read_spec(drop_empty_rows(df), spec)
+
+
+def find_invalid_ids(df: pd.DataFrame, id_field: Union[str, Sequence[str]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Filas con clave incompleta y filas cuya clave se repite (todas las repeticiones)"""
+    columns = id_columns(id_field)
+    missing = df[columns].isna().any(axis=1)
+    duplicated = df.duplicated(subset=columns, keep=False) & ~missing
+    return df[missing], df[duplicated]
+
+
+def build_actions(
+    df: pd.DataFrame,
+    index_name: str,
+    id_field: Union[str, Sequence[str], None] = None,
+    drop_empty: bool = True
+) -> List[Dict[str, Any]]:
+    """Construye las acciones bulk de un DataFrame en una sola pasada vectorizada
+
+    id_field es la columna del _id o la lista de columnas de un _id compuesto.
+    """
+    ids = build_ids(df, id_field)
+    docs = build_documents(df, drop_empty=drop_empty)
+    if ids is not None:
+        return [
+            {"_index": index_name, "_id": doc_id, "_source": doc}
+            if doc_id is not None else
+            {"_index": index_name, "_source": doc}
+            for doc_id, doc in zip(ids, docs)
+        ]
+    return [{"_index": index_name, "_source": doc} for doc in docs]
+
+
+def _json_default(value: Any) -> Any:
+    """Serializa los tipos de NumPy que json no conoce"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> str:
+    """Serializa un valor a JSON compacto"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+
+
+def dumps_bytes(value: Any) -> bytes:
+    """Serializa un valor a JSON compacto en UTF-8 (con orjson si está instalado)"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return dumps(value).encode('utf-8')
+
+
+def actions_body(actions: Iterable[Dict[str, Any]]) -> bytes:
+    """Cuerpo NDJSON de acciones con el formato de helpers (_op_type, _index, _id, _source)"""
+    body = bytearray()
+    for action in actions:
+        op_type = action.get("_op_type", "index")
+        meta = {"_index": action["_index"]}
+        if action.get("_id") is not None:
+            meta["_id"] = action["_id"]
+        body += dumps_bytes({op_type: meta}) + b'\n'
+        if op_type != "delete":
+            body += dumps_bytes(action["_source"]) + b'\n'
+    return bytes(body)
+
+
+def iter_bulk_bodies(
+    frames: Iterable[pd.DataFrame],
+    index_name: str,
+    id_field: Union[str, Sequence[str], None] = None,
+    max_bytes: Union[int, Callable[[], int], None] = DEFAULT_BULK_BYTES,
+    max_docs: Optional[int] = MAX_BULK_DOCS,
+    drop_empty: bool = True
+) -> Iterator[Tuple[bytes, List[Any]]]:
+    """Serializa los bloques directo a cuerpos NDJSON y retorna (cuerpo, filas)
+
+    filas es el índice de cada documento del cuerpo en su bloque (la fila del
+    CSV con los lectores de este módulo), para ubicar los rechazados.
+
+    Un cuerpo se corta antes de pasar de max_bytes o de max_docs documentos
+    (None desactiva el límite); un documento más grande que max_bytes va solo.
+    max_bytes también puede ser una función que se consulta al armar cada
+    cuerpo, para que el tamaño cambie durante la carga.
+    Las líneas de acción comparten el prefijo con el índice, que se serializa
+    una sola vez.
+    """
+    prefix = dumps_bytes({"index": {"_index": index_name}})[:-2]
+    no_id_action = prefix + b'}}\n'
+    limit = max_bytes() if callable(max_bytes) else max_bytes
+    buffer = bytearray()
+    rows = []
+    for df in frames:
+        ids = build_ids(df, id_field)
+        docs = build_documents(df, drop_empty=drop_empty)
+        for row, doc_id, doc in zip(frame_rows(df), ids if ids is not None else [None] * len(docs), docs):
+            if doc_id is None:
+                action = no_id_action
+            else:
+                action = prefix + b',"_id":' + dumps_bytes(doc_id) + b'}}\n'
+            line = action + dumps_bytes(doc) + b'\n'
+            if rows and ((limit and len(buffer) + len(line) > limit)
+                         or (max_docs and len(rows) >= max_docs)):
+                yield bytes(buffer), rows
+                limit = max_bytes() if callable(max_bytes) else max_bytes
+                buffer = bytearray()
+                rows = []
+            buffer += line
+            rows.append(row)
+    if rows:
+        yield bytes(buffer), rows
+
+
+def split_csv_ranges(csv_path: str, range_bytes: int = 1 << 20) -> List[Tuple[int, int]]:
+    """Divide un CSV en rangos de bytes de ~range_bytes que empiezan y terminan en fin de línea
+
+    Asume que no hay saltos de línea dentro de campos entrecomillados, como en
+    los CSV del INEGI.
+    """
+    file_size = os.path.getsize(csv_path)
+    ranges = []
+    with open(csv_path, 'rb') as f:
+        f.readline()  # encabezado
+        start = f.tell()
+        while start < file_size:
+            f.seek(min(start + range_bytes, file_size))
+            f.readline()
+            end = min(f.tell(), file_size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_csv_range(
+    csv_path: str,
+    start: int,
+    end: int,
+    encoding: str = 'latin-1',
+    dtypes: Optional[Dict[str, Any]] = None,
+    spec: Optional[Dict[str, Any]] = None,
+    first_row: int = 0
+) -> pd.DataFrame:
+    """Lee solo las filas contenidas en el rango de bytes [start, end) de un CSV
+
+    first_row es el número de fila de datos con que empieza el rango; el índice
+    del DataFrame sigue la numeración del CSV completo.
+    """
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(header + data), encoding=encoding, **_csv_options(spec))
+    df = apply_read_spec(drop_empty_rows(drop_empty_columns(df)), spec)
+    if first_row:
+        df.index += first_row
+    if dtypes:
+        df = _apply_dtypes(df, dtypes)
+    return df
+
+
+def count_csv_range_rows(csv_path: str, start: int, end: int) -> int:
+    """Cuenta las filas de un rango de bytes del CSV"""
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start).count(b'\n')
+
+
+def bulk_operations(body: bytes) -> List[bytes]:
+    """Separa un cuerpo NDJSON en sus operaciones (acción y, salvo delete, documento)"""
+    lines = body.splitlines(keepends=True)
+    operations = []
+    i = 0
+    while i < len(lines):
+        size = 1 if b'"delete"' in lines[i] and "delete" in json.loads(lines[i]) else 2
+        operations.append(b''.join(lines[i:i + size]))
+        i += size
+    return operations
+
+
+def bulk_item_results(
+    response: Dict[str, Any],
+    retry: bool = True
+) -> Tuple[int, List[Tuple[int, Dict[str, Any]]], List[int]]:
+    """(éxitos, fallidos como (posición, resultado), posiciones a reintentar) de una respuesta bulk
+
+    Solo se reintentan los estados de RETRYABLE_STATUSES; con retry=False
+    también cuentan como fallidos.
+    """
+    success = 0
+    failed = []
+    retry_positions = []
+    for i, item in enumerate(response["items"]):
+        result = next(iter(item.values()))
+        status = result.get("status", 500)
+        if status < 300:
+            success += 1
+        elif retry and status in RETRYABLE_STATUSES:
+            retry_positions.append(i)
+        else:
+            failed.append((i, result))
+    return success, failed, retry_positions
+
+
+def retryable_error(error: Exception) -> bool:
+    """Si el fallo de una petición bulk completa es transitorio y vale la pena reenviarla
+
+    Lo es un estado de RETRYABLE_STATUSES (p. ej. 429 de un circuit breaker) o
+    un timeout o error de conexión; los reintentos del transporte no esperan.
+    """
+    if isinstance(error, (ConnectionTimeout, TransportConnectionError)):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUSES
+
+
+def body_row(rows: Optional[Sequence[Any]], position: int) -> Any:
+    """Fila del CSV de la operación en position de un cuerpo, si se conocen las filas"""
+    return rows[position] if rows is not None else None
+
+
+def send_bulk_body(
+    es,
+    body: Union[bytes, str],
+    max_retries: int = 3,
+    initial_backoff: float = 2.0,
+    rows: Optional[Sequence[Any]] = None
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """Envía un cuerpo NDJSON ya serializado a la API bulk y retorna (éxitos, fallidos)
+
+    Los fallidos son las entradas de dead letter (ver dead_letter) de cada
+    documento rechazado, con su fila de rows (una por operación del cuerpo,
+    como las entrega iter_bulk_bodies). Solo los ítems con un estado
+    transitorio se reenvían, en una petición con solo ellos y con espera
+    exponencial, hasta max_retries veces. Si la petición completa falla por
+    un error transitorio (ver retryable_error) se reenvía completa con la
+    misma espera, como helpers.bulk; si el error no es transitorio o se
+    agotan los reintentos, todos sus documentos quedan fallidos.
+    """
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    success_count = 0
+    failures = []
+    for attempt in range(max_retries + 1):
+        try:
+            response = es.bulk(operations=body)
+        except Exception as e:
+            if attempt < max_retries and retryable_error(e):
+                logger.warning(f"Petición bulk rechazada ({str(e)}); reintento {attempt + 1} de {max_retries}")
+                time.sleep(initial_backoff * 2 ** attempt)
+                continue
+            logger.error(f"Error en petición bulk: {str(e)}")
+            failures.extend(request_failure(operation, e, body_row(rows, i))
+                            for i, operation in enumerate(bulk_operations(body)))
+            break
+        success, failed, retry = bulk_item_results(response, retry=attempt < max_retries)
+        success_count += success
+        if not failed and not retry:
+            break
+        operations = bulk_operations(body)
+        failures.extend(operation_failure(operations[i], result, body_row(rows, i)) for i, result in failed)
+        if not retry:
+            break
+        time.sleep(initial_backoff * 2 ** attempt)
+        body = b''.join(operations[i] for i in retry)
+        if rows is not None:
+            rows = [rows[i] for i in retry]
+    return success_count, failures
+
+
+def serialize_csv_range(
+    csv_path: str,
+    start: int,
+    end: int,
+    index_name: str,
+    id_field: Union[str, Sequence[str], None] = None,
+    batch_size: int = 1000,
+    encoding: str = 'latin-1',
+    dtypes: Optional[Dict[str, Any]] = None,
+    spec: Optional[Dict[str, Any]] = None,
+    max_bytes: Optional[int] = None,
+    first_row: int = 0
+) -> List[Tuple[bytes, List[Any]]]:
+    """Lee un rango del CSV y lo convierte en cuerpos bulk NDJSON con sus filas
+
+    Los cuerpos se cortan a max_bytes o, si no se da, cada batch_size documentos.
+    Pensada para correr en un proceso aparte: retorna solo bytes listos para
+    enviar y los números de fila (desde first_row) de sus documentos.
+    """
+    df = read_csv_range(csv_path, start, end, encoding=encoding, dtypes=dtypes, spec=spec, first_row=first_row)
+    if max_bytes:
+        return list(iter_bulk_bodies([df], index_name, id_field, max_bytes=max_bytes))
+    return list(iter_bulk_bodies([df], index_name, id_field, max_bytes=None, max_docs=batch_size))
@@ -0,0 +1,254 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dead_letter import read_dead_letters
+from ingest_utils import build_ids, iter_csv_batches
+
+logger = logging.getLogger(__name__)
+
+# Tipos del mapping cuya suma se compara y holgura de cada uno: los enteros
+# suman exacto, float guarda cada valor en 32 bits y scaled_float lo redondea
+# a 1/scaling_factor
+SUM_TYPES = ("byte", "short", "integer", "long", "half_float", "float", "scaled_float", "double")
+RELATIVE_TOLERANCE = {"half_float": 1e-3, "float": 1e-6, "scaled_float": 1e-9, "double": 1e-9}
+
+# Tipos con doc_values en los que se cuentan los nulos (text no se puede agregar)
+COUNT_TYPES = SUM_TYPES + ("keyword", "boolean")
+
+# Filas que se leen por bloque al calcular los agregados del CSV
+VERIFY_BATCH_SIZE = 50000
+
+# Discrepancias que se escriben en el log por índice (el reporte las trae todas)
+LOG_SAMPLE = 10
+
+
+def checked_fields(mapping: Dict[str, Any], columns: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Campos del documento que se pueden agregar, con su definición en el mapping"""
+    properties = mapping.get("mappings", {}).get("properties", {})
+    return {col: properties[col] for col in columns
+            if col in properties and properties[col].get("type") in COUNT_TYPES
+            and properties[col].get("doc_values", True)}
+
+
+def local_aggregates(
+    csv_path: str,
+    mapping: Dict[str, Any],
+    id_field: Any = None,
+    entity_field: Optional[str] = None,
+    spec: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Sumas, nulos por campo y filas por entidad del CSV, calculados por bloques con pandas
+
+    Los bloques son los mismos que lee la carga por bloques, así los valores
+    coinciden con los de los documentos enviados. También cuenta los _id
+    distintos para separar las colisiones de los documentos perdidos.
+    """
+    rows = 0
+    sums = None
+    abs_sums = None
+    nulls = None
+    entities = pd.Series(dtype='int64')
+    ids = set()
+    fields = {}
+    for df in iter_csv_batches(csv_path, batch_size=VERIFY_BATCH_SIZE, spec=spec):
+        df.columns = [str(col) for col in df.columns]
+        if not fields:
+            fields = checked_fields(mapping, list(df.columns))
+        numeric = [col for col, field in fields.items() if field["type"] in SUM_TYPES]
+        values = df[numeric].astype('float64')
+        chunk_sums, chunk_abs = values.sum(), values.abs().sum()
+        chunk_nulls = df[list(fields)].isna().sum()
+        sums = chunk_sums if sums is None else sums + chunk_sums
+        abs_sums = chunk_abs if abs_sums is None else abs_sums + chunk_abs
+        nulls = chunk_nulls if nulls is None else nulls + chunk_nulls
+        if entity_field in df.columns:
+            counts = df[entity_field].astype(object).where(df[entity_field].notna(), None).value_counts(dropna=False)
+            entities = entities.add(counts, fill_value=0)
+        batch_ids = build_ids(df, id_field)
+        if batch_ids is not None:
+            ids.update(batch_ids)
+        rows += len(df)
+    return {
+        "rows": rows,
+        "unique_ids": len(ids - {None}) if ids else None,
+        "fields": fields,
+        "sums": {} if sums is None else sums.to_dict(),
+        "abs_sums": {} if abs_sums is None else abs_sums.to_dict(),
+        "nulls": {} if nulls is None else nulls.astype(int).to_dict(),
+        "entities": {_entity_key(key): int(count) for key, count in entities.items()}
+    }
+
+
+def _entity_key(value: Any) -> Optional[str]:
+    """Clave de una entidad comparable entre pandas y la agregación (texto, None si falta)"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        value = int(value)
+    return str(value)
+
+
+def aggregations(fields: Dict[str, Dict[str, Any]], entity_field: Optional[str], after: Any = None) -> Dict[str, Any]:
+    """Agregaciones con la suma y el conteo de cada campo y los documentos por entidad
+
+    Los nombres de las agregaciones usan la posición del campo (sum_3,
+    count_3) porque los nombres de columna pueden traer caracteres no válidos.
+    """
+    aggs = {}
+    for i, (col, field) in enumerate(fields.items()):
+        aggs[f"count_{i}"] = {"value_count": {"field": col}}
+        if field["type"] in SUM_TYPES:
+            aggs[f"sum_{i}"] = {"sum": {"field": col}}
+    if entity_field:
+        composite = {"size": 1000, "sources": [{"entity": {"terms": {"field": entity_field, "missing_bucket": True}}}]}
+        if after is not None:
+            composite["after"] = after
+        aggs["entities"] = {"composite": composite}
+    return aggs
+
+
+def index_aggregates(
+    es,
+    index_name: str,
+    fields: Dict[str, Dict[str, Any]],
+    entity_field: Optional[str] = None
+) -> Dict[str, Any]:
+    """Los mismos agregados que local_aggregates calculados por el cluster
+
+    Una sola búsqueda por índice; solo se vuelve a pedir la agregación de
+    entidades si tiene más de una página.
+    """
+    es.indices.refresh(index=index_name)
+    response = es.search(index=index_name, size=0, track_total_hits=True, aggs=aggregations(fields, entity_field))
+    total = response["hits"]["total"]["value"]
+    aggs = response.get("aggregations", {})
+    result = {"docs": total, "sums": {}, "nulls": {}, "entities": {}}
+    for i, (col, field) in enumerate(fields.items()):
+        result["nulls"][col] = total - int(aggs[f"count_{i}"]["value"])
+        if field["type"] in SUM_TYPES:
+            result["sums"][col] = aggs[f"sum_{i}"]["value"]
+    entities = aggs.get("entities")
+    while entities:
+        for bucket in entities["buckets"]:
+            result["entities"][_entity_key(bucket["key"]["entity"])] = bucket["doc_count"]
+        if "after_key" not in entities or not entities["buckets"]:
+            break
+        response = es.search(index=index_name, size=0, aggs=aggregations({}, entity_field, after=entities["after_key"]))
+        entities = response.get("aggregations", {}).get("entities")
+    return result
+
+
+def _sum_tolerance(field: Dict[str, Any], abs_sum: float, non_null: int) -> float:
+    """Diferencia admitida entre la suma local y la del cluster para el tipo del campo"""
+    field_type = field["type"]
+    tolerance = RELATIVE_TOLERANCE.get(field_type, 0.0) * abs_sum
+    if field_type == "scaled_float":
+        tolerance += non_null * 0.5 / field.get("scaling_factor", 1)
+    return max(tolerance, 1e-6)
+
+
+def compare_aggregates(local: Dict[str, Any], remote: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Discrepancias por campo (suma o nulos) y por entidad entre el CSV y el índice"""
+    columns = []
+    for col, field in local["fields"].items():
+        expected, actual = local["nulls"].get(col, 0), remote["nulls"].get(col)
+        if actual != expected:
+            columns.append({"field": col, "check": "nulos", "expected": expected, "actual": actual})
+        if col not in local["sums"]:
+            continue
+        expected, actual = local["sums"][col], remote["sums"].get(col)
+        tolerance = _sum_tolerance(field, local["abs_sums"][col], local["rows"] - local["nulls"].get(col, 0))
+        if actual is None or abs(actual - expected) > tolerance:
+            columns.append({"field": col, "check": "suma", "expected": expected, "actual": actual})
+    entities = []
+    for entity in sorted(set(local["entities"]) | set(remote["entities"]), key=lambda key: (key is None, key)):
+        expected, actual = local["entities"].get(entity, 0), remote["entities"].get(entity, 0)
+        if actual != expected:
+            entities.append({"entity": entity, "expected": expected, "actual": actual})
+    return columns, entities
+
+
+def verify_index(
+    es,
+    index_name: str,
+    table: Dict[str, Any],
+    mapping: Dict[str, Any],
+    dead_letter_path: Optional[str] = None,
+    since: Optional[str] = None
+) -> Dict[str, Any]:
+    """Compara el índice cargado con su CSV por agregados y retorna el reporte
+
+    table trae csv_path, id_field, read_spec y entity_field (columna de la
+    entidad federativa). Los documentos que faltan se separan en colisiones
+    de _id (filas que comparten clave y se sobrescribieron) y perdidos, y de
+    estos se indica cuántos están en el dead letter. since (inicio de la carga,
+    en el formato de failed_at) deja fuera las entradas de cargas anteriores
+    del mismo índice; las ya reenviadas salen del archivo al reenviarlas.
+    """
+    entity_field = table.get("entity_field")
+    local = local_aggregates(table["csv_path"], mapping, table.get("id_field"), entity_field, table.get("read_spec"))
+    remote = index_aggregates(es, index_name, local["fields"], entity_field)
+    columns, entities = compare_aggregates(local, remote)
+    expected_docs = local["unique_ids"] if local["unique_ids"] is not None else local["rows"]
+    rejected = 0
+    if dead_letter_path:
+        rejected = sum(1 for entry in read_dead_letters(dead_letter_path, since) if entry["index"] == index_name)
+    report = {
+        "index": index_name,
+        "rows": local["rows"],
+        "collisions": local["rows"] - expected_docs,
+        "docs": remote["docs"],
+        "missing": expected_docs - remote["docs"],
+        "dead_letters": rejected,
+        "fields": len(local["fields"]),
+        "columns": columns,
+        "entities": entities,
+    }
+    report["ok"] = not columns and not entities and report["missing"] == 0
+    log_report(report)
+    return report
+
+
+def log_report(report: Dict[str, Any]) -> None:
+    """Escribe en el log el resultado de verify_index"""
+    index_name = report["index"]
+    if report["collisions"]:
+        logger.warning(f"{index_name}: {report['collisions']} filas del CSV repiten un _id y se sobrescriben")
+    if report["ok"]:
+        logger.info(f"{index_name}: verificado, {report['docs']} documentos y {report['fields']} campos "
+                    f"coinciden con el CSV")
+        return
+    if report["missing"]:
+        logger.error(f"{index_name}: faltan {report['missing']} documentos de {report['rows']} filas "
+                     f"({report['dead_letters']} en el dead letter)")
+    for mismatch in report["columns"][:LOG_SAMPLE]:
+        logger.error(f"{index_name}.{mismatch['field']}: {mismatch['check']} {mismatch['actual']}, "
+                     f"el CSV da {mismatch['expected']}")
+    for mismatch in report["entities"][:LOG_SAMPLE]:
+        logger.error(f"{index_name} entidad {mismatch['entity']}: {mismatch['actual']} documentos, "
+                     f"el CSV tiene {mismatch['expected']}")
+    hidden = max(len(report["columns"]) - LOG_SAMPLE, 0) + max(len(report["entities"]) - LOG_SAMPLE, 0)
+    if hidden:
+        logger.error(f"{index_name}: {hidden} discrepancias más")
+
+
+def verify_tables(
+    es,
+    tables: Dict[str, Dict[str, Any]],
+    mappings: Dict[str, Dict[str, Any]],
+    dead_letter_path: Optional[str] = None,
+    since: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Verifica cada índice cargado contra su CSV (ver verify_index); mappings va por nombre de tabla"""
+    reports = {}
+    for index_name, table in tables.items():
+        try:
+            reports[index_name] = verify_index(es, index_name, table, mappings[table["table"]],
+                                                dead_letter_path, since)
+        except Exception as e:
+            logger.error(f"No se pudo verificar {index_name}: {str(e)}")
+            reports[index_name] = {"index": index_name, "ok": False, "error": str(e)}
+    return reports
@@ -0,0 +1,316 @@
+import copy
+import csv
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from csv_schema import spec_key
+from ingest_utils import file_fingerprint, iter_csv_batches
+
+logger = logging.getLogger(__name__)
+
+# Directorio por defecto de los descriptores (el mismo de los CSV)
+DEFAULT_DESCRIPTOR_DIR = "./eceg_2020_csv/"
+
+# Rangos numéricos observados en cada CSV, para no releerlos en cada carga compacta
+DEFAULT_RANGES_PATH = "./.ingest_state/observed_ranges.json"
+
+# Filas por bloque al observar los rangos
+OBSERVE_BATCH_SIZE = 50000
+
+# Configuración común para todos los índices
+INDEX_SETTINGS = {
+    "number_of_shards": 1,
+    "number_of_replicas": 1,
+    "refresh_interval": "5s",
+    "analysis": {
+        "analyzer": {
+            "spanish_analyzer": {"type": "spanish"}
+        }
+    }
+}
+
+KEYWORD = {"type": "keyword"}
+INTEGER = {"type": "integer"}
+FLOAT = {"type": "float"}
+
+
+def text_field(analyzer: Optional[str] = None) -> Dict[str, Any]:
+    """Campo de texto con subcampo keyword para ordenar y agregar"""
+    field = {"type": "text"}
+    if analyzer:
+        field["analyzer"] = analyzer
+    field["fields"] = {"keyword": {"type": "keyword"}}
+    return field
+
+
+# Catálogos: no tienen descriptor, sus campos se declaran aquí
+CATALOG_PROPERTIES = {
+    "cat_distrito_2020": {
+        "CVE_ENT": KEYWORD,
+        "DESC_ENT": text_field("spanish_analyzer"),
+        "CVE_DISTRITO": KEYWORD,
+        "DESC_DISTRITO": text_field("spanish_analyzer"),
+    },
+    "cat_seccion_2020": {
+        "CVE_ENT": KEYWORD,
+        "CVE_DISTRITO": KEYWORD,
+        "CVE_MUN": KEYWORD,
+        "DESC_MUN": text_field("spanish_analyzer"),
+        "CVE_SECCION": KEYWORD,
+        "DESC_SECCION": text_field("spanish_analyzer"),
+    },
+}
+
+# Tablas INE: descriptor de sus indicadores por nivel geográfico
+DESCRIPTOR_FILES = {
+    "ine_distrito_2020": "Descriptor_indicadores_ECEG_Distrito_2020.csv.csv",
+    "ine_entidad_2020": "Descriptor_indicadores_ECEG_Entidad_2020.csv.csv",
+    "ine_seccion_2020": "Descriptor_indicadores_ECEG_Seccion_2020.csv.csv",
+}
+
+# Campos de identificación de cada nivel: el descriptor no trae su unidad ni su tipo
+IDENTIFICATION_PROPERTIES = {
+    "ine_distrito_2020": {
+        "ENTIDAD": KEYWORD,
+        "NOM_ENT": text_field(),
+        "DISTRITO": KEYWORD,
+        "INDIGENA": KEYWORD,
+        "COMPLEJIDA": KEYWORD,
+    },
+    "ine_entidad_2020": {
+        "ENT": KEYWORD,
+        "NOM_ENT": text_field(),
+    },
+    "ine_seccion_2020": {
+        "ID": INTEGER,
+        "ENTIDAD": INTEGER,
+        "DISTRITO": INTEGER,
+        "MUNICIPIO": INTEGER,
+        "SECCION": INTEGER,
+        "TIPO": INTEGER,
+    },
+}
+
+# Indicadores que son cocientes (promedios y relaciones) y no conteos
+RATIO_INDICATOR = re.compile(r"promedio|relaci[oó]n", re.IGNORECASE)
+
+INDEX_NAMES = list(CATALOG_PROPERTIES) + list(DESCRIPTOR_FILES)
+
+# Perfiles de mapping: default (todo indexado) y compact (tipos mínimos, métricas sin índice)
+MAPPING_PROFILES = ("default", "compact")
+
+# Tipos enteros de Elasticsearch del más angosto al más ancho
+INTEGER_TYPES = (
+    ("byte", -2**7, 2**7 - 1),
+    ("short", -2**15, 2**15 - 1),
+    ("integer", -2**31, 2**31 - 1),
+    ("long", -2**63, 2**63 - 1),
+)
+
+# Margen sobre el rango observado antes de elegir un tipo más angosto
+RANGE_HEADROOM = 2
+
+# Decimales mínimos de los promedios y relaciones (el INEGI los publica con 2)
+RATIO_DECIMALS = 2
+
+# Métricas que las consultas filtran con term/range y se mantienen indexadas
+INDEXED_METRICS = ("POBTOT", "VIVTOT", "GRAPROES")
+
+
+@lru_cache(maxsize=None)
+def read_descriptor(path: str, encoding: str = 'latin-1') -> Tuple[Tuple[str, str, str], ...]:
+    """Filas (mnemónico, indicador, unidad de medida) de un descriptor del ECEG"""
+    with open(path, encoding=encoding, newline='') as f:
+        reader = csv.reader(f)
+        next(reader)  # encabezado
+        return tuple(
+            (row[3].strip(), row[1].strip(), row[4].strip())
+            for row in reader if len(row) > 4 and row[3].strip()
+        )
+
+
+def indicator_field(indicator: str, unit: str) -> Optional[Dict[str, Any]]:
+    """Tipo de un indicador: float para promedios y relaciones, integer para conteos
+
+    Retorna None para las filas sin unidad de medida (campos de identificación).
+    """
+    if not unit:
+        return None
+    return FLOAT if RATIO_INDICATOR.search(indicator) else INTEGER
+
+
+def descriptor_properties(index_name: str, descriptor_dir: str = DEFAULT_DESCRIPTOR_DIR) -> Dict[str, Any]:
+    """Properties de una tabla INE: campos de identificación y un campo por indicador del descriptor"""
+    identification = IDENTIFICATION_PROPERTIES[index_name]
+    properties = dict(identification)
+    for mnemonic, indicator, unit in read_descriptor(os.path.join(descriptor_dir, DESCRIPTOR_FILES[index_name])):
+        if mnemonic in identification:
+            continue
+        field = indicator_field(indicator, unit)
+        if field is None:
+            logger.warning(f"{index_name}: el campo {mnemonic} no tiene unidad de medida y no se mapea")
+            continue
+        properties[mnemonic] = field
+    return properties
+
+
+@lru_cache(maxsize=None)
+def _build_mapping(index_name: str, descriptor_dir: str) -> Dict[str, Any]:
+    """Mapping completo de un índice (en caché; se entrega siempre una copia)"""
+    if index_name in CATALOG_PROPERTIES:
+        properties = CATALOG_PROPERTIES[index_name]
+    else:
+        properties = descriptor_properties(index_name, descriptor_dir)
+    return {
+        "mappings": {"properties": properties},
+        "settings": INDEX_SETTINGS
+    }
+
+
+def build_index_mapping(index_name: str, descriptor_dir: str = DEFAULT_DESCRIPTOR_DIR) -> Dict[str, Any]:
+    """Mapping de un índice, construido una sola vez por proceso"""
+    return copy.deepcopy(_build_mapping(index_name, os.path.normpath(descriptor_dir)))
+
+
+def load_mappings(
+    descriptor_dir: str = DEFAULT_DESCRIPTOR_DIR,
+    index_names: Optional[List[str]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Mappings de todos los índices (o de index_names) a partir de los descriptores"""
+    return {index_name: build_index_mapping(index_name, descriptor_dir)
+            for index_name in (index_names or INDEX_NAMES)}
+
+
+def _decimals(values: np.ndarray, max_decimals: int = 6) -> int:
+    """Decimales necesarios para representar exactamente todos los valores"""
+    for decimals in range(max_decimals + 1):
+        scaled = values * 10 ** decimals
+        if np.allclose(scaled, np.round(scaled)):
+            return decimals
+    return max_decimals
+
+
+def observe_numeric_ranges(
+    csv_path: str,
+    spec: Optional[Dict[str, Any]] = None,
+    encoding: str = 'latin-1',
+    batch_size: int = OBSERVE_BATCH_SIZE
+) -> Dict[str, Dict[str, Any]]:
+    """Mínimo, máximo y decimales observados de cada columna numérica del CSV
+
+    Se lee por bloques con iter_csv_batches, así la memoria no depende del
+    tamaño del archivo. spec es la especificación de lectura de la carga (ver
+    csv_schema): con ella las marcas del INEGI cuentan como nulos.
+    """
+    observed = {}
+    for df in iter_csv_batches(csv_path, batch_size=batch_size, encoding=encoding, spec=spec):
+        for col in df.select_dtypes('number').columns:
+            values = df[col].dropna().to_numpy(dtype='float64')
+            if len(values) == 0:
+                continue
+            name = str(col).strip()
+            stats = observed.get(name)
+            chunk = {"min": float(values.min()), "max": float(values.max()), "decimals": _decimals(values)}
+            observed[name] = chunk if stats is None else {
+                "min": min(stats["min"], chunk["min"]),
+                "max": max(stats["max"], chunk["max"]),
+                "decimals": max(stats["decimals"], chunk["decimals"])
+            }
+    return observed
+
+
+def _read_ranges(path: str) -> Dict[str, Any]:
+    """Rangos guardados por CSV; un archivo ausente o corrupto se trata como vacío"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudieron leer los rangos observados {path}: {str(e)}")
+        return {}
+
+
+def cached_numeric_ranges(
+    csv_path: str,
+    spec: Optional[Dict[str, Any]] = None,
+    path: str = DEFAULT_RANGES_PATH
+) -> Dict[str, Dict[str, Any]]:
+    """Rangos de observe_numeric_ranges guardados en path, recalculados solo si el CSV o spec cambian
+
+    Cada CSV se identifica por su ruta, tamaño y mtime, sin leer el archivo.
+    """
+    fingerprint = file_fingerprint(csv_path, content_hash=False)
+    version = {"size": fingerprint["size"], "mtime": fingerprint["mtime"], "spec": spec_key(spec)}
+    saved = _read_ranges(path)
+    entry = saved.get(fingerprint["path"])
+    if entry and all(entry.get(key) == value for key, value in version.items()):
+        return entry["ranges"]
+    logger.info(f"Observando los rangos numéricos de {csv_path}")
+    ranges = observe_numeric_ranges(csv_path, spec)
+    saved[fingerprint["path"]] = {**version, "ranges": ranges}
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(saved, f, indent=2)
+    os.replace(tmp_path, path)
+    return ranges
+
+
+def narrowest_integer_type(minimum: float, maximum: float, headroom: float = RANGE_HEADROOM) -> str:
+    """Tipo entero más angosto que admite el rango observado con headroom de margen"""
+    for type_name, lower, upper in INTEGER_TYPES:
+        if minimum * headroom >= lower and maximum * headroom <= upper:
+            return type_name
+    return "long"
+
+
+def mapping_profile(mapping: Dict[str, Any]) -> str:
+    """Perfil con que se generó el mapping según su _meta ("default" si no lo declara)"""
+    return (mapping.get("mappings", {}).get("_meta") or {}).get("mapping_profile", "default")
+
+
+def compact_mapping(
+    index_name: str,
+    mapping: Dict[str, Any],
+    observed: Optional[Dict[str, Dict[str, Any]]] = None,
+    indexed: Tuple[str, ...] = INDEXED_METRICS
+) -> Dict[str, Any]:
+    """Versión compacta del mapping de una tabla INE
+
+    Los conteos usan el tipo entero más angosto para el rango observado en el
+    CSV (integer si no hay observación), los promedios y relaciones pasan a
+    scaled_float y las métricas que solo se agregan quedan sin índice (solo
+    doc_values). Los campos de identificación y los catálogos no cambian.
+    El _meta del mapping compacto declara su perfil (ver mapping_profile).
+    """
+    if index_name not in DESCRIPTOR_FILES:
+        return copy.deepcopy(mapping)
+    observed = observed or {}
+    identification = IDENTIFICATION_PROPERTIES[index_name]
+    compact = copy.deepcopy(mapping)
+    properties = compact["mappings"]["properties"]
+    for name, field in properties.items():
+        if name in identification or field.get("type") not in ("integer", "float"):
+            continue
+        stats = observed.get(name)
+        if field["type"] == "float":
+            decimals = max(stats["decimals"] if stats else 0, RATIO_DECIMALS)
+            new_field = {"type": "scaled_float", "scaling_factor": 10 ** decimals}
+        elif stats:
+            new_field = {"type": narrowest_integer_type(stats["min"], stats["max"])}
+        else:
+            new_field = {"type": "integer"}
+        if name not in indexed:
+            new_field["index"] = False
+        properties[name] = new_field
+    compact["mappings"].setdefault("_meta", {})["mapping_profile"] = "compact"
+    return compact
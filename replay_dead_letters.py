@@ -0,0 +1,115 @@
+import argparse
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dead_letter import DEFAULT_DEAD_LETTER_PATH, entries_body, read_dead_letters, replace_dead_letters
+from es_client import connect_elasticsearch
+from ingest_utils import send_bulk_body
+
+logger = logging.getLogger(__name__)
+
+
+def matches(entry: Dict[str, Any], index_name: Optional[str] = None, error_types: Optional[Sequence[str]] = None) -> bool:
+    """Si la entrada es del índice (o de una de sus versiones _v*) y de uno de los tipos de error dados"""
+    if index_name and entry["index"] != index_name and not str(entry["index"]).startswith(f"{index_name}_v"):
+        return False
+    return not error_types or entry.get("error_type") in error_types
+
+
+def summarize_dead_letters(entries: List[Dict[str, Any]]) -> Dict[Tuple[str, str], int]:
+    """Número de entradas por índice y tipo de error"""
+    return dict(Counter((entry["index"], entry.get("error_type") or str(entry.get("status")))
+                        for entry in entries))
+
+
+def replay_dead_letters(
+    es,
+    path: str = DEFAULT_DEAD_LETTER_PATH,
+    index_name: Optional[str] = None,
+    error_types: Optional[Sequence[str]] = None,
+    target_index: Optional[str] = None,
+    batch_size: int = 1000
+) -> Tuple[int, int]:
+    """Reenvía a la API bulk los documentos del dead letter y retorna (éxitos, errores)
+
+    Solo se reenvían las entradas del índice y los tipos de error dados (todas
+    si no se dan), a target_index si se da (p. ej. el alias tras una recarga
+    con versiones) o a su índice original. Al terminar el archivo conserva las
+    entradas no seleccionadas y, con su nuevo motivo, las que volvieron a
+    fallar; las indexadas se quitan. No debe correr mientras una carga escribe
+    en el mismo archivo.
+    """
+    entries = read_dead_letters(path)
+    selected = [entry for entry in entries if matches(entry, index_name, error_types)]
+    kept = [entry for entry in entries if not matches(entry, index_name, error_types)]
+    if not selected:
+        logger.info(f"No hay documentos que reenviar en {path}")
+        return 0, 0
+
+    logger.info(f"Reenviando {len(selected)} documentos de {path}")
+    success_count = 0
+    failures = []
+    for i in range(0, len(selected), batch_size):
+        batch = selected[i:i+batch_size]
+        success, failed = send_bulk_body(es, entries_body(batch, target_index),
+                                         rows=[entry.get("row") for entry in batch])
+        success_count += success
+        failures.extend(failed)
+
+    replace_dead_letters(path, kept + failures)
+    logger.info(f"Reenvío completado: {success_count} indexados, {len(failures)} siguen en {path}")
+    for (index, error_type), count in summarize_dead_letters(failures).items():
+        logger.warning(f"{index}: {count} documentos siguen fallando ({error_type})")
+    return success_count, len(failures)
+
+
+def main(
+    path: str = DEFAULT_DEAD_LETTER_PATH,
+    index_name: Optional[str] = None,
+    error_types: Optional[List[str]] = None,
+    target_index: Optional[str] = None,
+    dry_run: bool = False
+):
+    """Muestra o reenvía los documentos rechazados de una carga anterior"""
+    if dry_run:
+        entries = [entry for entry in read_dead_letters(path) if matches(entry, index_name, error_types)]
+        for (index, error_type), count in sorted(summarize_dead_letters(entries).items()):
+            print(f"{index:<40} {error_type:<32} {count:>7}")
+        rows = [entry["row"] for entry in entries if entry.get("row") is not None]
+        print(f"{len(entries)} documentos" + (f", filas {rows[:10]}" if rows else ""))
+        return entries
+
+    es = connect_elasticsearch()
+    if not es:
+        logger.error("No se puede continuar sin conexión a Elasticsearch")
+        return
+    return replay_dead_letters(es, path, index_name, error_types, target_index)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Opciones de línea de comandos equivalentes a los parámetros de main()"""
+    parser = argparse.ArgumentParser(description="Reenvía a Elasticsearch los documentos rechazados en una carga")
+    parser.add_argument("--path", default=DEFAULT_DEAD_LETTER_PATH, help="archivo NDJSON de dead letter")
+    parser.add_argument("--index", dest="index_name", help="solo los documentos de este índice (o sus versiones)")
+    parser.add_argument("--error-type", dest="error_types", action="append",
+                        help="solo este tipo de error, p. ej. mapper_parsing_exception (repetible)")
+    parser.add_argument("--target", dest="target_index",
+                        help="índice o alias al que se reenvían (por omisión, el índice original)")
+    parser.add_argument("--dry-run", action="store_true", help="solo mostrar cuántos documentos hay por índice y error")
+    args = parser.parse_args(argv)
+    if args.target_index and not args.index_name:
+        parser.error("--target requiere --index")
+    return args
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("elastic_import.log"),
+            logging.StreamHandler()
+        ]
+    )
+    main(**vars(parse_args()))
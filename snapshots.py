@@ -0,0 +1,330 @@
+import argparse
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from bigdata_final import CSV_DIR, TABLES_CONFIG, get_mappings, validate_table_ids
+from csv_input import resolve_csv_path
+from csv_schema import read_spec_for_csv
+from es_client import connect_elasticsearch
+from index_lifecycle import alias_indices, swap_alias
+
+logger = logging.getLogger(__name__)
+
+# Repositorio de snapshots en un sistema de archivos compartido; la ruta debe
+# estar en path.repo de cada nodo de los clusters que lo usan
+DEFAULT_REPOSITORY = "censo_2020"
+DEFAULT_REPOSITORY_PATH = "/mnt/es_snapshots/censo_2020"
+
+# Nombre de cada snapshot: censo_<fecha>
+SNAPSHOT_PREFIX = "censo"
+
+
+def snapshot_name(timestamp: Optional[time.struct_time] = None) -> str:
+    """Nombre de un snapshot nuevo, p. ej. censo_20240101120000"""
+    return f"{SNAPSHOT_PREFIX}_{time.strftime('%Y%m%d%H%M%S', timestamp or time.localtime())}"
+
+
+def register_repository(es, repository: str, location: str, readonly: bool = False) -> bool:
+    """Registra (o actualiza) el repositorio fs y verifica que todos los nodos lo vean
+
+    El cluster que solo restaura lo registra con readonly=True para no
+    escribir en un repositorio que otro cluster también usa.
+    """
+    try:
+        es.snapshot.create_repository(
+            name=repository,
+            repository={"type": "fs", "settings": {"location": location, "compress": True, "readonly": readonly}},
+            verify=True
+        )
+        logger.info(f"Repositorio {repository} registrado en {location}{' (solo lectura)' if readonly else ''}")
+        return True
+    except Exception as e:
+        logger.error(f"Error al registrar el repositorio {repository} en {location}: {str(e)}")
+        return False
+
+
+def table_indices(es, table_names: List[str]) -> Dict[str, str]:
+    """Índice físico de cada tabla: la versión a la que apunta su alias o el índice con su nombre"""
+    indices = {}
+    for table_name in table_names:
+        versions = alias_indices(es, table_name)
+        if len(versions) == 1:
+            indices[table_name] = versions[0]
+        elif versions:
+            logger.warning(f"El alias {table_name} apunta a varios índices {versions}; se omite")
+        elif es.indices.exists(index=table_name):
+            indices[table_name] = table_name
+        else:
+            logger.warning(f"No existe el índice {table_name}; se omite")
+    return indices
+
+
+def expected_table_docs(table_name: str, mapping: Dict[str, Any]) -> Optional[int]:
+    """Documentos que debe tener el índice de la tabla según su CSV (None si no hay CSV o claves válidas)"""
+    config = TABLES_CONFIG[table_name]
+    csv_path = resolve_csv_path(CSV_DIR, config["csv_file"])
+    if not os.path.exists(csv_path):
+        return None
+    return validate_table_ids(csv_path, config.get("id_field"), read_spec_for_csv(csv_path, mapping))
+
+
+def verify_load(es, indices: Dict[str, str]) -> Optional[Dict[str, int]]:
+    """Conteo de cada índice si la carga está completa y sana, o None
+
+    Cada índice debe tener salud al menos amarilla y exactamente los
+    documentos que indica su CSV; sin el CSV basta con que no esté vacío.
+    """
+    mappings = get_mappings()
+    counts = {}
+    verified = True
+    for table_name, index_name in indices.items():
+        try:
+            health = es.cluster.health(index=index_name, wait_for_status="yellow", timeout="30s")
+            es.indices.refresh(index=index_name)
+            count = es.count(index=index_name)["count"]
+        except Exception as e:
+            logger.error(f"No se pudo verificar {index_name}: {str(e)}")
+            verified = False
+            continue
+        expected = expected_table_docs(table_name, mappings[table_name])
+        if health["status"] == "red":
+            logger.error(f"{index_name} tiene salud roja")
+            verified = False
+        elif expected is None and count == 0:
+            logger.error(f"{index_name} está vacío")
+            verified = False
+        elif expected is not None and count != expected:
+            logger.error(f"{index_name} tiene {count} documentos, el CSV tiene {expected}")
+            verified = False
+        elif expected is None:
+            logger.warning(f"{index_name}: sin CSV para comparar, {count} documentos")
+        counts[table_name] = count
+    return counts if verified else None
+
+
+def create_snapshot(
+    es,
+    repository: str,
+    snapshot: str,
+    indices: Dict[str, str],
+    counts: Dict[str, int]
+) -> bool:
+    """Toma el snapshot de los índices y guarda en su metadata la tabla y el conteo de cada uno"""
+    metadata = {"tables": {table_name: {"index": index_name, "count": counts[table_name]}
+                           for table_name, index_name in indices.items()}}
+    try:
+        start = time.time()
+        response = es.snapshot.create(
+            repository=repository,
+            snapshot=snapshot,
+            indices=list(indices.values()),
+            include_global_state=False,
+            metadata=metadata,
+            wait_for_completion=True
+        )
+    except Exception as e:
+        logger.error(f"Error al crear el snapshot {repository}/{snapshot}: {str(e)}")
+        return False
+    info = response["snapshot"]
+    failed = info.get("shards", {}).get("failed", 0)
+    if info.get("state") != "SUCCESS" or failed:
+        logger.error(f"El snapshot {repository}/{snapshot} terminó en {info.get('state')} "
+                     f"con {failed} shards fallidos")
+        return False
+    logger.info(f"Snapshot {repository}/{snapshot} creado en {time.time() - start:.2f} segundos: "
+                f"{', '.join(indices.values())}")
+    return True
+
+
+def snapshot_tables(
+    es,
+    repository: str = DEFAULT_REPOSITORY,
+    location: str = DEFAULT_REPOSITORY_PATH,
+    snapshot: Optional[str] = None,
+    tables: Optional[List[str]] = None
+) -> Optional[str]:
+    """Verifica la carga, registra el repositorio y toma el snapshot; retorna su nombre
+
+    Se toman los índices físicos detrás de los alias, así el snapshot guarda la
+    versión publicada. No se toma nada si alguna tabla no pasa la verificación.
+    """
+    indices = table_indices(es, tables or list(TABLES_CONFIG))
+    if not indices:
+        logger.error("No hay índices cargados que respaldar")
+        return None
+    counts = verify_load(es, indices)
+    if counts is None:
+        logger.error("La carga no pasó la verificación; no se toma el snapshot")
+        return None
+    if not register_repository(es, repository, location):
+        return None
+    snapshot = snapshot or snapshot_name()
+    return snapshot if create_snapshot(es, repository, snapshot, indices, counts) else None
+
+
+def get_snapshot(es, repository: str, snapshot: str = "latest") -> Optional[Dict[str, Any]]:
+    """Información de un snapshot del repositorio; "latest" es el más reciente que terminó bien"""
+    try:
+        if snapshot == "latest":
+            snapshots = es.snapshot.get(repository=repository, snapshot=f"{SNAPSHOT_PREFIX}_*",
+                                        sort="start_time", order="desc")["snapshots"]
+            snapshots = [info for info in snapshots if info.get("state") == "SUCCESS"]
+        else:
+            snapshots = es.snapshot.get(repository=repository, snapshot=snapshot)["snapshots"]
+    except Exception as e:
+        logger.error(f"Error al consultar el snapshot {repository}/{snapshot}: {str(e)}")
+        return None
+    if not snapshots:
+        logger.error(f"No hay snapshot {snapshot} en {repository}")
+        return None
+    return snapshots[0]
+
+
+def existing_indices(es, names: List[str]) -> Dict[str, str]:
+    """Índices concretos del cluster que ocupan los nombres dados, con el nombre que ocupan
+
+    Un nombre que en el cluster es un alias (la tabla cargada con versiones) no
+    se puede borrar como índice: se resuelve a los índices a los que apunta.
+    """
+    existing = {}
+    for name in names:
+        backing = alias_indices(es, name)
+        if backing:
+            existing.update({index_name: name for index_name in backing})
+        elif es.indices.exists(index=name):
+            existing[name] = name
+    return existing
+
+
+def restore_tables(
+    es,
+    repository: str = DEFAULT_REPOSITORY,
+    snapshot: str = "latest",
+    tables: Optional[List[str]] = None,
+    replace: bool = False,
+    replicas: Optional[int] = None
+) -> Dict[str, bool]:
+    """Restaura los índices del snapshot y retorna, por tabla, si quedó con el conteo del snapshot
+
+    Un índice versionado se restaura con su nombre y el alias de la tabla se
+    cambia a él solo si el conteo cuadra (sirve también para volver a una
+    versión anterior). Un índice que ya existe en el cluster solo se reemplaza
+    con replace=True; si el nombre es un alias se borran los índices a los que
+    apunta. replicas cambia las réplicas de los índices restaurados
+    (0 para un nodo de prueba).
+    """
+    info = get_snapshot(es, repository, snapshot)
+    if info is None:
+        return {}
+    snapshot = info["snapshot"]
+    metadata = (info.get("metadata") or {}).get("tables", {})
+    selected = {table_name: entry for table_name, entry in metadata.items() if not tables or table_name in tables}
+    if not selected:
+        logger.error(f"El snapshot {repository}/{snapshot} no tiene las tablas pedidas")
+        return {}
+
+    indices = [entry["index"] for entry in selected.values()]
+    existing = existing_indices(es, indices)
+    if existing and not replace:
+        logger.error(f"Ya existen {sorted(set(existing.values()))}; usa replace para reemplazarlos")
+        return {}
+    for index_name, name in existing.items():
+        es.indices.delete(index=index_name)
+        via = f" (alias {name})" if name != index_name else ""
+        logger.info(f"Índice {index_name}{via} eliminado para restaurarlo")
+
+    try:
+        start = time.time()
+        response = es.snapshot.restore(
+            repository=repository,
+            snapshot=snapshot,
+            indices=indices,
+            include_aliases=False,
+            include_global_state=False,
+            index_settings={"index.number_of_replicas": replicas} if replicas is not None else None,
+            wait_for_completion=True
+        )
+    except Exception as e:
+        logger.error(f"Error al restaurar {repository}/{snapshot}: {str(e)}")
+        return {}
+    failed = response["snapshot"].get("shards", {}).get("failed", 0)
+    if failed:
+        logger.error(f"La restauración de {repository}/{snapshot} tuvo {failed} shards fallidos")
+    logger.info(f"Snapshot {repository}/{snapshot} restaurado en {time.time() - start:.2f} segundos")
+
+    results = {}
+    for table_name, entry in selected.items():
+        index_name, expected = entry["index"], entry["count"]
+        if index_name != table_name:
+            results[table_name] = swap_alias(es, table_name, index_name, expected_count=expected)
+            continue
+        es.indices.refresh(index=index_name)
+        count = es.count(index=index_name)["count"]
+        results[table_name] = count == expected
+        if count != expected:
+            logger.error(f"{index_name} tiene {count} documentos tras restaurar, el snapshot tenía {expected}")
+    return results
+
+
+def list_snapshots(es, repository: str = DEFAULT_REPOSITORY) -> List[Dict[str, Any]]:
+    """Snapshots del repositorio, del más antiguo al más reciente"""
+    try:
+        return es.snapshot.get(repository=repository, snapshot="_all", sort="start_time")["snapshots"]
+    except Exception as e:
+        logger.error(f"Error al listar los snapshots de {repository}: {str(e)}")
+        return []
+
+
+def main(
+    command: str,
+    repository: str = DEFAULT_REPOSITORY,
+    location: str = DEFAULT_REPOSITORY_PATH,
+    snapshot: Optional[str] = None,
+    tables: Optional[List[str]] = None,
+    replace: bool = False,
+    replicas: Optional[int] = None
+):
+    """Toma, restaura o lista los snapshots de los índices censales"""
+    es = connect_elasticsearch()
+    if not es:
+        logger.error("No se puede continuar sin conexión a Elasticsearch")
+        return
+
+    if command == "snapshot":
+        return snapshot_tables(es, repository, location, snapshot, tables)
+    if command == "restore":
+        if not register_repository(es, repository, location, readonly=True):
+            return
+        results = restore_tables(es, repository, snapshot or "latest", tables, replace, replicas)
+        failed = [table_name for table_name, ok in results.items() if not ok]
+        if failed:
+            logger.warning(f"Tablas restauradas con errores: {', '.join(failed)}")
+        return results
+    snapshots = list_snapshots(es, repository)
+    for info in snapshots:
+        tables_info = (info.get("metadata") or {}).get("tables", {})
+        print(f"{info['snapshot']:<28} {info.get('state', ''):<10} {info.get('start_time', ''):<26} "
+              + ", ".join(f"{table_name}={entry['count']}" for table_name, entry in tables_info.items()))
+    return snapshots
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Opciones de línea de comandos equivalentes a los parámetros de main()"""
+    parser = argparse.ArgumentParser(description="Snapshots de los índices censales en un repositorio compartido")
+    parser.add_argument("command", choices=["snapshot", "restore", "list"],
+                        help="tomar un snapshot tras verificar la carga, restaurarlo o listar los del repositorio")
+    parser.add_argument("--repository", default=DEFAULT_REPOSITORY, help="nombre del repositorio de snapshots")
+    parser.add_argument("--location", default=DEFAULT_REPOSITORY_PATH,
+                        help="ruta del repositorio en el sistema de archivos compartido (en path.repo)")
+    parser.add_argument("--snapshot", help="nombre del snapshot (al restaurar, por omisión el más reciente)")
+    parser.add_argument("--table", dest="tables", action="append", choices=list(TABLES_CONFIG),
+                        help="solo esta tabla (repetible)")
+    parser.add_argument("--replace", action="store_true", help="al restaurar, reemplazar los índices que ya existen")
+    parser.add_argument("--replicas", type=int, help="al restaurar, réplicas de los índices (0 en un nodo de prueba)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(**vars(parse_args()))
@@ -0,0 +1,129 @@
+import json
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from elastic_transport import ApiResponseMeta, HttpHeaders, JsonSerializer
+from elasticsearch import ApiError
+
+from ingest_utils import bulk_operations
+
+# Mapping de la tabla de prueba: claves keyword con ceros a la izquierda, un
+# texto, un entero y un float
+CENSUS_MAPPING = {
+    "mappings": {
+        "properties": {
+            "CVE_ENT": {"type": "keyword"},
+            "CVE_SECCION": {"type": "keyword"},
+            "NOMBRE": {"type": "text"},
+            "POB": {"type": "integer"},
+            "PROM": {"type": "float"},
+        }
+    }
+}
+
+# Filas como las del INEGI: claves sin ceros, marcas "*" en numéricos, comas
+# finales (columna 'Unnamed') y una fila vacía al final
+CENSUS_ROWS = [
+    "1,338,Aguascalientes,120,1.5,",
+    "1,339,Jesús María,*,,",
+    "1,340,Calvillo,75,0.25,",
+    "2,1,Mexicali,45,2.25,",
+    "2,2,Tijuana,,3.0,",
+    "2,3,Ensenada,18,N/D,",
+    "3,10,La Paz,33,1.0,",
+    "3,11,Los Cabos,27,4.5,",
+    "4,100,Campeche,9,0.5,",
+    "4,101,Carmen,12,0.75,",
+]
+
+CENSUS_ID_FIELD = ["CVE_ENT", "CVE_SECCION"]
+
+
+def write_census_csv(path: str, rows: Optional[List[str]] = None) -> str:
+    """Escribe el CSV de prueba en latin-1, con el encabezado y la fila vacía final"""
+    lines = ["CVE_ENT,CVE_SECCION,NOMBRE,POB,PROM,"] + (CENSUS_ROWS if rows is None else rows) + [",,,,,"]
+    with open(path, 'w', encoding='latin-1', newline='') as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def api_error(status: int, message: str = "circuit_breaking_exception") -> ApiError:
+    """Error de una petición completa con el estado HTTP dado, como lo lanza el cliente"""
+    meta = ApiResponseMeta(status=status, http_version="1.1", headers=HttpHeaders(), duration=0.0, node=None)
+    return ApiError(message, meta=meta, body={"error": {"type": message}, "status": status})
+
+
+class Crash(BaseException):
+    """Corte del proceso a mitad de la carga (no lo atrapan los except Exception del cargador)"""
+
+
+class RecordingClient:
+    """Cliente falso con la API bulk: guarda cada cuerpo y responde según el _id
+
+    statuses asocia un _id con el estado que recibe; una lista da el estado de
+    cada intento sucesivo (el último se repite). crash_after corta el proceso
+    en la petición bulk número crash_after + 1. request_errors son las
+    excepciones que lanzan las primeras peticiones completas, en orden. key
+    saca la clave de statuses de (acción, documento); por omisión es el _id.
+    """
+
+    def __init__(
+        self,
+        statuses: Optional[Dict[str, Any]] = None,
+        crash_after: Optional[int] = None,
+        request_errors: Optional[List[Exception]] = None,
+        key: Optional[Callable[[Dict[str, Any], Any], Any]] = None
+    ):
+        self.statuses = statuses or {}
+        self.key = key or (lambda meta, document: meta.get("_id"))
+        self.crash_after = crash_after
+        self.request_errors = list(request_errors or [])
+        self.requests = 0
+        self.bodies = []
+        self.attempts = {}
+
+    def sent_ids(self) -> List[str]:
+        """_id de todas las operaciones enviadas, en orden"""
+        return [json.loads(operation.split(b'\n', 1)[0])["index"].get("_id")
+                for body in self.bodies for operation in bulk_operations(body)]
+
+    def _status(self, doc_id: Optional[str]) -> int:
+        status = self.statuses.get(doc_id, 201)
+        if isinstance(status, list):
+            attempt = self.attempts.get(doc_id, 0)
+            self.attempts[doc_id] = attempt + 1
+            status = status[min(attempt, len(status) - 1)]
+        return status
+
+    def bulk(self, operations: bytes, **kwargs) -> Dict[str, Any]:
+        if self.crash_after is not None and len(self.bodies) >= self.crash_after:
+            raise Crash()
+        self.requests += 1
+        if self.request_errors:
+            raise self.request_errors.pop(0)
+        self.bodies.append(operations)
+        items = []
+        for operation in bulk_operations(operations):
+            lines = operation.splitlines()
+            (op_type, meta), = json.loads(lines[0]).items()
+            status = self._status(self.key(meta, json.loads(lines[1]) if len(lines) > 1 else None))
+            result = {"_index": meta["_index"], "_id": meta.get("_id"), "status": status}
+            if status >= 300:
+                result["error"] = {"type": "mapper_parsing_exception", "reason": "valor inválido"}
+            items.append({op_type: result})
+        return {"took": 1, "errors": any("error" in next(iter(item.values())) for item in items), "items": items}
+
+
+class AsyncRecordingClient(RecordingClient):
+    """RecordingClient con la interfaz de AsyncElasticsearch que usa async_streaming_bulk"""
+
+    transport = SimpleNamespace(serializers=SimpleNamespace(get_serializer=lambda mimetype: JsonSerializer()))
+
+    def options(self, **kwargs) -> "AsyncRecordingClient":
+        return self
+
+    async def bulk(self, operations: Any, **kwargs) -> Any:
+        if not isinstance(operations, bytes):
+            operations = b''.join((line if isinstance(line, bytes) else line.encode('utf-8')) + b'\n'
+                                  for line in operations)
+        return SimpleNamespace(body=RecordingClient.bulk(self, operations, **kwargs))
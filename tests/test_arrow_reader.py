@@ -0,0 +1,59 @@
+import pytest
+
+from bigdata_final import read_table_data
+from csv_schema import read_spec_for_csv
+from ingest_utils import build_actions, frame_rows, iter_batches
+from tests.helpers import CENSUS_ID_FIELD, CENSUS_MAPPING, CENSUS_ROWS, write_census_csv
+
+pytest.importorskip("pyarrow")
+
+# Marcas de nulo en la columna de texto: pandas solo anula sus valores por
+# omisión ("NA", "None", vacío), nunca las marcas del INEGI ("*", "N/D")
+MARKED_ROWS = CENSUS_ROWS + [
+    "5,1,*,*,N/D,",
+    "5,2,NA,NA,NA,",
+    "5,3,None,7,,",
+    "5,4,N/D,8,nan,",
+    "5,5,,9,1.5,",
+    "6,1,*,*,*,",
+]
+
+
+def _actions(csv_path, spec, reader):
+    data = read_table_data(csv_path, batch_size=4, spec=spec, reader=reader)
+    actions, rows = [], []
+    for batch in iter_batches(data, 4):
+        actions += build_actions(batch, "secciones", CENSUS_ID_FIELD)
+        rows += frame_rows(batch)
+    return actions, rows
+
+
+def test_arrow_and_pandas_readers_produce_the_same_documents(tmp_path):
+    csv_path = write_census_csv(str(tmp_path / "secciones.csv"), MARKED_ROWS)
+    spec = read_spec_for_csv(csv_path, CENSUS_MAPPING)
+    pandas_actions, pandas_rows = _actions(csv_path, spec, "pandas")
+    arrow_actions, arrow_rows = _actions(csv_path, spec, "arrow")
+    assert arrow_actions == pandas_actions
+    assert arrow_rows == pandas_rows == list(range(len(MARKED_ROWS)))
+
+
+def test_readers_agree_on_text_nulls_without_spec(tmp_path):
+    # Sin especificación cada lector infiere sus tipos numéricos; los textos sí deben coincidir
+    csv_path = write_census_csv(str(tmp_path / "secciones.csv"), MARKED_ROWS)
+    pandas_names = [action["_source"]["NOMBRE"] for action in _actions(csv_path, None, "pandas")[0]]
+    arrow_names = [action["_source"]["NOMBRE"] for action in _actions(csv_path, None, "arrow")[0]]
+    assert arrow_names == pandas_names
+    assert pandas_names[-6:] == ["*", None, None, "N/D", None, "*"]
+
+
+def test_inegi_marks_are_null_only_in_numeric_columns(tmp_path):
+    csv_path = write_census_csv(str(tmp_path / "secciones.csv"), MARKED_ROWS)
+    spec = read_spec_for_csv(csv_path, CENSUS_MAPPING)
+    docs = {action["_id"]: action["_source"] for action in _actions(csv_path, spec, "arrow")[0]}
+    assert docs["05-0001"] == {"CVE_ENT": "05", "CVE_SECCION": "0001", "NOMBRE": "*", "POB": None, "PROM": None}
+    assert docs["05-0002"]["NOMBRE"] is None and docs["05-0002"]["POB"] is None
+    assert docs["05-0003"]["NOMBRE"] is None
+    assert docs["05-0004"]["NOMBRE"] == "N/D" and docs["05-0004"]["PROM"] is None
+    assert docs["05-0005"]["NOMBRE"] is None
+    # Una fila con solo marcas del INEGI en sus valores no es una fila vacía
+    assert docs["06-0001"]["NOMBRE"] == "*"
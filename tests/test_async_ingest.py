@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from async_ingest import import_table_async
+from csv_schema import read_spec_for_csv
+from dead_letter import read_dead_letters
+from tests.helpers import CENSUS_ID_FIELD, CENSUS_MAPPING, AsyncRecordingClient, api_error, write_census_csv
+
+
+@pytest.fixture
+def census_table(tmp_path):
+    csv_path = write_census_csv(str(tmp_path / "secciones.csv"))
+    return {"csv_path": csv_path, "id_field": CENSUS_ID_FIELD,
+            "read_spec": read_spec_for_csv(csv_path, CENSUS_MAPPING), "reader": "pandas"}
+
+
+def load(client, table, dead_letter_path, **kwargs):
+    return asyncio.run(import_table_async(client, "secciones", table, batch_size=4, stream=True, bulk_bytes=None,
+                                          dead_letter_path=dead_letter_path, initial_backoff=0, **kwargs))
+
+
+@pytest.mark.parametrize("id_field", [CENSUS_ID_FIELD, None])
+def test_rejections_keep_their_document_and_row(tmp_path, census_table, id_field):
+    census_table["id_field"] = id_field
+    dead_letter_path = str(tmp_path / "dead_letter.ndjson")
+    # Rechazos según el documento, así aplican también sin _id; Jesús María
+    # recibe un 429 y se reenvía, fuera del orden de su petición
+    client = AsyncRecordingClient(statuses={"Tijuana": 400, "Jesús María": [429, 201], "Carmen": 400},
+                                  key=lambda meta, document: document["NOMBRE"])
+    assert load(client, census_table, dead_letter_path) == (8, 2)
+    failures = read_dead_letters(dead_letter_path)
+    assert [(failure["row"], failure["document"]["NOMBRE"]) for failure in failures] == \
+        [(4, "Tijuana"), (9, "Carmen")]
+
+
+def test_transient_request_failures_are_resent(tmp_path, census_table):
+    dead_letter_path = str(tmp_path / "dead_letter.ndjson")
+    client = AsyncRecordingClient(request_errors=[api_error(429)])
+    assert load(client, census_table, dead_letter_path) == (10, 0)
+    client = AsyncRecordingClient(statuses={"01-0340": [503]})
+    assert load(client, census_table, dead_letter_path, max_retries=2) == (9, 1)
+    assert client.sent_ids().count("01-0340") == 3
+    assert [failure["row"] for failure in read_dead_letters(dead_letter_path)] == [2]
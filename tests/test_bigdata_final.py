@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+import pytest
+from elasticsearch import Elasticsearch
+
+from bench_ingest import start_mock_cluster
+from bigdata_final import create_indices, import_csv_to_elastic, import_tables, read_table_data
+from checkpoints import get_checkpoint
+from csv_schema import read_spec_for_csv
+from dead_letter import read_dead_letters
+from ingest_utils import file_fingerprint
+from mapping_registry import build_index_mapping, compact_mapping, mapping_profile
+from tests.helpers import CENSUS_ID_FIELD, CENSUS_MAPPING, CENSUS_ROWS, Crash, RecordingClient, write_census_csv
+
+
+@pytest.fixture
+def census_csv(tmp_path):
+    return write_census_csv(str(tmp_path / "secciones.csv"))
+
+
+@pytest.fixture
+def spec(census_csv):
+    return read_spec_for_csv(census_csv, CENSUS_MAPPING)
+
+
+@pytest.fixture
+def mock_cluster():
+    server = start_mock_cluster()
+    es = Elasticsearch(hosts=[f"http://127.0.0.1:{server.server_address[1]}"])
+    yield es
+    es.close()
+    server.shutdown()
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("bulk_bytes", [None, 200])
+def test_import_through_mock_cluster(mock_cluster, census_csv, spec, stream, bulk_bytes):
+    data = read_table_data(census_csv, batch_size=3, stream=stream, spec=spec)
+    result = import_csv_to_elastic(mock_cluster, data, "secciones", CENSUS_ID_FIELD, batch_size=3,
+                                   bulk_bytes=bulk_bytes, dead_letter_path=None)
+    assert result == (len(CENSUS_ROWS), 0)
+
+
+def test_parallel_import_through_mock_cluster(mock_cluster, census_csv, spec):
+    data = read_table_data(census_csv, batch_size=3, stream=True, spec=spec)
+    result = import_csv_to_elastic(mock_cluster, data, "secciones", CENSUS_ID_FIELD, batch_size=3,
+                                   workers=3, queue_depth=2, dead_letter_path=None)
+    assert result == (len(CENSUS_ROWS), 0)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_rejected_documents_go_to_dead_letter_with_their_row(tmp_path, census_csv, spec, workers):
+    dead_letter_path = str(tmp_path / "dead_letter.ndjson")
+    server = start_mock_cluster(statuses={"01-0340": 400, "04-0101": 400})
+    es = Elasticsearch(hosts=[f"http://127.0.0.1:{server.server_address[1]}"])
+    try:
+        data = read_table_data(census_csv, batch_size=3, stream=True, spec=spec)
+        result = import_csv_to_elastic(es, data, "secciones", CENSUS_ID_FIELD, batch_size=3, workers=workers,
+                                       dead_letter_path=dead_letter_path)
+    finally:
+        es.close()
+        server.shutdown()
+    assert result == (len(CENSUS_ROWS) - 2, 2)
+    entries = read_dead_letters(dead_letter_path)
+    assert [(entry["_id"], entry["row"]) for entry in entries] == [("01-0340", 2), ("04-0101", 9)]
+    assert entries[0]["document"]["NOMBRE"] == "Calvillo"
+
+
+def _table(census_csv, spec, offset=0):
+    return {"secciones": {"table": "secciones", "csv_path": census_csv, "id_field": CENSUS_ID_FIELD,
+                          "fingerprint": file_fingerprint(census_csv), "offset": offset, "read_spec": spec}}
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_resume_continues_after_last_confirmed_batch(tmp_path, census_csv, spec, stream):
+    journal_path = str(tmp_path / "checkpoints.json")
+    dead_letter_path = str(tmp_path / "dead_letter.ndjson")
+    all_ids = RecordingClient()
+    import_tables(all_ids, _table(census_csv, spec), batch_size=3, stream=stream, bulk_bytes=None,
+                  dead_letter_path=None)
+
+    # El proceso muere al enviar el tercer lote: quedan confirmadas 6 filas
+    crashed = RecordingClient(crash_after=2)
+    with pytest.raises(Crash):
+        import_tables(crashed, _table(census_csv, spec), batch_size=3, stream=stream, bulk_bytes=None,
+                      journal_path=journal_path, dead_letter_path=dead_letter_path)
+    entry = get_checkpoint(journal_path, "secciones", file_fingerprint(census_csv))
+    assert (entry["offset"], entry["completed"]) == (6, False)
+
+    # La reanudación envía solo las filas restantes; un rechazo conserva su fila absoluta
+    resumed = RecordingClient(statuses={"03-0011": 400})
+    results = import_tables(resumed, _table(census_csv, spec, offset=entry["offset"]), batch_size=3,
+                            stream=stream, bulk_bytes=None, journal_path=journal_path,
+                            dead_letter_path=dead_letter_path)
+    assert results == {"secciones": (3, 1)}
+    assert crashed.sent_ids() + resumed.sent_ids() == all_ids.sent_ids()
+    assert [(entry["_id"], entry["row"]) for entry in read_dead_letters(dead_letter_path)] == [("03-0011", 7)]
+    # Con errores la tabla no se marca completa, pero el checkpoint llega al final
+    entry = get_checkpoint(journal_path, "secciones", file_fingerprint(census_csv))
+    assert (entry["offset"], entry["completed"]) == (10, False)
+
+
+def test_resume_ignores_checkpoint_of_changed_csv(tmp_path, census_csv, spec):
+    journal_path = str(tmp_path / "checkpoints.json")
+    import_tables(RecordingClient(), _table(census_csv, spec), batch_size=3, stream=True, bulk_bytes=None,
+                  journal_path=journal_path, dead_letter_path=None)
+    assert get_checkpoint(journal_path, "secciones", file_fingerprint(census_csv))["completed"]
+    write_census_csv(census_csv, CENSUS_ROWS + ["5,1,Saltillo,40,1.25,"])
+    assert get_checkpoint(journal_path, "secciones", file_fingerprint(census_csv)) is None
+
+
+def test_existing_index_keeps_its_mapping_profile_with_a_warning(caplog):
+    compact = compact_mapping("ine_entidad_2020", build_index_mapping("ine_entidad_2020"))
+    assert mapping_profile(compact) == "compact"
+    created = []
+    stored = {"ine_entidad_2020": {"mappings": {"properties": {}}}}
+    es = SimpleNamespace(indices=SimpleNamespace(
+        exists=lambda index: index in stored,
+        get_mapping=lambda index: {index: stored[index]},
+        create=lambda index, body: created.append(index),
+    ))
+    assert create_indices(es, {"ine_entidad_2020": compact}) == (["ine_entidad_2020"], [])
+    assert created == []
+    assert "perfil de mapping default" in caplog.text
+    caplog.clear()
+    stored["ine_entidad_2020"] = compact
+    create_indices(es, {"ine_entidad_2020": compact})
+    assert "perfil" not in caplog.text
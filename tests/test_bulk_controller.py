@@ -0,0 +1,82 @@
+import pytest
+
+from bulk_controller import AdaptiveBulkController
+from csv_schema import read_spec_for_csv
+from ingest_utils import iter_bulk_bodies, iter_csv_batches
+from tests.helpers import CENSUS_ID_FIELD, CENSUS_MAPPING, RecordingClient, api_error, write_census_csv
+
+MB = 1024 * 1024
+
+
+def controller(**kwargs):
+    options = dict(bulk_bytes=8 * MB, max_concurrency=4, min_bytes=1 * MB, max_bytes=16 * MB,
+                   target_latency=2.0, step_bytes=1 * MB, grow_every=2, initial_backoff=0.0)
+    options.update(kwargs)
+    return AdaptiveBulkController(**options)
+
+
+@pytest.fixture
+def census_body(tmp_path):
+    csv_path = write_census_csv(str(tmp_path / "secciones.csv"))
+    frames = iter_csv_batches(csv_path, batch_size=10, spec=read_spec_for_csv(csv_path, CENSUS_MAPPING))
+    return next(iter_bulk_bodies(frames, "secciones", CENSUS_ID_FIELD, max_bytes=None))
+
+
+def test_healthy_responses_grow_size_and_concurrency():
+    bulk = controller()
+    for _ in range(4):
+        bulk.record(latency=0.5, took_ms=100, body_bytes=8 * MB, rejected=0)
+    assert (bulk.current_bytes(), bulk.concurrency) == (12 * MB, 3)
+    for _ in range(20):
+        bulk.record(latency=0.5, took_ms=100, body_bytes=8 * MB, rejected=0)
+    assert (bulk.current_bytes(), bulk.concurrency) == (16 * MB, 4)
+
+
+def test_rejections_halve_size_drop_concurrency_and_pause():
+    bulk = controller(initial_backoff=30.0)
+    for _ in range(4):
+        bulk.record(latency=0.5, took_ms=100, body_bytes=8 * MB, rejected=0)
+    bulk.record(latency=0.5, took_ms=100, body_bytes=12 * MB, rejected=3)
+    assert (bulk.current_bytes(), bulk.concurrency) == (6 * MB, 2)
+    assert bulk.stats["rejected"] == 3
+    assert bulk._pause_until > 0
+
+
+def test_slow_or_saturated_responses_back_off():
+    bulk = controller()
+    bulk.record(latency=3.0, took_ms=100, body_bytes=8 * MB, rejected=0)
+    assert bulk.current_bytes() == 6 * MB
+    bulk.concurrency = 3
+    # El mismo trabajo tarda el doble que el mejor 'took' por MB visto
+    bulk.record(latency=0.5, took_ms=200, body_bytes=8 * MB, rejected=0)
+    assert (bulk.current_bytes(), bulk.concurrency) == (6 * MB, 2)
+
+
+def test_item_rejections_resend_only_those_items(census_body):
+    body, rows = census_body
+    bulk = controller()
+    client = RecordingClient(statuses={"01-0339": [429, 201]})
+    success, failures = bulk.send(client, body, rows=rows)
+    assert (success, failures) == (10, [])
+    assert client.sent_ids()[10:] == ["01-0339"]
+    assert bulk.current_bytes() == 5 * MB
+
+
+def test_request_rejections_adapt_and_resend_the_body(census_body):
+    body, rows = census_body
+    bulk = controller()
+    client = RecordingClient(request_errors=[api_error(429), api_error(429)])
+    success, failures = bulk.send(client, body, rows=rows)
+    assert (success, failures, client.requests) == (10, [], 3)
+    assert bulk.stats["rejected"] == 20
+    # Dos rechazos (8 -> 4 -> 2 MB) y una respuesta sana (+1 MB)
+    assert bulk.current_bytes() == 3 * MB
+
+
+def test_request_rejections_go_to_dead_letter_after_max_retries(census_body):
+    body, rows = census_body
+    bulk = controller(max_retries=1)
+    client = RecordingClient(request_errors=[api_error(503)] * 2)
+    success, failures = bulk.send(client, body, rows=rows)
+    assert (success, len(failures), client.requests) == (0, 10, 2)
+    assert [failure["row"] for failure in failures] == rows
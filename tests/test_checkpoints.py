@@ -0,0 +1,36 @@
+import os
+
+import checkpoints
+from checkpoints import get_checkpoint, input_fingerprint, save_checkpoint
+from tests.helpers import CENSUS_ROWS, write_census_csv
+
+
+def test_fingerprint_reuses_journal_hash_until_the_file_changes(tmp_path, monkeypatch):
+    csv_path = write_census_csv(str(tmp_path / "secciones.csv"))
+    journal_path = str(tmp_path / "checkpoints.json")
+    hashed = []
+    sha256 = checkpoints.file_sha256
+    monkeypatch.setattr(checkpoints, "file_sha256", lambda path: hashed.append(path) or sha256(path))
+
+    fingerprint = input_fingerprint(journal_path, "secciones", csv_path)
+    save_checkpoint(journal_path, "secciones", "secciones", fingerprint, 6)
+    assert len(hashed) == 1
+
+    # Mismo archivo: sin resume no se vuelve a leer; al reanudar se confirma el contenido
+    assert input_fingerprint(journal_path, "secciones", csv_path) == fingerprint
+    assert len(hashed) == 1
+    assert get_checkpoint(journal_path, "secciones", input_fingerprint(journal_path, "secciones", csv_path,
+                                                                      confirm=True))["offset"] == 6
+    assert len(hashed) == 2
+
+    # Contenido distinto con el mismo tamaño y mtime: solo la confirmación lo detecta
+    stat = os.stat(csv_path)
+    write_census_csv(csv_path, [CENSUS_ROWS[1], CENSUS_ROWS[0]] + CENSUS_ROWS[2:])
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert input_fingerprint(journal_path, "secciones", csv_path)["sha256"] == fingerprint["sha256"]
+    assert get_checkpoint(journal_path, "secciones", input_fingerprint(journal_path, "secciones", csv_path,
+                                                                      confirm=True)) is None
+
+    # Un archivo modificado se vuelve a leer aunque no se reanude
+    write_census_csv(csv_path, CENSUS_ROWS[:5])
+    assert input_fingerprint(journal_path, "secciones", csv_path)["sha256"] != fingerprint["sha256"]
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from csv_input import csv_source
+from csv_schema import MISSING_VALUES, apply_read_spec, build_read_spec, read_options, read_spec_for_csv
+from tests.helpers import CENSUS_MAPPING, CENSUS_ROWS, write_census_csv
+
+
+def read(csv_path, spec):
+    with csv_source(csv_path) as source:
+        df = pd.read_csv(source, encoding='latin-1', **read_options(spec))
+    return apply_read_spec(df.dropna(how='all').reset_index(drop=True), spec)
+
+
+def test_spec_follows_the_mapping():
+    mapping = {"mappings": {"properties": {**CENSUS_MAPPING["mappings"]["properties"],
+                                           "NOM_ENT": {"type": "text"}}}}
+    spec = build_read_spec(mapping, ["CVE_ENT", "CVE_SECCION", "NOM_ENT ", "POB", "PROM", "OTRA", "Unnamed: 6"])
+    assert spec["usecols"] == ["CVE_ENT", "CVE_SECCION", "NOM_ENT ", "POB", "PROM", "OTRA"]
+    assert spec["dtype"] == {"CVE_ENT": str, "CVE_SECCION": str, "NOM_ENT ": "category",
+                             "POB": "float64", "PROM": "float64"}
+    assert spec["casts"] == {"POB": "Int32"}
+    assert spec["na_values"] == {"POB": MISSING_VALUES, "PROM": MISSING_VALUES}
+    assert spec["pad_widths"] == {"CVE_ENT": 2, "CVE_SECCION": 4}
+
+
+def test_keys_are_zero_padded_and_integers_nullable(tmp_path):
+    csv_path = write_census_csv(str(tmp_path / "secciones.csv"))
+    df = read(csv_path, read_spec_for_csv(csv_path, CENSUS_MAPPING))
+    assert list(df.columns) == ["CVE_ENT", "CVE_SECCION", "NOMBRE", "POB", "PROM"]
+    assert list(df["CVE_ENT"][:4]) == ["01", "01", "01", "02"]
+    assert list(df["CVE_SECCION"][:4]) == ["0338", "0339", "0340", "0001"]
+    assert str(df["POB"].dtype) == "Int32"
+    assert df["POB"][0] == 120
+
+
+def test_inegi_marks_are_missing_only_in_numeric_columns(tmp_path):
+    rows = CENSUS_ROWS[:3] + ["2,1,*,N/D,*,"]
+    csv_path = write_census_csv(str(tmp_path / "secciones.csv"), rows)
+    df = read(csv_path, read_spec_for_csv(csv_path, CENSUS_MAPPING))
+    # "*" y "N/D" en numéricos y la celda vacía quedan como nulos
+    assert list(df["POB"].isna()) == [False, True, False, True]
+    assert list(df["PROM"].isna()) == [False, True, False, True]
+    assert df["NOMBRE"][3] == "*"
+
+
+def test_non_integer_values_keep_the_float_column(tmp_path, caplog):
+    rows = ["1,338,Aguascalientes,120.5,1.5,", "1,339,Jesús María,7,,"]
+    csv_path = write_census_csv(str(tmp_path / "secciones.csv"), rows)
+    df = read(csv_path, read_spec_for_csv(csv_path, CENSUS_MAPPING))
+    assert str(df["POB"].dtype) == "float64"
+    assert "POB" in caplog.text
@@ -0,0 +1,12 @@
+from dead_letter import read_dead_letters, write_dead_letters
+
+
+def test_since_keeps_only_entries_of_the_current_load(tmp_path):
+    path = str(tmp_path / "dead_letter.ndjson")
+    write_dead_letters(path, [
+        {"index": "censo", "_id": "1", "error_type": "mapper_parsing_exception", "failed_at": "2024-01-01T09:59:59"},
+        {"index": "censo", "_id": "2", "error_type": "mapper_parsing_exception", "failed_at": "2024-01-01T10:00:00"},
+        {"index": "censo", "_id": "3", "error_type": "mapper_parsing_exception", "failed_at": "2024-01-02T08:00:00"},
+    ])
+    assert [entry["_id"] for entry in read_dead_letters(path)] == ["1", "2", "3"]
+    assert [entry["_id"] for entry in read_dead_letters(path, since="2024-01-01T10:00:00")] == ["2", "3"]
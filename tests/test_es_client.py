@@ -0,0 +1,12 @@
+import asyncio
+
+import es_client
+from es_client import DEFAULT_CLIENT_CONFIG, connect_elasticsearch_async
+
+
+def test_async_client_without_aiohttp_returns_none(monkeypatch):
+    def missing_aiohttp(**options):
+        raise ValueError("You must have 'aiohttp' installed to use AiohttpHttpNode")
+
+    monkeypatch.setattr(es_client, "AsyncElasticsearch", missing_aiohttp)
+    assert asyncio.run(connect_elasticsearch_async(config=dict(DEFAULT_CLIENT_CONFIG))) is None
@@ -0,0 +1,128 @@
+from datetime import datetime
+from fnmatch import fnmatch
+from types import SimpleNamespace
+
+from index_lifecycle import (
+    id_scheme,
+    new_version_name,
+    outdated_indices,
+    prune_versions,
+    swap_alias,
+    versioned_index_name,
+    with_id_meta,
+)
+
+
+def test_version_names_sort_chronologically():
+    older = "censo_v20240101120000"
+    names = [versioned_index_name("censo", datetime(2024, 1, 1, 12, 0, 0, micro)) for micro in (5, 40, 300)]
+    assert sorted([names[2], older, names[0], names[1]]) == [older] + names
+
+
+def test_new_version_never_reuses_an_existing_index():
+    taken = set()
+    es = SimpleNamespace(indices=SimpleNamespace(exists=lambda index: index in taken))
+    for _ in range(50):
+        taken.add(new_version_name(es, "censo"))
+    assert len(taken) == 50
+
+
+class FakeIndices:
+    """API de índices mínima: índices con su mapping y alias con sus índices"""
+
+    def __init__(self, indices, aliases=None):
+        self.indices = indices
+        self.aliases = aliases or {}
+        self.deleted = []
+
+    def exists(self, index):
+        return index in self.indices or index in self.aliases
+
+    def get_alias(self, name):
+        return {index_name: {} for index_name in self.aliases.get(name, [])}
+
+    def get_mapping(self, index):
+        return {index: self.indices[index]}
+
+    def delete(self, index):
+        self.deleted.append(index)
+        del self.indices[index]
+
+
+def test_indices_with_another_id_scheme_are_dropped_once():
+    mapping = with_id_meta({"mappings": {"properties": {}}}, ["CVE_ENT", "CVE_SECCION"])
+    assert id_scheme(mapping) == ["CVE_ENT", "CVE_SECCION"]
+    assert id_scheme(with_id_meta(mapping, "CVE_ENT")) == ["CVE_ENT"]
+    indices = FakeIndices(
+        {"seccion": {"mappings": {"properties": {}}}, "distrito": mapping, "censo_v1": {"mappings": {}}},
+        aliases={"censo": ["censo_v1"]},
+    )
+    es = SimpleNamespace(indices=indices)
+    mappings = {"seccion": mapping, "distrito": mapping, "censo": mapping, "municipio": mapping}
+    assert outdated_indices(es, mappings) == ["seccion"]
+    # El índice recreado ya declara su _id: la siguiente carga no lo toca
+    indices.indices["seccion"] = mapping
+    assert outdated_indices(es, mappings) == []
+    assert indices.deleted == ["seccion"]
+
+
+class FakeCluster:
+    """Cluster mínimo para los alias: documentos por índice y los índices de cada alias"""
+
+    def __init__(self, docs, aliases=None):
+        self.docs = dict(docs)
+        self.aliases = {alias: list(indices) for alias, indices in (aliases or {}).items()}
+        self.actions = []
+        self.indices = SimpleNamespace(
+            refresh=lambda index: None,
+            exists=lambda index: index in self.docs or bool(self.aliases.get(index)),
+            exists_alias=lambda name: bool(self.aliases.get(name)),
+            get_alias=lambda name: {index_name: {} for index_name in self.aliases.get(name, [])},
+            get=lambda index: {name: {} for name in self.docs if fnmatch(name, index)},
+            update_aliases=self._update_aliases,
+            delete=lambda index: self.docs.pop(index),
+        )
+
+    def count(self, index):
+        return {"count": self.docs[index]}
+
+    def _update_aliases(self, actions):
+        self.actions.append(actions)
+        for action in actions:
+            (op, spec), = action.items()
+            if op == "add":
+                self.aliases.setdefault(spec["alias"], []).append(spec["index"])
+            elif op == "remove":
+                self.aliases[spec["alias"]].remove(spec["index"])
+            else:
+                del self.docs[spec["index"]]
+
+
+def test_swap_alias_moves_the_alias_in_one_request():
+    es = FakeCluster({"censo_v1": 10, "censo_v2": 12}, aliases={"censo": ["censo_v1"]})
+    assert swap_alias(es, "censo", "censo_v2", expected_count=12)
+    assert es.actions == [[{"remove": {"index": "censo_v1", "alias": "censo"}},
+                           {"add": {"index": "censo_v2", "alias": "censo"}}]]
+    assert es.aliases["censo"] == ["censo_v2"]
+
+
+def test_swap_alias_replaces_a_concrete_index_with_the_alias_name():
+    es = FakeCluster({"censo": 10, "censo_v1": 12})
+    assert swap_alias(es, "censo", "censo_v1")
+    assert es.actions == [[{"remove_index": {"index": "censo"}},
+                           {"add": {"index": "censo_v1", "alias": "censo"}}]]
+    assert "censo" not in es.docs
+
+
+def test_swap_alias_refuses_an_incomplete_version():
+    es = FakeCluster({"censo_v1": 10, "censo_v2": 11}, aliases={"censo": ["censo_v1"]})
+    assert not swap_alias(es, "censo", "censo_v2", expected_count=12)
+    assert es.actions == []
+    assert es.aliases["censo"] == ["censo_v1"]
+
+
+def test_prune_keeps_the_newest_versions_and_the_active_one():
+    versions = [f"censo_v2024010{day}" for day in range(1, 6)]
+    es = FakeCluster({name: 1 for name in versions}, aliases={"censo": [versions[0]]})
+    assert prune_versions(es, "censo", keep=2) == versions[1:3]
+    assert sorted(es.docs) == [versions[0]] + versions[3:]
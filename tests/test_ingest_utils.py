@@ -0,0 +1,133 @@
+import json
+
+import pandas as pd
+import pytest
+
+from bigdata_final import process_csv_data
+from csv_schema import read_spec_for_csv
+from ingest_utils import (
+    build_actions,
+    build_documents,
+    frame_rows,
+    iter_bulk_bodies,
+    iter_csv_batches,
+    read_csv_range,
+    send_bulk_body,
+    split_csv_ranges,
+)
+from tests.helpers import CENSUS_ID_FIELD, CENSUS_MAPPING, RecordingClient, api_error, write_census_csv
+
+
+@pytest.fixture
+def census_csv(tmp_path):
+    return write_census_csv(str(tmp_path / "secciones.csv"))
+
+
+@pytest.fixture
+def spec(census_csv):
+    return read_spec_for_csv(census_csv, CENSUS_MAPPING)
+
+
+def test_build_actions_composite_ids_and_nulls():
+    df = pd.DataFrame({
+        "CVE_ENT": ["01", "01", None],
+        "CVE_SECCION": ["0338", "0339", "0001"],
+        "POB": pd.array([120, None, 7], dtype="Int32"),
+        "Unnamed: 5": [float("nan")] * 3,
+    })
+    actions = build_actions(df, "secciones", CENSUS_ID_FIELD)
+    assert [action.get("_id") for action in actions] == ["01-0338", "01-0339", None]
+    assert "_id" not in actions[2]
+    assert actions[0] == {"_index": "secciones", "_id": "01-0338",
+                          "_source": {"CVE_ENT": "01", "CVE_SECCION": "0338", "POB": 120}}
+    assert actions[1]["_source"]["POB"] is None
+    # Los documentos se pueden serializar tal cual (valores nativos, sin NaN)
+    json.dumps([action["_source"] for action in actions], allow_nan=False)
+
+
+def test_build_actions_matches_iterrows(census_csv, spec):
+    df = process_csv_data(census_csv, spec)
+    expected = [{col: (None if pd.isna(value) else value) for col, value in row.items()} for _, row in df.iterrows()]
+    assert build_documents(df) == expected
+
+
+def test_chunked_reading_matches_full_read(census_csv, spec):
+    full = process_csv_data(census_csv, spec)
+    chunks = list(iter_csv_batches(census_csv, batch_size=3, spec=spec))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert [row for chunk in chunks for row in frame_rows(chunk)] == list(range(len(full)))
+    chunked = [action for chunk in chunks for action in build_actions(chunk, "secciones", CENSUS_ID_FIELD)]
+    assert chunked == build_actions(full, "secciones", CENSUS_ID_FIELD)
+    assert chunked[1]["_id"] == "01-0339"
+    assert chunked[1]["_source"]["POB"] is None
+    assert chunked[5]["_source"]["PROM"] is None
+
+
+def test_chunked_reading_keeps_csv_row_numbers_after_skip(census_csv, spec):
+    chunks = list(iter_csv_batches(census_csv, batch_size=3, skip_rows=4, spec=spec))
+    assert [row for chunk in chunks for row in frame_rows(chunk)] == [4, 5, 6, 7, 8, 9]
+    assert build_actions(chunks[0], "secciones", CENSUS_ID_FIELD)[0]["_id"] == "02-0002"
+
+
+def test_csv_ranges_cover_every_row_once(census_csv, spec):
+    full = process_csv_data(census_csv, spec)
+    frames = []
+    first_row = 0
+    for start, end in split_csv_ranges(census_csv, range_bytes=40):
+        df = read_csv_range(census_csv, start, end, spec=spec, first_row=first_row)
+        first_row += len(df)
+        frames.append(df)
+    assert build_actions(pd.concat(frames), "secciones", CENSUS_ID_FIELD) == \
+        build_actions(full, "secciones", CENSUS_ID_FIELD)
+
+
+def test_bulk_bodies_carry_csv_rows(census_csv, spec):
+    frames = iter_csv_batches(census_csv, batch_size=4, spec=spec)
+    bodies = list(iter_bulk_bodies(frames, "secciones", CENSUS_ID_FIELD, max_bytes=None, max_docs=3))
+    assert [rows for _, rows in bodies] == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
+    assert all(body.count(b'\n') == 2 * len(rows) for body, rows in bodies)
+
+
+def test_rejected_item_maps_back_to_csv_row(census_csv, spec):
+    client = RecordingClient(statuses={"02-0003": 400})
+    frames = iter_csv_batches(census_csv, batch_size=4, skip_rows=3, spec=spec)
+    body, rows = next(iter_bulk_bodies(frames, "secciones", CENSUS_ID_FIELD, max_bytes=None, max_docs=5))
+    success, failures = send_bulk_body(client, body, rows=rows)
+    assert success == 4
+    assert len(failures) == 1
+    failure = failures[0]
+    assert (failure["_id"], failure["row"], failure["status"]) == ("02-0003", 5, 400)
+    assert failure["document"]["NOMBRE"] == "Ensenada"
+
+
+def test_only_transient_rejections_are_retried(census_csv, spec):
+    client = RecordingClient(statuses={"01-0339": [429, 201], "02-0001": 400, "03-0010": [503]})
+    frames = iter_csv_batches(census_csv, batch_size=10, spec=spec)
+    body, rows = next(iter_bulk_bodies(frames, "secciones", CENSUS_ID_FIELD, max_bytes=None))
+    success, failures = send_bulk_body(client, body, max_retries=2, initial_backoff=0, rows=rows)
+    assert success == 8
+    assert sorted((failure["_id"], failure["row"], failure["status"]) for failure in failures) == \
+        [("02-0001", 3, 400), ("03-0010", 6, 503)]
+    # Los reintentos solo llevan los ítems transitorios
+    assert client.sent_ids()[10:] == ["01-0339", "03-0010", "03-0010"]
+
+
+def test_transient_request_failures_resend_the_whole_body(census_csv, spec):
+    client = RecordingClient(request_errors=[api_error(429), api_error(429)])
+    frames = iter_csv_batches(census_csv, batch_size=10, spec=spec)
+    body, rows = next(iter_bulk_bodies(frames, "secciones", CENSUS_ID_FIELD, max_bytes=None))
+    success, failures = send_bulk_body(client, body, max_retries=3, initial_backoff=0, rows=rows)
+    assert (success, failures, client.requests) == (10, [], 3)
+
+
+def test_request_failures_go_to_dead_letter_when_not_transient_or_exhausted(census_csv, spec):
+    frames = iter_csv_batches(census_csv, batch_size=10, spec=spec)
+    body, rows = next(iter_bulk_bodies(frames, "secciones", CENSUS_ID_FIELD, max_bytes=None))
+    client = RecordingClient(request_errors=[api_error(400, "parse_exception")])
+    success, failures = send_bulk_body(client, body, max_retries=3, initial_backoff=0, rows=rows)
+    assert (success, len(failures), client.requests) == (0, 10, 1)
+    client = RecordingClient(request_errors=[api_error(503)] * 3)
+    success, failures = send_bulk_body(client, body, max_retries=2, initial_backoff=0, rows=rows)
+    assert (success, len(failures), client.requests) == (0, 10, 3)
+    assert [failure["row"] for failure in failures] == rows
+    assert failures[0]["error_type"] == "ApiError"
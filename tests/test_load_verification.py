@@ -0,0 +1,88 @@
+from csv_schema import read_spec_for_csv
+from load_verification import aggregations, compare_aggregates, index_aggregates, local_aggregates
+from tests.helpers import CENSUS_ID_FIELD, CENSUS_MAPPING, write_census_csv
+
+
+class FakeSearch:
+    """Cliente que responde las búsquedas de index_aggregates con respuestas guardadas"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.indices = self
+
+    def refresh(self, index):
+        pass
+
+    def search(self, index, size, aggs, track_total_hits=False):
+        self.requests.append(aggs)
+        return self.responses.pop(0)
+
+
+def census_local(tmp_path):
+    csv_path = write_census_csv(str(tmp_path / "secciones.csv"))
+    return local_aggregates(csv_path, CENSUS_MAPPING, CENSUS_ID_FIELD, "CVE_ENT",
+                            read_spec_for_csv(csv_path, CENSUS_MAPPING))
+
+
+def matching_remote(local):
+    return {"docs": local["rows"], "sums": dict(local["sums"]), "nulls": dict(local["nulls"]),
+            "entities": dict(local["entities"])}
+
+
+def test_local_aggregates_of_the_csv(tmp_path):
+    local = census_local(tmp_path)
+    assert (local["rows"], local["unique_ids"]) == (10, 10)
+    assert list(local["fields"]) == ["CVE_ENT", "CVE_SECCION", "POB", "PROM"]
+    assert local["sums"] == {"POB": 339.0, "PROM": 13.75}
+    assert local["nulls"] == {"CVE_ENT": 0, "CVE_SECCION": 0, "POB": 2, "PROM": 2}
+    assert local["entities"] == {"01": 3, "02": 3, "03": 2, "04": 2}
+
+
+def test_float_sums_within_tolerance_match(tmp_path):
+    local = census_local(tmp_path)
+    remote = matching_remote(local)
+    # float guarda 32 bits: una diferencia relativa de 1e-7 se admite, una de 1e-3 no
+    remote["sums"]["PROM"] = local["sums"]["PROM"] * (1 + 1e-7)
+    assert compare_aggregates(local, remote) == ([], [])
+    remote["sums"]["PROM"] = local["sums"]["PROM"] * (1 + 1e-3)
+    remote["sums"]["POB"] = local["sums"]["POB"] + 1
+    columns, _ = compare_aggregates(local, remote)
+    assert [(mismatch["field"], mismatch["check"]) for mismatch in columns] == [("POB", "suma"), ("PROM", "suma")]
+
+
+def test_missing_documents_show_as_null_and_entity_mismatches(tmp_path):
+    local = census_local(tmp_path)
+    remote = matching_remote(local)
+    remote["nulls"]["POB"] = 3
+    remote["entities"]["02"] = 2
+    remote["entities"]["09"] = 1
+    columns, entities = compare_aggregates(local, remote)
+    assert columns == [{"field": "POB", "check": "nulos", "expected": 2, "actual": 3}]
+    assert entities == [{"entity": "02", "expected": 3, "actual": 2},
+                        {"entity": "09", "expected": 0, "actual": 1}]
+
+
+def test_index_aggregates_reads_every_entity_page(tmp_path):
+    local = census_local(tmp_path)
+    fields = local["fields"]
+    first = {
+        "hits": {"total": {"value": 10}},
+        "aggregations": {
+            "count_0": {"value": 10}, "count_1": {"value": 10}, "count_2": {"value": 8}, "count_3": {"value": 8},
+            "sum_2": {"value": 339.0}, "sum_3": {"value": 13.75},
+            "entities": {"buckets": [{"key": {"entity": "01"}, "doc_count": 3},
+                                     {"key": {"entity": "02"}, "doc_count": 3}],
+                         "after_key": {"entity": "02"}},
+        },
+    }
+    second = {"aggregations": {"entities": {"buckets": [{"key": {"entity": "03"}, "doc_count": 2},
+                                                        {"key": {"entity": "04"}, "doc_count": 2}],
+                                            "after_key": {"entity": "04"}}}}
+    last = {"aggregations": {"entities": {"buckets": []}}}
+    es = FakeSearch([first, second, last])
+    remote = index_aggregates(es, "secciones", fields, "CVE_ENT")
+    assert compare_aggregates(local, remote) == ([], [])
+    assert remote["nulls"] == {"CVE_ENT": 0, "CVE_SECCION": 0, "POB": 2, "PROM": 2}
+    assert es.requests[0] == aggregations(fields, "CVE_ENT")
+    assert es.requests[1]["entities"]["composite"]["after"] == {"entity": "02"}
@@ -0,0 +1,36 @@
+import os
+
+import mapping_registry
+from csv_schema import read_spec_for_csv
+from mapping_registry import cached_numeric_ranges, observe_numeric_ranges
+from tests.helpers import CENSUS_MAPPING, CENSUS_ROWS, write_census_csv
+
+
+def test_observed_ranges_do_not_depend_on_the_batch_size(tmp_path):
+    csv_path = write_census_csv(str(tmp_path / "secciones.csv"))
+    spec = read_spec_for_csv(csv_path, CENSUS_MAPPING)
+    observed = observe_numeric_ranges(csv_path, spec, batch_size=3)
+    assert observed == observe_numeric_ranges(csv_path, spec)
+    assert observed["POB"] == {"min": 9.0, "max": 120.0, "decimals": 0}
+    assert observed["PROM"] == {"min": 0.25, "max": 4.5, "decimals": 2}
+
+
+def test_observed_ranges_are_saved_until_the_csv_changes(tmp_path, monkeypatch):
+    csv_path = write_census_csv(str(tmp_path / "secciones.csv"))
+    ranges_path = str(tmp_path / "observed_ranges.json")
+    spec = read_spec_for_csv(csv_path, CENSUS_MAPPING)
+    calls = []
+    observe = mapping_registry.observe_numeric_ranges
+    monkeypatch.setattr(mapping_registry, "observe_numeric_ranges",
+                        lambda *args: calls.append(args) or observe(*args))
+
+    first = cached_numeric_ranges(csv_path, spec, path=ranges_path)
+    assert cached_numeric_ranges(csv_path, spec, path=ranges_path) == first
+    assert len(calls) == 1
+
+    write_census_csv(csv_path, CENSUS_ROWS + ["5,1,Saltillo,4000,1.125,"])
+    os.utime(csv_path, (0, os.stat(csv_path).st_mtime + 10))
+    changed = cached_numeric_ranges(csv_path, spec, path=ranges_path)
+    assert len(calls) == 2
+    assert changed["POB"]["max"] == 4000.0
+    assert changed["PROM"]["decimals"] == 3
@@ -0,0 +1,16 @@
+from types import SimpleNamespace
+
+from snapshots import existing_indices
+
+
+def test_alias_names_resolve_to_their_backing_indices():
+    aliases = {"censo": ["censo_v20240101120000"]}
+    indices = {"censo_v20240101120000", "seccion"}
+    es = SimpleNamespace(indices=SimpleNamespace(
+        get_alias=lambda name: {index_name: {} for index_name in aliases.get(name, [])},
+        exists=lambda index: index in indices or index in aliases,
+    ))
+    assert existing_indices(es, ["censo", "seccion", "municipio"]) == {
+        "censo_v20240101120000": "censo",
+        "seccion": "seccion",
+    }